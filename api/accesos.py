@@ -0,0 +1,158 @@
+"""
+Escritura diferida de Usuario.ultimo_acceso y Sesion.ultima_actividad.
+
+Cada petición autenticada solo anota en memoria la fecha del último acceso
+por usuario y por sesión (se queda la más reciente). Un hilo de fondo por
+proceso escribe lo anotado cada ACCESOS_MAX_RETRASO segundos, que es la
+máxima desactualización de esas columnas, con un único UPDATE ... CASE por
+tabla y lote de ids. Es un QuerySet.update de una sola columna: no pasa por
+save(), no toca fecha_modificacion ni emite señales; por eso la escritura
+incrementa la versión 'usuarios' que usa el GET condicional del listado, a lo
+sumo una vez cada ACCESOS_INTERVALO_VERSION segundos por proceso para que el
+ETag no cambie en cada vaciado de un sistema con tráfico: ultimo_acceso en el
+listado puede quedar desactualizado hasta ese intervalo.
+Una fecha nunca reemplaza a otra más reciente, así que varios workers pueden
+escribir sobre las mismas filas en cualquier orden. Si la escritura falla,
+las fechas vuelven a quedar anotadas para el siguiente intento.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Case, F, Q, When, Value
+from django.utils import timezone
+
+from .condicional import incrementar_version
+from .models import Usuario, Sesion
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE_ACCESOS = 500
+
+
+def _actualizar(modelo, campo, fechas):
+    """Escribe {pk: fecha} en `campo` sin retroceder fechas; devuelve las filas"""
+    ids = list(fechas)
+    filas = 0
+    for inicio in range(0, len(ids), TAMANO_LOTE_ACCESOS):
+        lote = ids[inicio:inicio + TAMANO_LOTE_ACCESOS]
+        nuevo = Q(**{f'{campo}__isnull': True})
+        casos = [
+            When(Q(pk=pk) & (nuevo | Q(**{f'{campo}__lt': fechas[pk]})), then=Value(fechas[pk]))
+            for pk in lote
+        ]
+        filas += modelo.objects.filter(pk__in=lote).update(**{campo: Case(*casos, default=F(campo))})
+    return filas
+
+
+class RegistroAccesos:
+    def __init__(self):
+        self._condicion = threading.Condition()
+        self._usuarios = {}
+        self._sesiones = {}
+        self._hilo = None
+        self._pid = None
+        self._detenido = False
+        self._ultima_version = None
+        self.contadores = {'registrados': 0, 'usuarios_escritos': 0, 'sesiones_escritas': 0, 'fallidos': 0}
+        atexit.register(self.detener)
+
+    @property
+    def max_retraso(self):
+        return getattr(settings, 'ACCESOS_MAX_RETRASO', 30)
+
+    @property
+    def intervalo_version(self):
+        return getattr(settings, 'ACCESOS_INTERVALO_VERSION', 300)
+
+    def registrar(self, id_usuario, id_sesion=None, fecha=None):
+        fecha = fecha or timezone.now()
+        self._asegurar_hilo()
+        with self._condicion:
+            self._usuarios[id_usuario] = max(fecha, self._usuarios.get(id_usuario, fecha))
+            if id_sesion is not None:
+                self._sesiones[id_sesion] = max(fecha, self._sesiones.get(id_sesion, fecha))
+            self.contadores['registrados'] += 1
+
+    def estadisticas(self):
+        with self._condicion:
+            return dict(self.contadores, usuarios_pendientes=len(self._usuarios),
+                        sesiones_pendientes=len(self._sesiones))
+
+    def _asegurar_hilo(self):
+        if self._hilo is not None and self._pid == os.getpid():
+            return
+        with self._condicion:
+            if self._hilo is not None and self._pid == os.getpid():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # Proceso hijo tras un fork: lo anotado lo escribe el padre
+                self._usuarios, self._sesiones = {}, {}
+            self._pid = os.getpid()
+            self._detenido = False
+            self._hilo = threading.Thread(target=self._ejecutar, name='registro-accesos', daemon=True)
+            self._hilo.start()
+
+    def _ejecutar(self):
+        while True:
+            with self._condicion:
+                if not self._detenido:
+                    self._condicion.wait(self.max_retraso)
+                if self._detenido:
+                    return
+            self.vaciar()
+            close_old_connections()
+
+    def vaciar(self):
+        """Escribe lo anotado, en el hilo que llama"""
+        with self._condicion:
+            usuarios, self._usuarios = self._usuarios, {}
+            sesiones, self._sesiones = self._sesiones, {}
+        if usuarios and self._escribir(Usuario, 'ultimo_acceso', usuarios, '_usuarios', 'usuarios_escritos'):
+            # El listado de usuarios muestra ultimo_acceso y el update no
+            # cambia fecha_modificacion: su ETag depende de esta versión
+            self._incrementar_version()
+        if sesiones:
+            self._escribir(Sesion, 'ultima_actividad', sesiones, '_sesiones', 'sesiones_escritas')
+
+    def _incrementar_version(self):
+        ahora = time.monotonic()
+        if self._ultima_version is not None and ahora - self._ultima_version < self.intervalo_version:
+            return
+        self._ultima_version = ahora
+        incrementar_version('usuarios')
+
+    def _escribir(self, modelo, campo, fechas, pendientes, contador):
+        """Devuelve las filas escritas; si falla, devuelve las fechas al diccionario `pendientes`"""
+        try:
+            filas = _actualizar(modelo, campo, fechas)
+        except Exception:
+            logger.exception('No se pudieron escribir %s accesos en %s', len(fechas), modelo._meta.db_table)
+            with self._condicion:
+                # Se reintentan en la próxima escritura, sin pisar fechas más nuevas
+                anotadas = getattr(self, pendientes)
+                for pk, fecha in fechas.items():
+                    anotadas[pk] = max(fecha, anotadas.get(pk, fecha))
+                self.contadores['fallidos'] += len(fechas)
+            return 0
+        with self._condicion:
+            self.contadores[contador] += filas
+        return filas
+
+    def detener(self):
+        """Detiene el hilo y escribe lo pendiente (se registra con atexit)"""
+        with self._condicion:
+            self._detenido = True
+            self._condicion.notify()
+        hilo = self._hilo
+        if hilo is not None and hilo is not threading.current_thread() and self._pid == os.getpid():
+            hilo.join(timeout=5)
+        self._hilo = None
+        self.vaciar()
+
+
+registro = RegistroAccesos()
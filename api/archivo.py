@@ -0,0 +1,161 @@
+"""
+Búsqueda en los segmentos archivados por api.retencion.
+
+Los segmentos se recorren en orden cronológico. Antes de abrir uno se
+descarta por su ruta (año/mes y día en el nombre) y luego por su índice
+(rango de fechas, niveles, módulos y usuarios), de modo que solo se
+descomprimen los que pueden contener coincidencias. Las búsquedas no
+escriben en el archivo: un segmento sin índice se recorre completo, y los
+índices que faltan los crea `manage.py archivar_registros` con
+`indexar_segmentos`.
+
+La paginación usa un cursor "<segmento>:<línea>" con la posición de la
+última fila entregada.
+"""
+import gzip
+import json
+from datetime import date, datetime, timezone as dt_timezone
+from pathlib import Path
+
+from .retencion import POLITICAS, directorio_archivo, escribir_indice, indice_segmento, ruta_indice
+
+
+class CursorArchivoInvalido(ValueError):
+    """El cursor de búsqueda en el archivo no es válido"""
+
+
+def _fecha(valor):
+    return datetime.fromisoformat(valor)
+
+
+def _utc(fecha):
+    return fecha.astimezone(dt_timezone.utc) if fecha is not None else None
+
+
+def segmentos(recurso, directorio=None, desde=None, hasta=None):
+    """Rutas de los segmentos de `recurso` que pueden caer en [desde, hasta]"""
+    base = Path(directorio or directorio_archivo()) / recurso
+    if not base.is_dir():
+        return
+    desde, hasta = _utc(desde), _utc(hasta)
+    for carpeta_anio in sorted(base.iterdir()):
+        if not carpeta_anio.name.isdigit():
+            continue
+        anio = int(carpeta_anio.name)
+        if (desde and anio < desde.year) or (hasta and anio > hasta.year):
+            continue
+        for carpeta_mes in sorted(carpeta_anio.iterdir()):
+            if not carpeta_mes.name.isdigit():
+                continue
+            mes = (anio, int(carpeta_mes.name))
+            if (desde and mes < (desde.year, desde.month)) or (hasta and mes > (hasta.year, hasta.month)):
+                continue
+            for ruta in sorted(carpeta_mes.glob(f'{recurso}-*.ndjson.gz')):
+                dia = date.fromisoformat(ruta.name[len(recurso) + 1:len(recurso) + 11])
+                if (desde and dia < desde.date()) or (hasta and dia > hasta.date()):
+                    continue
+                yield ruta
+
+
+def leer_filas(ruta):
+    with gzip.open(ruta, 'rt', encoding='utf-8') as archivo:
+        for linea in archivo:
+            yield json.loads(linea)
+
+
+def _calcular_indice(ruta, recurso):
+    _, campo = POLITICAS[recurso]
+    filas = [dict(fila, **{campo: _fecha(fila[campo])}) for fila in leer_filas(ruta)]
+    return indice_segmento(filas, campo)
+
+
+def leer_indice(ruta):
+    """Índice del segmento, o None si todavía no tiene"""
+    try:
+        return json.loads(ruta_indice(ruta).read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        return None
+
+
+def indexar_segmentos(recurso, directorio=None):
+    """Escribe el índice de los segmentos de `recurso` que no lo tienen; devuelve cuántos"""
+    creados = 0
+    for ruta in segmentos(recurso, directorio):
+        if not ruta_indice(ruta).exists():
+            escribir_indice(ruta, _calcular_indice(ruta, recurso))
+            creados += 1
+    return creados
+
+
+def _descartable(indice, nivel, modulo, id_usuario, desde, hasta):
+    if desde and indice['hasta'] and _fecha(indice['hasta']) < desde:
+        return True
+    if hasta and indice['desde'] and _fecha(indice['desde']) > hasta:
+        return True
+    if nivel and not indice['niveles'].get(nivel):
+        return True
+    if modulo and modulo not in indice['modulos']:
+        return True
+    if id_usuario is not None and indice['usuarios'] is not None and id_usuario not in indice['usuarios']:
+        return True
+    return False
+
+
+def _coincide(fila, campo, nivel, modulo, id_usuario, desde, hasta):
+    if nivel and fila.get('nivel') != nivel:
+        return False
+    if modulo and fila.get('modulo') != modulo:
+        return False
+    if id_usuario is not None and fila.get('id_usuario') != id_usuario:
+        return False
+    if desde or hasta:
+        fecha = _fecha(fila[campo])
+        if (desde and fecha < desde) or (hasta and fecha > hasta):
+            return False
+    return True
+
+
+def buscar(recurso, nivel=None, modulo=None, id_usuario=None, desde=None, hasta=None,
+           limite=100, cursor=None, directorio=None):
+    """
+    Devuelve {'resultados', 'siguiente', 'segmentos_leidos',
+    'segmentos_omitidos'}; 'siguiente' es el cursor para continuar o None.
+    """
+    _, campo = POLITICAS[recurso]
+    nivel = nivel.upper() if nivel else None
+    desde, hasta = _utc(desde), _utc(hasta)
+
+    segmento_inicial, linea_inicial = None, -1
+    if cursor:
+        try:
+            segmento_inicial, linea = cursor.rsplit(':', 1)
+            linea_inicial = int(linea)
+        except ValueError:
+            raise CursorArchivoInvalido('Cursor inválido')
+
+    resultado = {'resultados': [], 'siguiente': None, 'segmentos_leidos': 0, 'segmentos_omitidos': 0}
+    for ruta in segmentos(recurso, directorio, desde, hasta):
+        if segmento_inicial and ruta.name < segmento_inicial:
+            continue
+        indice = leer_indice(ruta)
+        if indice is not None and _descartable(indice, nivel, modulo, id_usuario, desde, hasta):
+            resultado['segmentos_omitidos'] += 1
+            continue
+
+        resultado['segmentos_leidos'] += 1
+        saltar_hasta = linea_inicial if ruta.name == segmento_inicial else -1
+        for numero, fila in enumerate(leer_filas(ruta)):
+            if numero <= saltar_hasta or not _coincide(fila, campo, nivel, modulo, id_usuario, desde, hasta):
+                continue
+            if len(resultado['resultados']) == limite:
+                # Hay al menos una coincidencia más
+                ultimo = resultado['resultados'][-1]
+                resultado['siguiente'] = f"{ultimo['_segmento']}:{ultimo['_linea']}"
+                break
+            resultado['resultados'].append(dict(fila, _segmento=ruta.name, _linea=numero))
+        if resultado['siguiente']:
+            break
+
+    for fila in resultado['resultados']:
+        del fila['_segmento'], fila['_linea']
+    return resultado
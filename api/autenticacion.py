@@ -0,0 +1,227 @@
+"""
+Autenticación por token de sesión.
+
+Los tokens se buscan por su SHA-256, que es lo único que se guarda
+(Sesion.token_sesion, con índice único). Las sesiones válidas se guardan en
+una caché en memoria por proceso, LRU y con vencimiento: cada entrada dura
+SESIONES_CACHE_TTL segundos como máximo y nunca más allá de la
+fecha_expiracion de la sesión.
+
+Las señales de Sesion y Usuario invalidan las entradas afectadas (sesión
+desactivada, usuario bloqueado o inactivo). Como las señales solo llegan al
+proceso que hizo el cambio, en los demás workers la revocación tarda a lo
+sumo el TTL. Las actualizaciones masivas (QuerySet.update) no emiten
+señales y deben llamar a invalidar_sesion()/invalidar_usuario().
+"""
+import collections
+import copy
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+
+from . import accesos
+from .models import Empleado, Usuario, Sesion
+
+PALABRA_CLAVE = 'Bearer'
+
+
+def hash_token(token):
+    """SHA-256 en hexadecimal (64 caracteres) del token de sesión"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def usuario_habilitado(usuario):
+    return usuario.estado == 'activo' and not usuario.bloqueado
+
+
+def _campos(instancia):
+    return [f.attname for f in instancia._meta.concrete_fields]
+
+
+def _instantanea(instancia):
+    campos = _campos(instancia)
+    return campos, copy.deepcopy([getattr(instancia, campo) for campo in campos])
+
+
+def _reconstruir(modelo, instantanea):
+    # Una instancia nueva por petición: las vistas pueden modificarla sin
+    # afectar a la copia en caché
+    campos, valores = instantanea
+    return modelo.from_db('default', campos, copy.deepcopy(valores))
+
+
+# =============================================
+# CACHÉ DE SESIONES
+# =============================================
+
+class CacheSesiones:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entradas = collections.OrderedDict()
+        self._por_usuario = {}
+        self._generacion = 0
+        self.contadores = {'aciertos': 0, 'fallos': 0, 'invalidaciones': 0}
+
+    def generacion(self):
+        return self._generacion
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada[0] <= time.monotonic():
+                if entrada is not None:
+                    self._quitar(clave)
+                self.contadores['fallos'] += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.contadores['aciertos'] += 1
+        _, _, empleado, usuario, sesion = entrada
+        sesion = _reconstruir(Sesion, sesion)
+        sesion.id_usuario = _reconstruir(Usuario, usuario)
+        # El empleado (y su rol) va incluido para los permisos (api.permisos)
+        sesion.id_usuario.id_empleado = _reconstruir(Empleado, empleado)
+        return sesion.id_usuario, sesion
+
+    def guardar(self, clave, sesion, generacion):
+        """
+        Guarda la sesión salvo que haya habido una invalidación desde
+        `generacion` (la lectura de la base de datos podría ser anterior).
+        """
+        restante = (sesion.fecha_expiracion - timezone.now()).total_seconds()
+        duracion = min(getattr(settings, 'SESIONES_CACHE_TTL', 60), restante)
+        if duracion <= 0:
+            return
+        maximo = getattr(settings, 'SESIONES_CACHE_MAXIMO', 10000)
+        usuario = sesion.id_usuario
+        instantaneas = (_instantanea(usuario.id_empleado), _instantanea(usuario), _instantanea(sesion))
+        with self._lock:
+            if generacion != self._generacion:
+                return
+            self._quitar(clave)
+            self._entradas[clave] = (time.monotonic() + duracion, usuario.pk) + instantaneas
+            self._por_usuario.setdefault(usuario.pk, set()).add(clave)
+            while len(self._entradas) > maximo:
+                self._quitar(next(iter(self._entradas)))
+
+    def _quitar(self, clave):
+        entrada = self._entradas.pop(clave, None)
+        if entrada is None:
+            return
+        id_usuario = entrada[1]
+        claves = self._por_usuario.get(id_usuario)
+        if claves is not None:
+            claves.discard(clave)
+            if not claves:
+                del self._por_usuario[id_usuario]
+
+    def invalidar(self, clave):
+        with self._lock:
+            self._generacion += 1
+            self.contadores['invalidaciones'] += 1
+            self._quitar(clave)
+
+    def invalidar_usuario(self, id_usuario):
+        with self._lock:
+            self._generacion += 1
+            self.contadores['invalidaciones'] += 1
+            for clave in list(self._por_usuario.get(id_usuario, ())):
+                self._quitar(clave)
+
+    def limpiar(self):
+        with self._lock:
+            self._generacion += 1
+            self._entradas.clear()
+            self._por_usuario.clear()
+
+    def estadisticas(self):
+        with self._lock:
+            return dict(self.contadores, entradas=len(self._entradas))
+
+
+cache = CacheSesiones()
+
+
+def invalidar_sesion(token_sesion):
+    if token_sesion:
+        cache.invalidar(token_sesion)
+
+
+def invalidar_usuario(id_usuario):
+    cache.invalidar_usuario(id_usuario)
+
+
+# =============================================
+# VALIDACIÓN DE TOKENS
+# =============================================
+
+def token_de_peticion(request):
+    """Token de la cabecera 'Authorization: Bearer <token>' o None"""
+    partes = get_authorization_header(request).split()
+    if len(partes) != 2 or partes[0].lower() != PALABRA_CLAVE.lower().encode():
+        return None
+    try:
+        return partes[1].decode()
+    except UnicodeError:
+        return None
+
+
+def validar_token(token):
+    """(usuario, sesión) si el token corresponde a una sesión vigente, o None"""
+    clave = hash_token(token)
+    resultado = cache.obtener(clave)
+    if resultado is not None:
+        return resultado
+
+    generacion = cache.generacion()
+    sesion = (
+        Sesion.objects.select_related('id_usuario__id_empleado')
+        .filter(token_sesion=clave, activa=True, fecha_expiracion__gt=timezone.now())
+        .first()
+    )
+    if sesion is None or not usuario_habilitado(sesion.id_usuario):
+        return None
+    cache.guardar(clave, sesion, generacion)
+    return sesion.id_usuario, sesion
+
+
+_NO_VALIDADA = object()
+
+
+def autenticar_peticion(request):
+    """
+    Valida el token de la petición una sola vez (el middleware y DRF
+    comparten el resultado). Devuelve (usuario, sesión), None si el token
+    no es válido, o _NO_VALIDADA si la petición no trae token.
+    """
+    resultado = getattr(request, '_sesion_validada', _NO_VALIDADA)
+    if resultado is not _NO_VALIDADA:
+        return resultado
+    token = token_de_peticion(request)
+    resultado = validar_token(token) if token else _NO_VALIDADA
+    if isinstance(resultado, tuple):
+        usuario, sesion = resultado
+        accesos.registro.registrar(usuario.pk, sesion.pk)
+    request._sesion_validada = resultado
+    return resultado
+
+
+class AutenticacionTokenSesion(BaseAuthentication):
+    """
+    Autenticación de DRF con 'Authorization: Bearer <token>'. Deja el
+    Usuario en request.user y la Sesion en request.auth.
+    """
+    def authenticate(self, request):
+        resultado = autenticar_peticion(request._request)
+        if resultado is _NO_VALIDADA:
+            return None
+        if resultado is None:
+            raise AuthenticationFailed('Token de sesión inválido o expirado')
+        return resultado
+
+    def authenticate_header(self, request):
+        return PALABRA_CLAVE
@@ -0,0 +1,332 @@
+"""
+Índice en memoria para el autocompletado del directorio de empleados.
+
+Cada proceso mantiene su propio índice, cargado en la primera consulta y
+actualizado con las señales post_save/post_delete de Empleado. Como las
+señales solo llegan al proceso que hizo el cambio, el índice se recarga
+completo cada AUTOCOMPLETADO_TTL segundos para acotar la desactualización
+entre workers. Solo un hilo carga a la vez: la primera carga la esperan las
+consultas concurrentes y las recargas se hacen en un hilo de fondo mientras
+se sigue respondiendo con el índice anterior.
+
+Las consultas no tocan la base de datos:
+- prefijo: búsqueda binaria sobre la lista ordenada de tokens;
+- tolerancia a errores: para términos de 3 o más letras sin suficientes
+  coincidencias por prefijo, los tokens que comparten suficientes trigramas
+  además del inicial (como mucho MAX_CANDIDATOS_SIMILITUD, los que más
+  comparten) se puntúan por similitud de Jaccard o por distancia de edición
+  (con transposiciones) contra el token o su prefijo.
+
+Las consultas toman bajo el lock la referencia a las estructuras vigentes y
+puntúan sin retenerlo. Las estructuras publicadas no se modifican: cada
+cambio por señal trabaja sobre una copia de los diccionarios de primer
+nivel y la publica al terminar.
+"""
+import bisect
+import collections
+import heapq
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .busqueda import tokenizar
+from .lotes import iterar_lotes
+from .models import Empleado
+
+logger = logging.getLogger(__name__)
+
+CAMPOS = ('id_empleado', 'nombres', 'apellidos', 'email', 'numero_documento', 'estado')
+
+PUNTAJE_EXACTO = 3.0
+PUNTAJE_PREFIJO = 2.0
+SIMILITUD_MINIMA = 0.4
+MAX_CANDIDATOS_SIMILITUD = 50
+
+
+def _trigramas(token):
+    relleno = f'  {token} '
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+def _distancia(a, b, limite):
+    """
+    Distancia de edición con transposiciones de letras adyacentes (OSA),
+    calculada solo en la banda |i - j| <= limite. Si supera `limite`
+    devuelve limite + 1.
+    """
+    fuera = limite + 1
+    if abs(len(a) - len(b)) > limite:
+        return fuera
+    anterior2 = None
+    anterior = [j if j <= limite else fuera for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        actual = [i if i <= limite else fuera] + [fuera] * len(b)
+        for j in range(max(1, i - limite), min(len(b), i + limite) + 1):
+            costo = 0 if a[i - 1] == b[j - 1] else 1
+            actual[j] = min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + costo, fuera)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                actual[j] = min(actual[j], anterior2[j - 2] + 1)
+        # La transposición mira dos filas atrás: se corta si ambas superan el límite
+        if min(actual) > limite and min(anterior) > limite:
+            return fuera
+        anterior2, anterior = anterior, actual
+    return anterior[len(b)]
+
+
+def _tokens_entrada(entrada):
+    tokens = set()
+    for campo in ('nombres', 'apellidos', 'email', 'numero_documento'):
+        tokens.update(tokenizar(entrada[campo]))
+    return tokens
+
+
+class _Datos:
+    """
+    Estructuras de un índice. Una instancia ya publicada no se modifica: los
+    cambios se aplican sobre copia() y la copia reemplaza a la original, así
+    una consulta puntúa sobre la referencia que tomó sin retener el lock.
+    """
+    def __init__(self):
+        self.entradas = {}
+        self.tokens_por_id = {}
+        self.ids_por_token = {}
+        self.tokens_ordenados = []
+        self.tokens_por_trigrama = {}
+        # Los conjuntos de una copia siguen siendo los de la original hasta modificarlos
+        self._compartido = False
+
+    def copia(self):
+        datos = _Datos()
+        datos.entradas = dict(self.entradas)
+        datos.tokens_por_id = dict(self.tokens_por_id)
+        datos.ids_por_token = dict(self.ids_por_token)
+        datos.tokens_ordenados = list(self.tokens_ordenados)
+        datos.tokens_por_trigrama = dict(self.tokens_por_trigrama)
+        datos._compartido = True
+        return datos
+
+    def _conjunto(self, tabla, clave):
+        """El conjunto tabla[clave], copiado antes de modificarlo si es compartido"""
+        conjunto = tabla.get(clave)
+        if conjunto is not None and self._compartido:
+            conjunto = tabla[clave] = set(conjunto)
+        return conjunto
+
+    def agregar(self, entrada, ordenar=True):
+        """Agrega la entrada; con ordenar=False el llamador ordena los tokens al final"""
+        id_empleado = entrada['id_empleado']
+        tokens = _tokens_entrada(entrada)
+        self.entradas[id_empleado] = {
+            'id_empleado': id_empleado,
+            'nombre_completo': f"{entrada['nombres']} {entrada['apellidos']}",
+            'email': entrada['email'],
+            'numero_documento': entrada['numero_documento'],
+            'estado': entrada['estado'],
+        }
+        self.tokens_por_id[id_empleado] = tokens
+        for token in tokens:
+            ids = self._conjunto(self.ids_por_token, token)
+            if ids is None:
+                ids = self.ids_por_token[token] = set()
+                if ordenar:
+                    bisect.insort(self.tokens_ordenados, token)
+                for trigrama in _trigramas(token):
+                    tokens_trigrama = self._conjunto(self.tokens_por_trigrama, trigrama)
+                    if tokens_trigrama is None:
+                        tokens_trigrama = self.tokens_por_trigrama[trigrama] = set()
+                    tokens_trigrama.add(token)
+            ids.add(id_empleado)
+
+    def quitar(self, id_empleado):
+        self.entradas.pop(id_empleado, None)
+        for token in self.tokens_por_id.pop(id_empleado, ()):
+            ids = self._conjunto(self.ids_por_token, token)
+            if ids is None:
+                continue
+            ids.discard(id_empleado)
+            if ids:
+                continue
+            del self.ids_por_token[token]
+            posicion = bisect.bisect_left(self.tokens_ordenados, token)
+            if posicion < len(self.tokens_ordenados) and self.tokens_ordenados[posicion] == token:
+                self.tokens_ordenados.pop(posicion)
+            for trigrama in _trigramas(token):
+                tokens = self._conjunto(self.tokens_por_trigrama, trigrama)
+                if tokens is not None:
+                    tokens.discard(token)
+                    if not tokens:
+                        del self.tokens_por_trigrama[trigrama]
+
+    def por_prefijo(self, termino):
+        """{token: puntaje} de los tokens que empiezan por `termino`"""
+        encontrados = {}
+        posicion = bisect.bisect_left(self.tokens_ordenados, termino)
+        while posicion < len(self.tokens_ordenados):
+            token = self.tokens_ordenados[posicion]
+            if not token.startswith(termino):
+                break
+            encontrados[token] = PUNTAJE_EXACTO if token == termino else PUNTAJE_PREFIJO
+            posicion += 1
+        return encontrados
+
+    def por_similitud(self, termino):
+        """{token: similitud} de los tokens parecidos a `termino` (errores de tipeo)"""
+        trigramas = _trigramas(termino)
+        inicial = f'  {termino[0]}'
+        # El trigrama inicial lo comparten todos los tokens con la misma
+        # primera letra: no cuenta para elegir candidatos, solo para puntuar
+        compartidos = collections.Counter()
+        for trigrama in trigramas - {inicial}:
+            compartidos.update(self.tokens_por_trigrama.get(trigrama, ()))
+        errores_permitidos = 1 if len(termino) < 7 else 2
+        # Cada error (incluida una transposición) cambia como mucho 4 trigramas
+        # y el de cierre no está en un prefijo; Jaccard >= SIMILITUD_MINIMA
+        # exige compartir al menos esa fracción de los del término
+        minimo = max(1, min(
+            len(trigramas) - 2 - 4 * errores_permitidos,
+            math.ceil(SIMILITUD_MINIMA * len(trigramas)) - 1,
+        ))
+        candidatos = [
+            (token, comunes + (token[0] == termino[0]))
+            for token, comunes in compartidos.most_common(MAX_CANDIDATOS_SIMILITUD)
+            if comunes >= minimo
+        ]
+        encontrados = {}
+        for token, comunes in candidatos:
+            similitud = comunes / (len(trigramas) + len(_trigramas(token)) - comunes)
+            distancia = _distancia(termino, token[:len(termino)], errores_permitidos)
+            if distancia > errores_permitidos and len(token) > len(termino):
+                distancia = _distancia(termino, token, errores_permitidos)
+            if distancia <= errores_permitidos:
+                similitud = max(similitud, 1 - distancia / len(termino))
+            if similitud >= SIMILITUD_MINIMA:
+                encontrados[token] = similitud
+        return encontrados
+
+class IndiceAutocompletado:
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._lock_carga = threading.Lock()
+        self._cargado_en = None
+        # {id_empleado: entrada o None} recibidos por señales durante una carga
+        self._cambios_durante_carga = None
+        self._datos = _Datos()
+
+    # -----------------------------------------
+    # Carga y actualización
+    # -----------------------------------------
+    def _asegurar_cargado(self):
+        if self._cargado_en is None:
+            with self._lock_carga:
+                if self._cargado_en is None:
+                    self._cargar()
+        elif self.ttl is not None and time.monotonic() - self._cargado_en > self.ttl:
+            if self._lock_carga.acquire(blocking=False):
+                threading.Thread(target=self._recargar_en_segundo_plano, name='recarga-autocompletado', daemon=True).start()
+
+    def _recargar_en_segundo_plano(self):
+        try:
+            self._cargar()
+        except Exception:
+            logger.exception('No se pudo recargar el índice de autocompletado')
+        finally:
+            self._lock_carga.release()
+            close_old_connections()
+
+    def cargar(self):
+        """Reconstruye el índice completo desde la base de datos"""
+        with self._lock_carga:
+            self._cargar()
+
+    def _cargar(self):
+        with self._lock:
+            self._cambios_durante_carga = {}
+        try:
+            nuevo = _Datos()
+            for lote in iterar_lotes(Empleado.objects.all(), CAMPOS, tamano_lote=5000):
+                for entrada in lote:
+                    nuevo.agregar(entrada, ordenar=False)
+            nuevo.tokens_ordenados = sorted(nuevo.ids_por_token)
+            with self._lock:
+                # Las señales llegadas durante la carga pueden ser posteriores a lo leído
+                for id_empleado, entrada in self._cambios_durante_carga.items():
+                    nuevo.quitar(id_empleado)
+                    if entrada is not None:
+                        nuevo.agregar(entrada)
+                self._datos = nuevo
+                self._cargado_en = time.monotonic()
+        finally:
+            with self._lock:
+                self._cambios_durante_carga = None
+
+    def _aplicar(self, id_empleado, entrada):
+        with self._lock:
+            if self._cambios_durante_carga is not None:
+                self._cambios_durante_carga[id_empleado] = entrada
+            if self._cargado_en is not None:
+                datos = self._datos.copia()
+                datos.quitar(id_empleado)
+                if entrada is not None:
+                    datos.agregar(entrada)
+                self._datos = datos
+
+    def actualizar(self, empleado):
+        """Refleja el alta o modificación de `empleado` si el índice está cargado o cargándose"""
+        if self._cargado_en is None and self._cambios_durante_carga is None:
+            return
+        if any(campo not in empleado.__dict__ for campo in CAMPOS):
+            entrada = Empleado.objects.filter(pk=empleado.pk).values(*CAMPOS).first()
+        else:
+            entrada = {campo: getattr(empleado, campo) for campo in CAMPOS}
+        self._aplicar(empleado.pk, entrada)
+
+    def eliminar(self, id_empleado):
+        if self._cargado_en is None and self._cambios_durante_carga is None:
+            return
+        self._aplicar(id_empleado, None)
+
+    # -----------------------------------------
+    # Consulta
+    # -----------------------------------------
+    def buscar(self, consulta, limite=10, estado='activo'):
+        """
+        Devuelve hasta `limite` entradas ordenadas por puntaje, solo de
+        empleados en `estado` (None para todos)
+        """
+        terminos = tokenizar(consulta)
+        if not terminos:
+            return []
+        self._asegurar_cargado()
+
+        with self._lock:
+            datos = self._datos
+        puntajes = {}
+        for termino in terminos:
+            tokens = datos.por_prefijo(termino)
+            if len(termino) >= 3 and sum(len(datos.ids_por_token[t]) for t in tokens) < limite:
+                for token, similitud in datos.por_similitud(termino).items():
+                    tokens.setdefault(token, similitud)
+            # Por término se toma el mejor token de cada empleado
+            mejor = {}
+            for token, puntaje in tokens.items():
+                for id_empleado in datos.ids_por_token[token]:
+                    if estado is not None and datos.entradas[id_empleado]['estado'] != estado:
+                        continue
+                    if puntaje > mejor.get(id_empleado, 0):
+                        mejor[id_empleado] = puntaje
+            for id_empleado, puntaje in mejor.items():
+                puntajes[id_empleado] = puntajes.get(id_empleado, 0) + puntaje
+
+        mejores = heapq.nsmallest(
+            limite, puntajes.items(),
+            key=lambda item: (-item[1], datos.entradas[item[0]]['nombre_completo'], item[0])
+        )
+        return [dict(datos.entradas[id_empleado], puntaje=round(puntaje, 3)) for id_empleado, puntaje in mejores]
+
+
+indice = IndiceAutocompletado(ttl=getattr(settings, 'AUTOCOMPLETADO_TTL', 300))
@@ -0,0 +1,175 @@
+"""
+Búsqueda indexada y con ranking de empleados.
+
+- En MariaDB/MySQL se usa un índice FULLTEXT sobre (nombres, apellidos,
+  email) con MATCH ... AGAINST en modo booleano y prefijos (término*). La
+  collation de las columnas ya ignora tildes y mayúsculas.
+- En otros motores (SQLite en desarrollo) se mantiene la tabla
+  empleados_tokens_busqueda con tokens normalizados, y cada término se busca
+  como rango [término, término + U+FFFF) sobre su índice.
+
+Los tokens se normalizan como compara la collation general_ci (sin tildes,
+minúsculas y la ñ como n) y salen de las mismas columnas que el FULLTEXT,
+para que ambos motores encuentren lo mismo. El numero_documento no se
+indexa en ninguno: una coincidencia exacta de documento o email se resuelve
+antes con su índice único. Única diferencia que queda: FULLTEXT ignora los
+términos de menos de LONGITUD_MINIMA_FULLTEXT letras, y si no queda ninguno
+la vista recurre a la búsqueda por subcadena.
+"""
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Max, Q, When
+from django.db.models.expressions import RawSQL
+
+from .models import Empleado, EmpleadoTokenBusqueda
+
+# Las mismas columnas que el índice FULLTEXT
+CAMPOS_INDEXADOS = ('nombres', 'apellidos', 'email')
+
+# Longitud mínima de término para InnoDB FULLTEXT (innodb_ft_min_token_size)
+LONGITUD_MINIMA_FULLTEXT = 3
+
+_SEPARADORES = re.compile(r'[^0-9a-z]+')
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes (la ñ queda como n), como la collation general_ci"""
+    texto = (texto or '').lower()
+    return ''.join(
+        caracter for caracter in unicodedata.normalize('NFKD', texto)
+        if not unicodedata.combining(caracter)
+    )
+
+
+def tokenizar(texto):
+    """Tokens normalizados y únicos, en orden de aparición"""
+    tokens = []
+    for token in _SEPARADORES.split(normalizar(texto)):
+        if token and token not in tokens:
+            tokens.append(token[:100])
+    return tokens
+
+
+def usa_fulltext():
+    return connection.vendor == 'mysql'
+
+
+# =============================================
+# MANTENIMIENTO DE LA TABLA DE TOKENS
+# =============================================
+
+def tokens_empleado(empleado):
+    tokens = []
+    for campo in CAMPOS_INDEXADOS:
+        for token in tokenizar(getattr(empleado, campo)):
+            if token not in tokens:
+                tokens.append(token)
+    return tokens
+
+
+def indexar_empleado(empleado):
+    """Reemplaza los tokens de `empleado` (solo fuera de MariaDB/MySQL)"""
+    if usa_fulltext():
+        return
+    EmpleadoTokenBusqueda.objects.filter(id_empleado=empleado.pk).delete()
+    EmpleadoTokenBusqueda.objects.bulk_create([
+        EmpleadoTokenBusqueda(id_empleado_id=empleado.pk, token=token)
+        for token in tokens_empleado(empleado)
+    ])
+
+
+def reindexar_todo(tamano_lote=1000):
+    """Reconstruye la tabla de tokens completa. Devuelve empleados indexados"""
+    if usa_fulltext():
+        return 0
+    EmpleadoTokenBusqueda.objects.all().delete()
+    total = 0
+    empleados = Empleado.objects.only(*CAMPOS_INDEXADOS).order_by('id_empleado')
+    ultimo = 0
+    while True:
+        lote = list(empleados.filter(id_empleado__gt=ultimo)[:tamano_lote])
+        if not lote:
+            return total
+        EmpleadoTokenBusqueda.objects.bulk_create([
+            EmpleadoTokenBusqueda(id_empleado_id=empleado.pk, token=token)
+            for empleado in lote
+            for token in tokens_empleado(empleado)
+        ])
+        total += len(lote)
+        ultimo = lote[-1].pk
+
+
+# =============================================
+# CONSULTA
+# =============================================
+
+def coincidencia_exacta(consulta):
+    """Empleado cuyo documento o email es exactamente `consulta`, o None"""
+    consulta = consulta.strip()
+    if not consulta or ' ' in consulta:
+        return None
+    filtro = Q(numero_documento=consulta)
+    if '@' in consulta:
+        filtro = Q(email__iexact=consulta)
+    return Empleado.objects.select_related('id_departamento', 'id_rol').filter(filtro).first()
+
+
+def _ids_fulltext(tokens, desde, hasta):
+    terminos = [token for token in tokens if len(token) >= LONGITUD_MINIMA_FULLTEXT]
+    if not terminos:
+        return None
+    expresion = ' '.join(f'{termino}*' for termino in terminos)
+    relevancia = RawSQL(
+        'MATCH (nombres, apellidos, email) AGAINST (%s IN BOOLEAN MODE)', [expresion]
+    )
+    return list(
+        Empleado.objects.annotate(relevancia=relevancia)
+        .filter(relevancia__gt=0)
+        .order_by('-relevancia', 'id_empleado')
+        .values_list('id_empleado', flat=True)[desde:hasta]
+    )
+
+
+def _ids_tokens(tokens, desde, hasta):
+    filtro = Q()
+    coincidencias = {}
+    for i, token in enumerate(tokens):
+        rango = Q(token__gte=token, token__lt=token + '\uffff')
+        filtro |= rango
+        # Por término: 2 si hay un token idéntico, 1 si solo coincide el prefijo
+        coincidencias[f'termino_{i}'] = Max(Case(
+            When(token=token, then=2), When(rango, then=1),
+            default=0, output_field=IntegerField()
+        ))
+    puntaje = None
+    for nombre in coincidencias:
+        puntaje = coincidencias[nombre] if puntaje is None else puntaje + coincidencias[nombre]
+    return list(
+        EmpleadoTokenBusqueda.objects.filter(filtro)
+        .values('id_empleado')
+        .annotate(relevancia=puntaje)
+        .order_by('-relevancia', 'id_empleado')
+        .values_list('id_empleado', flat=True)[desde:hasta]
+    )
+
+
+def buscar(consulta, limite=20, desplazamiento=0):
+    """
+    Devuelve hasta `limite` empleados ordenados por relevancia, a partir de
+    la posición `desplazamiento`. Devuelve None si la consulta no tiene
+    términos indexables (la vista recurre a la búsqueda por contenido).
+    """
+    tokens = tokenizar(consulta)
+    if not tokens:
+        return None
+    desde, hasta = desplazamiento, desplazamiento + limite
+    if usa_fulltext():
+        ids = _ids_fulltext(tokens, desde, hasta)
+    else:
+        ids = _ids_tokens(tokens, desde, hasta)
+    if ids is None:
+        return None
+    empleados = Empleado.objects.select_related('id_departamento', 'id_rol').in_bulk(ids)
+    return [empleados[id_empleado] for id_empleado in ids if id_empleado in empleados]
@@ -0,0 +1,151 @@
+"""
+GET condicional (ETag / Last-Modified / 304) para listados y detalles.
+
+Los validadores se calculan con agregados baratos en lugar de serializar la
+respuesta: MAX(fecha_modificacion) y COUNT(*) para empleados y usuarios, y un
+contador de versión (VersionRecurso) para departamentos y roles, que no
+tienen fecha de modificación. Si el cliente envía If-None-Match o
+If-Modified-Since y el recurso no cambió, se responde 304 sin ejecutar la
+vista.
+"""
+import hashlib
+
+from django.db import IntegrityError
+from django.db.models import Count, F, Max
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from .models import Empleado, Usuario, VersionRecurso
+from .filtros import FiltroInvalido, filtrar_empleados, filtrar_usuarios
+
+
+# =============================================
+# VERSIONES DE RECURSOS
+# =============================================
+
+def incrementar_version(recurso):
+    """Incrementa la versión de `recurso`, creando el contador si no existe"""
+    actualizados = VersionRecurso.objects.filter(recurso=recurso).update(
+        version=F('version') + 1, fecha_modificacion=timezone.now()
+    )
+    if not actualizados:
+        try:
+            VersionRecurso.objects.create(recurso=recurso, version=1)
+        except IntegrityError:
+            # Otro proceso lo creó entre el UPDATE y el INSERT
+            incrementar_version(recurso)
+
+
+def obtener_versiones(*recursos):
+    """
+    Devuelve {recurso: (version, fecha_modificacion)} en una sola consulta.
+    Los recursos sin contador se reportan como (0, None).
+    """
+    versiones = {recurso: (0, None) for recurso in recursos}
+    for recurso, version, fecha in VersionRecurso.objects.filter(recurso__in=recursos).values_list(
+        'recurso', 'version', 'fecha_modificacion'
+    ):
+        versiones[recurso] = (version, fecha)
+    return versiones
+
+
+# =============================================
+# VALIDADORES
+# =============================================
+
+def _etag(*partes):
+    return hashlib.md5(repr(partes).encode('utf-8')).hexdigest()
+
+
+def _mas_reciente(*fechas):
+    fechas = [fecha for fecha in fechas if fecha is not None]
+    return max(fechas) if fechas else None
+
+
+def get_condicional(calcular):
+    """
+    Decorador para vistas con GET condicional.
+
+    `calcular(request, *args, **kwargs)` devuelve (etag, last_modified); se
+    evalúa una sola vez por petición y solo para GET/HEAD. Se aplica debajo
+    de @api_view para que la autenticación de DRF corra antes.
+    """
+    def _validadores(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return None, None
+        if not hasattr(request, '_validadores_condicionales'):
+            request._validadores_condicionales = calcular(request, *args, **kwargs) or (None, None)
+        return request._validadores_condicionales
+
+    return condition(
+        etag_func=lambda request, *args, **kwargs: _validadores(request, *args, **kwargs)[0],
+        last_modified_func=lambda request, *args, **kwargs: _validadores(request, *args, **kwargs)[1],
+    )
+
+
+def _agregados(queryset):
+    return queryset.aggregate(ultima=Max('fecha_modificacion'), total=Count('pk'))
+
+
+def validadores_empleados(request):
+    try:
+        empleados = filtrar_empleados(Empleado.objects.all(), request.GET)
+    except FiltroInvalido:
+        return None
+    agregados = _agregados(empleados)
+    versiones = obtener_versiones('empleados', 'departamentos', 'roles')
+    etag = _etag('empleados', agregados, versiones, request.GET.urlencode())
+
+    # Con filtros, una fila que deja de cumplirlos no cambia la fecha máxima
+    # del resultado, así que solo el ETag es confiable
+    if request.GET.get('estado') or request.GET.get('departamento'):
+        return etag, None
+    return etag, _mas_reciente(agregados['ultima'], *[fecha for _, fecha in versiones.values()])
+
+
+def validadores_empleado(request, id_empleado):
+    fila = Empleado.objects.filter(id_empleado=id_empleado).values_list('fecha_modificacion', flat=True).first()
+    if fila is None:
+        return None
+    versiones = obtener_versiones('departamentos', 'roles')
+    etag = _etag('empleado', id_empleado, fila, versiones, request.GET.urlencode())
+    return etag, _mas_reciente(fila, *[fecha for _, fecha in versiones.values()])
+
+
+def validadores_usuarios(request):
+    try:
+        usuarios = filtrar_usuarios(Usuario.objects.all(), request.GET)
+    except FiltroInvalido:
+        return None
+    # El listado incluye los datos del empleado: solo cuentan los empleados
+    # de los usuarios filtrados, no la tabla completa
+    agregados_usuarios = _agregados(usuarios)
+    agregados_empleados = _agregados(Empleado.objects.filter(pk__in=usuarios.values('id_empleado')))
+    versiones = obtener_versiones('usuarios', 'empleados', 'departamentos', 'roles')
+    etag = _etag('usuarios', agregados_usuarios, agregados_empleados, versiones, request.GET.urlencode())
+
+    if request.GET.get('estado'):
+        return etag, None
+    return etag, _mas_reciente(
+        agregados_usuarios['ultima'], agregados_empleados['ultima'],
+        *[fecha for _, fecha in versiones.values()]
+    )
+
+
+def validadores_departamentos(request):
+    versiones = obtener_versiones('departamentos')
+    version, fecha = versiones['departamentos']
+    return _etag('departamentos', version, request.GET.urlencode()), fecha
+
+
+def validadores_departamento(request, id_departamento):
+    # El detalle incluye los empleados del departamento
+    agregados = _agregados(Empleado.objects.filter(id_departamento=id_departamento))
+    versiones = obtener_versiones('departamentos', 'roles')
+    return _etag('departamento', id_departamento, agregados, versiones, request.GET.urlencode()), None
+
+
+def validadores_roles(request, id_departamento=None):
+    versiones = obtener_versiones('roles', 'departamentos')
+    etag = _etag('roles', id_departamento, versiones, request.GET.urlencode())
+    return etag, _mas_reciente(*[fecha for _, fecha in versiones.values()])
@@ -0,0 +1,424 @@
+"""
+Contadores mantenidos para estadisticas_generales, estadisticas_departamentos
+y el número de notificaciones sin leer de cada usuario.
+
+Cada alta, cambio o baja de los modelos involucrados aplica un delta con
+UPDATE ... SET campo = campo + n sobre una de las CONTADORES_FRAGMENTOS
+filas de EstadisticaGeneral, en la misma conexión que el guardado (y por
+tanto en su transacción cuando el guardado ocurre dentro de un atomic()).
+Cada hilo escribe siempre en el mismo fragmento, elegido al azar, así las
+escrituras concurrentes no compiten por una única fila y una transacción
+nunca bloquea dos fragmentos. El valor de un contador es la suma de los
+fragmentos. Las operaciones masivas (QuerySet.update(), bulk_create) no
+emiten señales y deben ajustar los contadores con `aplicar_deltas`;
+cualquier deriva restante se corrige con `reconciliar()`,
+`reconstruir_departamentos()` y `reconciliar_no_leidas_usuarios()`.
+"""
+import random
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .lotes import iterar_lotes
+from .models import (
+    Departamento, Rol, Empleado, Usuario, Sesion, Notificacion,
+    EstadisticaGeneral, DepartamentoEstadistica, ContadorNotificacionesUsuario
+)
+from .seguimiento import NO_CARGADO, valores_previos, valores_actuales
+
+# Fila principal: la reconciliación deja en ella los valores reales y los
+# demás fragmentos en cero
+ID_FILA = 1
+
+_local = threading.local()
+
+# (contador, modelo, condición (campo, valor) o None para contar todas las filas)
+METRICAS = [
+    ('total_empleados', Empleado, None),
+    ('empleados_activos', Empleado, ('estado', 'activo')),
+    ('total_departamentos', Departamento, ('estado', 'activo')),
+    ('total_roles', Rol, ('estado', 'activo')),
+    ('usuarios_activos', Usuario, ('estado', 'activo')),
+    ('sesiones_activas', Sesion, ('activa', True)),
+    ('notificaciones_no_leidas', Notificacion, ('leida', False)),
+]
+
+CONTADORES = [contador for contador, _, _ in METRICAS]
+
+
+def campos_seguidos():
+    """{modelo: campos} que deben registrarse con seguir_campos"""
+    campos = {
+        Empleado: {'id_departamento_id', 'estado'},
+        Notificacion: {'id_usuario_id', 'leida'},
+    }
+    for _, modelo, condicion in METRICAS:
+        campos.setdefault(modelo, set())
+        if condicion:
+            campos[modelo].add(condicion[0])
+    return campos
+
+
+def _cumple(condicion, valores):
+    """True/False, o None si el valor no se conoce (campo diferido)"""
+    if condicion is None:
+        return True
+    valor = valores.get(condicion[0], NO_CARGADO)
+    if valor is NO_CARGADO:
+        return None
+    return valor == condicion[1]
+
+
+def fragmentos():
+    return max(1, getattr(settings, 'CONTADORES_FRAGMENTOS', 16))
+
+
+def _fragmento_del_hilo():
+    fila = getattr(_local, 'fila', None)
+    if fila is None or fila > fragmentos():
+        fila = _local.fila = random.randint(1, fragmentos())
+    return fila
+
+
+def aplicar_deltas(deltas):
+    """Suma `deltas` ({contador: n}) al fragmento del hilo en un solo UPDATE"""
+    deltas = {contador: n for contador, n in deltas.items() if n}
+    if not deltas:
+        return
+    cambios = dict(
+        fecha_actualizacion=timezone.now(),
+        **{contador: F(contador) + n for contador, n in deltas.items()}
+    )
+    fila = _fragmento_del_hilo()
+    if not EstadisticaGeneral.objects.filter(pk=fila).update(**cambios) and fila != ID_FILA:
+        # Los fragmentos se crean al reconciliar; hasta entonces, la fila principal
+        EstadisticaGeneral.objects.filter(pk=ID_FILA).update(**cambios)
+
+
+def registrar_guardado(instance, created):
+    deltas = {}
+    actuales = valores_actuales(instance)
+    previos = None if created else valores_previos(instance)
+    for contador, modelo, condicion in METRICAS:
+        if not isinstance(instance, modelo):
+            continue
+        ahora = _cumple(condicion, actuales)
+        antes = False if created else _cumple(condicion, previos)
+        if ahora is None or antes is None:
+            continue
+        deltas[contador] = int(ahora) - int(antes)
+    aplicar_deltas(deltas)
+
+
+def registrar_eliminacion(instance):
+    deltas = {}
+    actuales = valores_actuales(instance)
+    for contador, modelo, condicion in METRICAS:
+        if isinstance(instance, modelo) and _cumple(condicion, actuales):
+            deltas[contador] = -1
+    aplicar_deltas(deltas)
+
+
+def calcular_en_vivo():
+    """Calcula los contadores directamente sobre las tablas"""
+    return {
+        'total_empleados': Empleado.objects.count(),
+        'empleados_activos': Empleado.objects.filter(estado='activo').count(),
+        'total_departamentos': Departamento.objects.filter(estado='activo').count(),
+        'total_roles': Rol.objects.filter(estado='activo').count(),
+        'usuarios_activos': Usuario.objects.filter(estado='activo').count(),
+        'sesiones_activas': Sesion.objects.filter(activa=True).count(),
+        'notificaciones_no_leidas': Notificacion.objects.filter(leida=False).count(),
+    }
+
+
+def _sumar_fragmentos():
+    return EstadisticaGeneral.objects.aggregate(
+        fecha_actualizacion=Max('fecha_actualizacion'),
+        **{contador: Sum(contador) for contador in CONTADORES}
+    )
+
+
+def obtener_contadores():
+    """
+    Lee los contadores sumando los fragmentos en una sola consulta. Si aún
+    no existen se construyen con una reconciliación.
+    """
+    fila = _sumar_fragmentos()
+    if fila['fecha_actualizacion'] is None:
+        reconciliar()
+        fila = _sumar_fragmentos()
+    return fila
+
+
+def reconciliar():
+    """
+    Recalcula los contadores en vivo y los guarda en la fila principal,
+    dejando los demás fragmentos en cero. Devuelve
+    {contador: (valor_anterior, valor_real)} para los que tenían deriva.
+    """
+    ahora = timezone.now()
+    total_fragmentos = fragmentos()
+    with transaction.atomic():
+        # Los fragmentos se bloquean antes de contar: los deltas concurrentes
+        # esperan a que termine y los ya aplicados están confirmados, así que
+        # el conteo los incluye
+        existentes = set(EstadisticaGeneral.objects.select_for_update().order_by('pk').values_list('pk', flat=True))
+        anteriores = _sumar_fragmentos() if existentes else {}
+        reales = calcular_en_vivo()
+
+        EstadisticaGeneral.objects.update_or_create(
+            pk=ID_FILA, defaults=dict(reales, fecha_reconciliacion=ahora)
+        )
+        ceros = dict({contador: 0 for contador in CONTADORES}, fecha_reconciliacion=ahora)
+        EstadisticaGeneral.objects.filter(pk__gt=ID_FILA, pk__lte=total_fragmentos).update(**ceros)
+        EstadisticaGeneral.objects.filter(pk__gt=total_fragmentos).delete()
+        EstadisticaGeneral.objects.bulk_create([
+            EstadisticaGeneral(pk=fila, **ceros)
+            for fila in range(ID_FILA + 1, total_fragmentos + 1) if fila not in existentes
+        ], ignore_conflicts=True)
+    return {
+        contador: (anteriores.get(contador), valor)
+        for contador, valor in reales.items()
+        if anteriores.get(contador) != valor
+    }
+
+
+# =============================================
+# ESTADÍSTICAS POR DEPARTAMENTO
+# =============================================
+
+COLUMNAS_ESTADO = {
+    'activo': 'empleados_activos',
+    'inactivo': 'empleados_inactivos',
+    'suspendido': 'empleados_suspendidos',
+}
+
+
+def _aplicar_delta_departamento(id_departamento, estado, delta):
+    """
+    Suma `delta` al total y a la columna de `estado` del departamento. Si la
+    fila no existe y el delta es positivo se reconstruye esa fila; con delta
+    negativo no se crea (el departamento puede estar borrándose en cascada).
+    """
+    cambios = {'total_empleados': F('total_empleados') + delta}
+    columna = COLUMNAS_ESTADO.get(estado)
+    if columna:
+        cambios[columna] = F(columna) + delta
+    actualizados = DepartamentoEstadistica.objects.filter(pk=id_departamento).update(
+        fecha_actualizacion=timezone.now(), **cambios
+    )
+    if not actualizados and delta > 0:
+        reconstruir_departamentos([id_departamento])
+
+
+def registrar_empleado_guardado(instance, created):
+    actuales = valores_actuales(instance)
+    nuevo = (actuales.get('id_departamento_id'), actuales.get('estado'))
+    if created:
+        anterior = None
+    else:
+        previos = valores_previos(instance)
+        anterior = (previos.get('id_departamento_id'), previos.get('estado'))
+        if anterior == nuevo or NO_CARGADO in anterior or NO_CARGADO in nuevo:
+            return
+    if anterior is not None:
+        _aplicar_delta_departamento(anterior[0], anterior[1], -1)
+    _aplicar_delta_departamento(nuevo[0], nuevo[1], 1)
+
+
+def registrar_empleado_eliminado(instance):
+    actuales = valores_actuales(instance)
+    if NO_CARGADO in (actuales.get('id_departamento_id'), actuales.get('estado')):
+        return
+    _aplicar_delta_departamento(actuales['id_departamento_id'], actuales['estado'], -1)
+
+
+def registrar_departamento_creado(instance):
+    DepartamentoEstadistica.objects.get_or_create(id_departamento=instance)
+
+
+def estadisticas_departamentos_en_vivo():
+    """Conteo por departamento calculado sobre la tabla de empleados"""
+    return Departamento.objects.annotate(
+        total_empleados=Count('empleado'),
+        empleados_activos=Count('empleado', filter=Q(empleado__estado='activo')),
+        empleados_inactivos=Count('empleado', filter=Q(empleado__estado='inactivo')),
+        empleados_suspendidos=Count('empleado', filter=Q(empleado__estado='suspendido'))
+    ).values(
+        'id_departamento', 'nombre', 'total_empleados',
+        'empleados_activos', 'empleados_inactivos', 'empleados_suspendidos'
+    )
+
+
+def estadisticas_departamentos_materializadas():
+    """Conteo por departamento leído de departamento_estadisticas"""
+    return Departamento.objects.values(
+        'id_departamento', 'nombre',
+        total_empleados=Coalesce(F('estadisticas__total_empleados'), 0),
+        empleados_activos=Coalesce(F('estadisticas__empleados_activos'), 0),
+        empleados_inactivos=Coalesce(F('estadisticas__empleados_inactivos'), 0),
+        empleados_suspendidos=Coalesce(F('estadisticas__empleados_suspendidos'), 0),
+        fecha_actualizacion=F('estadisticas__fecha_actualizacion'),
+        fecha_reconstruccion=F('estadisticas__fecha_reconstruccion'),
+    )
+
+
+def reconstruir_departamentos(ids=None):
+    """
+    Recalcula por completo las filas de departamento_estadisticas (todas o
+    solo las de `ids`). Devuelve el número de departamentos reconstruidos.
+    """
+    filas = estadisticas_departamentos_en_vivo()
+    if ids is not None:
+        filas = filas.filter(id_departamento__in=ids)
+    ahora = timezone.now()
+    total = 0
+    with transaction.atomic():
+        for fila in filas:
+            DepartamentoEstadistica.objects.update_or_create(
+                id_departamento_id=fila['id_departamento'],
+                defaults={
+                    'total_empleados': fila['total_empleados'],
+                    'empleados_activos': fila['empleados_activos'],
+                    'empleados_inactivos': fila['empleados_inactivos'],
+                    'empleados_suspendidos': fila['empleados_suspendidos'],
+                    'fecha_reconstruccion': ahora,
+                }
+            )
+            total += 1
+    return total
+
+
+# =============================================
+# NOTIFICACIONES NO LEÍDAS POR USUARIO
+# =============================================
+
+def _contar_no_leidas(id_usuario):
+    return Notificacion.objects.filter(id_usuario=id_usuario, leida=False).count()
+
+
+def ajustar_no_leidas(id_usuario, delta):
+    """
+    Suma `delta` al contador del usuario. Si la fila no existe y el delta es
+    positivo se crea con el conteo real; con delta negativo no se crea (el
+    usuario puede estar borrándose en cascada y el conteo real se tomará en
+    la primera lectura). El contador nunca baja de cero.
+    """
+    if not delta:
+        return
+    actualizados = ContadorNotificacionesUsuario.objects.filter(pk=id_usuario).update(
+        no_leidas=Greatest(F('no_leidas') + delta, 0), fecha_actualizacion=timezone.now()
+    )
+    if not actualizados and delta > 0:
+        _crear_contador_usuario(id_usuario)
+
+
+def ajustar_no_leidas_usuarios(ids_usuario, delta):
+    """
+    Suma `delta` al contador de varios usuarios con un solo UPDATE, para
+    operaciones masivas. Los usuarios sin fila se omiten: su contador se
+    crea con el conteo real en la primera lectura.
+    """
+    if not delta or not ids_usuario:
+        return
+    ContadorNotificacionesUsuario.objects.filter(pk__in=ids_usuario).update(
+        no_leidas=Greatest(F('no_leidas') + delta, 0), fecha_actualizacion=timezone.now()
+    )
+
+
+def _crear_contador_usuario(id_usuario):
+    try:
+        with transaction.atomic():
+            ContadorNotificacionesUsuario.objects.create(
+                id_usuario_id=id_usuario, no_leidas=_contar_no_leidas(id_usuario)
+            )
+    except IntegrityError:
+        # Otro proceso lo creó con el conteo real, que ya incluye este cambio
+        pass
+
+
+def obtener_no_leidas(id_usuario):
+    """Lee el contador del usuario con una consulta por clave primaria"""
+    no_leidas = ContadorNotificacionesUsuario.objects.filter(pk=id_usuario).values_list('no_leidas', flat=True).first()
+    if no_leidas is None:
+        _crear_contador_usuario(id_usuario)
+        no_leidas = ContadorNotificacionesUsuario.objects.filter(pk=id_usuario).values_list('no_leidas', flat=True).first()
+    return no_leidas or 0
+
+
+def registrar_notificacion_guardada(instance, created):
+    actuales = valores_actuales(instance)
+    nuevo = (actuales.get('id_usuario_id'), actuales.get('leida'))
+    if created:
+        anterior = None
+    else:
+        previos = valores_previos(instance)
+        anterior = (previos.get('id_usuario_id'), previos.get('leida'))
+        if anterior == nuevo or NO_CARGADO in anterior or NO_CARGADO in nuevo:
+            return
+    if anterior is not None and anterior[1] is False:
+        ajustar_no_leidas(anterior[0], -1)
+    if nuevo[1] is False:
+        ajustar_no_leidas(nuevo[0], 1)
+
+
+def registrar_notificacion_eliminada(instance):
+    actuales = valores_actuales(instance)
+    if actuales.get('leida') is False and actuales.get('id_usuario_id') is not NO_CARGADO:
+        ajustar_no_leidas(actuales['id_usuario_id'], -1)
+
+
+def marcar_leidas(id_usuario, ids=None, antes_de=None):
+    """
+    Marca como leídas, con un único UPDATE, las notificaciones sin leer del
+    usuario indicadas por `ids` o creadas hasta `antes_de`, y descuenta los
+    contadores en la misma transacción. Devuelve cuántas se marcaron.
+    """
+    notificaciones = Notificacion.objects.filter(id_usuario=id_usuario, leida=False)
+    if ids is not None:
+        notificaciones = notificaciones.filter(id_notificacion__in=ids)
+    if antes_de is not None:
+        notificaciones = notificaciones.filter(fecha_creacion__lte=antes_de)
+    
+    with transaction.atomic():
+        marcadas = notificaciones.update(leida=True, fecha_lectura=timezone.now())
+        if marcadas:
+            ajustar_no_leidas(id_usuario, -marcadas)
+            aplicar_deltas({'notificaciones_no_leidas': -marcadas})
+    return marcadas
+
+
+def reconciliar_no_leidas_usuarios(tamano_lote=1000):
+    """
+    Recuenta las notificaciones sin leer de cada usuario con contador y
+    corrige los que tienen deriva. Devuelve {id_usuario: (anterior, real)}.
+
+    Cada lote bloquea sus filas de contador antes de contar, así un cambio
+    concurrente espera y suma su delta sobre el valor ya corregido.
+    """
+    deriva = {}
+    for lote in iterar_lotes(ContadorNotificacionesUsuario.objects.all(), ('id_usuario',), tamano_lote=tamano_lote):
+        ids = [fila['id_usuario'] for fila in lote]
+        with transaction.atomic():
+            anteriores = dict(
+                ContadorNotificacionesUsuario.objects.select_for_update()
+                .filter(pk__in=ids).values_list('id_usuario', 'no_leidas')
+            )
+            reales = dict(
+                Notificacion.objects.filter(id_usuario__in=anteriores, leida=False)
+                .values('id_usuario').annotate(total=Count('pk')).values_list('id_usuario', 'total')
+            )
+            ahora = timezone.now()
+            for id_usuario, anterior in anteriores.items():
+                real = reales.get(id_usuario, 0)
+                if anterior != real:
+                    ContadorNotificacionesUsuario.objects.filter(pk=id_usuario).update(
+                        no_leidas=real, fecha_actualizacion=ahora
+                    )
+                    deriva[id_usuario] = (anterior, real)
+    return deriva
@@ -0,0 +1,167 @@
+"""
+Difusión de notificaciones a todos los usuarios de un departamento y/o rol.
+
+Los destinatarios se resuelven con una sola consulta (usuarios JOIN
+empleados) recorrida por lotes de clave primaria, y cada lote se inserta
+con bulk_create en su propia transacción junto con el avance de la
+difusión, así la memoria se mantiene acotada y una difusión interrumpida
+se retoma sin duplicar desde `ultimo_id_usuario`.
+
+Las difusiones se ejecutan en un pool de hilos del proceso. Si el proceso
+termina antes de completarlas quedan 'pendiente' o 'en_proceso' y se
+retoman con `manage.py reanudar_difusiones`. Quien ejecuta una difusión la
+reclama con una concesión (procesando_desde) que renueva en cada lote; otro
+proceso solo puede tomarla cuando la concesión vence
+(DIFUSION_CONCESION_SEGUNDOS), así dos ejecuciones nunca envían el mismo lote.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .lotes import iterar_lotes
+from .models import DifusionNotificacion, Notificacion, Usuario
+from . import contadores, tiempo_real
+
+TAMANO_LOTE_DIFUSION = 1000
+
+logger = logging.getLogger(__name__)
+
+_ejecutor = None
+_ejecutor_lock = threading.Lock()
+
+
+def destinatarios(difusion):
+    """Usuarios activos cuyo empleado pertenece al departamento y/o rol"""
+    usuarios = Usuario.objects.filter(estado='activo')
+    if difusion.id_departamento_id is not None:
+        usuarios = usuarios.filter(id_empleado__id_departamento=difusion.id_departamento_id)
+    if difusion.id_rol_id is not None:
+        usuarios = usuarios.filter(id_empleado__id_rol=difusion.id_rol_id)
+    return usuarios
+
+
+def _notificaciones(difusion, ids_usuario):
+    return [
+        Notificacion(
+            id_usuario_id=id_usuario,
+            titulo=difusion.titulo,
+            mensaje=difusion.mensaje,
+            tipo=difusion.tipo,
+            categoria=difusion.categoria,
+            url_accion=difusion.url_accion,
+            fecha_expiracion=difusion.fecha_expiracion,
+            id_difusion=difusion,
+        )
+        for id_usuario in ids_usuario
+    ]
+
+
+def _publicar(notificaciones):
+    for notificacion in notificaciones:
+        tiempo_real.publicar_notificacion(notificacion)
+
+
+class ConcesionPerdida(Exception):
+    """Otro proceso tomó la difusión (la concesión venció)"""
+
+
+def reclamar(id_difusion):
+    """
+    Toma la difusión con un UPDATE condicional si nadie la está procesando
+    o si la concesión de quien la procesaba venció. Devuelve la marca de la
+    concesión, o None si la tiene otro proceso.
+    """
+    ahora = timezone.now()
+    vencida = ahora - timedelta(seconds=getattr(settings, 'DIFUSION_CONCESION_SEGUNDOS', 300))
+    tomadas = DifusionNotificacion.objects.filter(
+        Q(procesando_desde__isnull=True) | Q(procesando_desde__lt=vencida),
+        pk=id_difusion, estado__in=['pendiente', 'en_proceso'],
+    ).update(procesando_desde=ahora, estado='en_proceso')
+    return ahora if tomadas else None
+
+
+def ejecutar(id_difusion, tamano_lote=TAMANO_LOTE_DIFUSION):
+    """
+    Procesa la difusión en el hilo actual, retomándola si ya había
+    avanzado. Devuelve la difusión actualizada, o None si otro proceso la
+    está ejecutando.
+    """
+    concesion = reclamar(id_difusion)
+    if concesion is None:
+        return None
+    # El avance se lee después de tomarla: nadie más lo modifica mientras tanto
+    difusion = DifusionNotificacion.objects.get(pk=id_difusion)
+
+    usuarios = destinatarios(difusion)
+    difusion.fecha_inicio = difusion.fecha_inicio or timezone.now()
+    if difusion.total_destinatarios is None:
+        difusion.total_destinatarios = usuarios.count()
+    difusion.save(update_fields=['fecha_inicio', 'total_destinatarios'])
+
+    try:
+        for lote in iterar_lotes(usuarios, ('id_usuario',), tamano_lote=tamano_lote, desde=difusion.ultimo_id_usuario):
+            ids_usuario = [fila['id_usuario'] for fila in lote]
+            with transaction.atomic():
+                # Primero se renueva la concesión: bloquea la fila durante el
+                # lote y falla si otro proceso la tomó
+                renovada = timezone.now()
+                if not DifusionNotificacion.objects.filter(pk=difusion.pk, procesando_desde=concesion).update(
+                    procesando_desde=renovada, ultimo_id_usuario=ids_usuario[-1],
+                    enviadas=F('enviadas') + len(ids_usuario),
+                ):
+                    raise ConcesionPerdida(id_difusion)
+                concesion = renovada
+                # bulk_create no emite señales: los contadores se ajustan aquí
+                creadas = Notificacion.objects.bulk_create(_notificaciones(difusion, ids_usuario))
+                if creadas and creadas[0].pk is None:
+                    # MySQL y MariaDB < 10.5 no devuelven los ids insertados
+                    creadas = list(Notificacion.objects.filter(id_difusion=difusion.pk, id_usuario__in=ids_usuario))
+                contadores.aplicar_deltas({'notificaciones_no_leidas': len(creadas)})
+                contadores.ajustar_no_leidas_usuarios(ids_usuario, 1)
+                transaction.on_commit(lambda creadas=creadas: _publicar(creadas))
+    except ConcesionPerdida:
+        logger.warning('La difusión %s pasó a otro proceso', id_difusion)
+    except Exception as e:
+        logger.exception('Error en la difusión %s', id_difusion)
+        DifusionNotificacion.objects.filter(pk=difusion.pk, procesando_desde=concesion).update(
+            estado='fallida', error=str(e), fecha_fin=timezone.now(), procesando_desde=None
+        )
+    else:
+        DifusionNotificacion.objects.filter(pk=difusion.pk, procesando_desde=concesion).update(
+            estado='completada', fecha_fin=timezone.now(), procesando_desde=None
+        )
+
+    difusion.refresh_from_db()
+    return difusion
+
+
+def _obtener_ejecutor():
+    global _ejecutor
+    if _ejecutor is None:
+        with _ejecutor_lock:
+            if _ejecutor is None:
+                _ejecutor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'DIFUSION_HILOS', 2), thread_name_prefix='difusion'
+                )
+    return _ejecutor
+
+
+def _tarea(id_difusion):
+    try:
+        ejecutar(id_difusion)
+    except Exception:
+        logger.exception('Error en la difusión %s', id_difusion)
+    finally:
+        # Los hilos del pool no pasan por el ciclo de petición que cierra la conexión
+        connection.close()
+
+
+def encolar(difusion):
+    """Programa la difusión en segundo plano cuando se confirme su creación"""
+    transaction.on_commit(lambda: _obtener_ejecutor().submit(_tarea, difusion.pk))
@@ -0,0 +1,178 @@
+"""
+Escritura diferida por lotes (write-behind) para tablas de registro.
+
+Las filas se encolan en memoria desde la petición, sin tocar la base de
+datos, y un hilo de fondo por proceso las inserta con bulk_create cuando
+se juntan `tamano_lote` filas o pasan `intervalo` segundos. La cola está
+acotada: al llenarse se descartan las filas nuevas o las más antiguas
+según la política, y se cuentan. Al terminar el proceso (atexit) se
+escribe lo pendiente. Si un lote viola una restricción se reintenta fila por
+fila; las filas cuyas referencias opcionales ya no existen se guardan con
+esas referencias en NULL ('reparadas').
+
+Los datos encolados son diccionarios de campos; el modelo se resuelve en el
+hilo de fondo, así que un escritor puede crearse antes de que las
+aplicaciones estén cargadas (p. ej. desde la configuración de LOGGING).
+"""
+import atexit
+import collections
+import logging
+import os
+import threading
+
+from django.apps import apps
+from django.db import IntegrityError, close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+DESCARTAR_NUEVOS = 'descartar_nuevos'
+DESCARTAR_ANTIGUOS = 'descartar_antiguos'
+
+
+class EscritorPorLotes:
+    def __init__(self, modelo, tamano_lote=200, intervalo=2.0, capacidad=10000, politica=DESCARTAR_NUEVOS):
+        """`modelo` es la etiqueta 'app.Modelo' de la tabla destino"""
+        if politica not in (DESCARTAR_NUEVOS, DESCARTAR_ANTIGUOS):
+            raise ValueError(f'Política de desborde desconocida: {politica}')
+        self.modelo = modelo
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo
+        self.capacidad = capacidad
+        self.politica = politica
+        self._condicion = threading.Condition()
+        self._escritura = threading.Lock()
+        self._cola = collections.deque()
+        self._hilo = None
+        self._pid = None
+        self._detenido = False
+        self.contadores = {
+            'encoladas': 0, 'escritas': 0, 'descartadas': 0, 'fallidas': 0, 'reparadas': 0, 'lotes': 0,
+        }
+        atexit.register(self.detener)
+
+    # -----------------------------------------
+    # Productores
+    # -----------------------------------------
+    def agregar(self, campos):
+        """Encola una fila; devuelve False si se descartó por desborde"""
+        self._asegurar_hilo()
+        with self._condicion:
+            if len(self._cola) >= self.capacidad:
+                self.contadores['descartadas'] += 1
+                if self.politica == DESCARTAR_NUEVOS:
+                    return False
+                self._cola.popleft()
+            self._cola.append(campos)
+            self.contadores['encoladas'] += 1
+            if len(self._cola) >= self.tamano_lote:
+                self._condicion.notify()
+        return True
+
+    def estadisticas(self):
+        with self._condicion:
+            return dict(self.contadores, pendientes=len(self._cola))
+
+    # -----------------------------------------
+    # Hilo de fondo
+    # -----------------------------------------
+    def _asegurar_hilo(self):
+        if self._hilo is not None and self._pid == os.getpid():
+            return
+        with self._condicion:
+            if self._hilo is not None and self._pid == os.getpid():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # Proceso hijo tras un fork: lo encolado lo escribe el padre
+                self._cola.clear()
+            self._pid = os.getpid()
+            self._detenido = False
+            self._hilo = threading.Thread(
+                target=self._ejecutar, name=f'escritor-{self.modelo}', daemon=True
+            )
+            self._hilo.start()
+
+    def _ejecutar(self):
+        while True:
+            with self._condicion:
+                if not self._detenido and len(self._cola) < self.tamano_lote:
+                    self._condicion.wait(self.intervalo)
+                if self._detenido:
+                    return
+            self.vaciar()
+            # El hilo vive fuera del ciclo de peticiones que cierra las conexiones
+            close_old_connections()
+
+    def _tomar_lote(self):
+        with self._condicion:
+            cantidad = min(len(self._cola), self.tamano_lote)
+            return [self._cola.popleft() for _ in range(cantidad)]
+
+    def vaciar(self):
+        """Escribe todo lo encolado en lotes, en el hilo que llama"""
+        with self._escritura:
+            while True:
+                lote = self._tomar_lote()
+                if not lote:
+                    return
+                self._escribir(lote)
+
+    def _escribir(self, lote):
+        modelo = apps.get_model(self.modelo)
+        try:
+            with transaction.atomic():
+                modelo.objects.bulk_create([modelo(**campos) for campos in lote])
+        except IntegrityError:
+            # Una fila inválida (p. ej. un usuario borrado antes de escribir)
+            # no debe hacer perder las demás: se reintenta fila por fila
+            self._escribir_por_filas(modelo, lote)
+        except Exception:
+            self._contar(fallidas=len(lote))
+            logger.exception('No se pudo escribir un lote de %s filas en %s', len(lote), self.modelo)
+        else:
+            self._contar(escritas=len(lote), lotes=1)
+
+    def _escribir_por_filas(self, modelo, lote):
+        opcionales = [
+            campo.attname for campo in modelo._meta.concrete_fields
+            if campo.is_relation and campo.null
+        ]
+        escritas = reparadas = fallidas = 0
+        for campos in lote:
+            try:
+                with transaction.atomic():
+                    modelo.objects.create(**campos)
+                escritas += 1
+                continue
+            except IntegrityError:
+                pass
+            # Se conserva la fila sin las referencias opcionales que fallan
+            sin_referencias = {
+                campo: (None if campo in opcionales else valor) for campo, valor in campos.items()
+            }
+            if sin_referencias != campos:
+                try:
+                    with transaction.atomic():
+                        modelo.objects.create(**sin_referencias)
+                    reparadas += 1
+                    continue
+                except IntegrityError:
+                    pass
+            fallidas += 1
+            logger.warning('Se descartó una fila inválida de %s: %r', self.modelo, campos)
+        self._contar(escritas=escritas + reparadas, reparadas=reparadas, fallidas=fallidas, lotes=1)
+
+    def _contar(self, **cantidades):
+        with self._condicion:
+            for contador, cantidad in cantidades.items():
+                self.contadores[contador] += cantidad
+
+    def detener(self):
+        """Detiene el hilo y escribe lo pendiente (se registra con atexit)"""
+        with self._condicion:
+            self._detenido = True
+            self._condicion.notify()
+        hilo = self._hilo
+        if hilo is not None and hilo is not threading.current_thread() and self._pid == os.getpid():
+            hilo.join(timeout=self.intervalo + 5)
+        self._hilo = None
+        self.vaciar()
@@ -0,0 +1,97 @@
+"""
+Exportación en streaming (NDJSON o CSV) de tablas grandes.
+
+Las filas se leen en lotes acotados por clave primaria y se escriben a la
+respuesta a medida que llegan, de modo que la memoria del worker no crece con
+el tamaño de la tabla.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+from .models import Empleado, Usuario, ActividadUsuario, LogSistema
+from .filtros import filtrar_empleados, filtrar_usuarios, filtrar_actividades, filtrar_logs
+from .lotes import iterar_lotes
+
+TAMANO_LOTE_EXPORTACION = 2000
+
+# Campos sensibles que nunca se exportan
+CAMPOS_EXCLUIDOS = {
+    Usuario: {'password_hash', 'token_2fa', 'token_recuperacion', 'fecha_expiracion_token'},
+}
+
+
+def _campos_modelo(modelo):
+    excluidos = CAMPOS_EXCLUIDOS.get(modelo, set())
+    return [campo.name for campo in modelo._meta.concrete_fields if campo.name not in excluidos]
+
+
+# recurso -> (queryset base, función de filtro, expresiones adicionales)
+RECURSOS = {
+    'empleados': (
+        lambda: Empleado.objects.all(), filtrar_empleados,
+        {'departamento_nombre': F('id_departamento__nombre'), 'rol_nombre': F('id_rol__nombre')}
+    ),
+    'usuarios': (
+        lambda: Usuario.objects.all(), filtrar_usuarios,
+        {'empleado_email': F('id_empleado__email')}
+    ),
+    'actividades': (
+        lambda: ActividadUsuario.objects.all(), filtrar_actividades,
+        {'usuario_nombre': F('id_usuario__username')}
+    ),
+    'logs': (
+        lambda: LogSistema.objects.all(), filtrar_logs,
+        {'usuario_nombre': F('id_usuario__username')}
+    ),
+}
+
+
+class Exportacion:
+    """
+    Prepara la exportación de un recurso: campos, queryset filtrado y
+    generadores de salida.
+    """
+    def __init__(self, recurso, params):
+        base, filtrar, expresiones = RECURSOS[recurso]
+        self.recurso = recurso
+        self.queryset = filtrar(base(), params)
+        self.expresiones = expresiones
+        self.campos = _campos_modelo(self.queryset.model)
+        self.columnas = self.campos + list(expresiones)
+
+    def lotes(self):
+        return iterar_lotes(
+            self.queryset, self.campos, TAMANO_LOTE_EXPORTACION, **self.expresiones
+        )
+
+    def ndjson(self):
+        codificador = DjangoJSONEncoder(ensure_ascii=False)
+        for lote in self.lotes():
+            yield ''.join(codificador.encode(fila) + '\n' for fila in lote)
+
+    def csv(self):
+        buffer = _BufferEco()
+        escritor = csv.writer(buffer)
+        yield escritor.writerow(self.columnas)
+        for lote in self.lotes():
+            yield ''.join(
+                escritor.writerow([_valor_csv(fila[columna]) for columna in self.columnas])
+                for fila in lote
+            )
+
+
+class _BufferEco:
+    """Objeto tipo archivo que devuelve lo escrito en lugar de guardarlo"""
+    def write(self, valor):
+        return valor
+
+
+def _valor_csv(valor):
+    if isinstance(valor, (dict, list)):
+        return json.dumps(valor, ensure_ascii=False, cls=DjangoJSONEncoder)
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    return valor
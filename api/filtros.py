@@ -0,0 +1,101 @@
+"""
+Filtros de consulta compartidos por las vistas de listado y de exportación.
+
+Cada función recibe un queryset y los parámetros GET y devuelve el queryset
+filtrado. Los valores mal formados lanzan FiltroInvalido.
+"""
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils import timezone
+from datetime import datetime, time
+
+
+class FiltroInvalido(ValueError):
+    """Un parámetro de filtro no tiene un formato válido"""
+
+
+def parsear_fecha(valor, nombre, fin_del_dia=False):
+    """
+    Acepta una fecha (YYYY-MM-DD) o fecha y hora ISO 8601 y devuelve un
+    datetime consciente de zona horaria.
+    """
+    try:
+        fecha_hora = parse_datetime(valor)
+        if fecha_hora is None:
+            fecha = parse_date(valor)
+            if fecha is None:
+                raise ValueError(valor)
+            fecha_hora = datetime.combine(fecha, time.max if fin_del_dia else time.min)
+    except ValueError:
+        raise FiltroInvalido(f'Fecha inválida en el parámetro {nombre}: {valor}')
+    if timezone.is_naive(fecha_hora):
+        fecha_hora = timezone.make_aware(fecha_hora)
+    return fecha_hora
+
+
+def parsear_entero(valor, nombre):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise FiltroInvalido(f'Valor inválido en el parámetro {nombre}: {valor}')
+
+
+def filtrar_rango_fechas(queryset, params, campo):
+    """Aplica ?desde= y ?hasta= (inclusivos) sobre `campo`"""
+    desde = params.get('desde')
+    hasta = params.get('hasta')
+    if desde:
+        queryset = queryset.filter(**{f'{campo}__gte': parsear_fecha(desde, 'desde')})
+    if hasta:
+        queryset = queryset.filter(**{f'{campo}__lte': parsear_fecha(hasta, 'hasta', fin_del_dia=True)})
+    return queryset
+
+
+def filtrar_empleados(queryset, params):
+    """?estado= y ?departamento="""
+    estado = params.get('estado')
+    departamento = params.get('departamento')
+    
+    if estado:
+        queryset = queryset.filter(estado=estado)
+    if departamento:
+        queryset = queryset.filter(id_departamento=parsear_entero(departamento, 'departamento'))
+    return queryset
+
+
+def filtrar_usuarios(queryset, params):
+    """?estado="""
+    estado = params.get('estado')
+    
+    if estado:
+        queryset = queryset.filter(estado=estado)
+    return queryset
+
+
+def filtrar_actividades(queryset, params):
+    """?usuario=, ?modulo=, ?accion=, ?desde= y ?hasta="""
+    usuario = params.get('usuario')
+    modulo = params.get('modulo')
+    accion = params.get('accion')
+    
+    if usuario:
+        queryset = queryset.filter(id_usuario=parsear_entero(usuario, 'usuario'))
+    if modulo:
+        queryset = queryset.filter(modulo=modulo)
+    if accion:
+        queryset = queryset.filter(accion=accion)
+    return filtrar_rango_fechas(queryset, params, 'fecha_actividad')
+
+
+def filtrar_logs(queryset, params):
+    """?nivel=, ?modulo=, ?usuario=, ?desde= y ?hasta="""
+    nivel = params.get('nivel')
+    modulo = params.get('modulo')
+    usuario = params.get('usuario')
+    
+    if nivel:
+        queryset = queryset.filter(nivel=nivel.upper())
+    if modulo:
+        queryset = queryset.filter(modulo=modulo)
+    if usuario:
+        queryset = queryset.filter(id_usuario=parsear_entero(usuario, 'usuario'))
+    return filtrar_rango_fechas(queryset, params, 'fecha_log')
@@ -0,0 +1,207 @@
+"""
+Inicio de sesión con bloqueo por intentos fallidos.
+
+Antes de tocar la base de datos o calcular hashes, cada intento pasa por
+dos limitadores de ventana deslizante en memoria (por IP y por nombre de
+usuario, LOGIN_LIMITES). Lo que superan se rechaza con 429.
+
+Los fallos se cuentan con una sola sentencia UPDATE con expresiones F(),
+sin leer y reescribir la fila: al llegar a LOGIN_MAX_INTENTOS el usuario
+queda bloqueado LOGIN_BLOQUEO_MINUTOS. Un inicio correcto reinicia el
+contador. Los tokens se entregan una sola vez; en la base de datos solo se
+guarda su SHA-256.
+"""
+import collections
+import logging
+import secrets
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from . import accesos, autenticacion
+from .models import Usuario, Sesion
+
+logger = logging.getLogger(__name__)
+
+
+class InicioSesionRechazado(Exception):
+    def __init__(self, mensaje, estado, reintentar=None):
+        super().__init__(mensaje)
+        self.mensaje = mensaje
+        self.estado = estado
+        self.reintentar = reintentar
+
+
+# =============================================
+# LIMITADORES EN MEMORIA
+# =============================================
+
+class LimitadorVentana:
+    """
+    Como máximo `limite` intentos por clave en los últimos `ventana`
+    segundos. Guarda hasta `maximo_claves` claves y olvida las menos
+    recientes.
+    """
+    def __init__(self, limite, ventana, maximo_claves=100000):
+        self.limite = limite
+        self.ventana = ventana
+        self.maximo_claves = maximo_claves
+        self._lock = threading.Lock()
+        self._intentos = collections.OrderedDict()
+
+    def intentar(self, clave):
+        """Registra un intento; devuelve 0 si se permite o los segundos a esperar"""
+        ahora = time.monotonic()
+        with self._lock:
+            intentos = self._intentos.get(clave)
+            if intentos is None:
+                intentos = self._intentos[clave] = collections.deque()
+                if len(self._intentos) > self.maximo_claves:
+                    self._intentos.popitem(last=False)
+            else:
+                self._intentos.move_to_end(clave)
+            while intentos and intentos[0] <= ahora - self.ventana:
+                intentos.popleft()
+            if len(intentos) >= self.limite:
+                return intentos[0] + self.ventana - ahora
+            intentos.append(ahora)
+            return 0
+
+    def reiniciar(self, clave):
+        with self._lock:
+            self._intentos.pop(clave, None)
+
+
+_limitadores = None
+_limitadores_lock = threading.Lock()
+
+
+def limitadores():
+    global _limitadores
+    if _limitadores is None:
+        with _limitadores_lock:
+            if _limitadores is None:
+                limites = getattr(settings, 'LOGIN_LIMITES', {'ip': (20, 60), 'usuario': (5, 60)})
+                _limitadores = {tipo: LimitadorVentana(*limite) for tipo, limite in limites.items()}
+    return _limitadores
+
+
+_HASH_FALSO = None
+
+
+def _hash_falso():
+    # Iguala el tiempo de respuesta cuando el usuario no existe
+    global _HASH_FALSO
+    if _HASH_FALSO is None:
+        _HASH_FALSO = make_password(secrets.token_urlsafe(16))
+    return _HASH_FALSO
+
+
+# =============================================
+# CONTADOR DE INTENTOS Y BLOQUEO
+# =============================================
+
+def registrar_fallo(id_usuario, ahora=None):
+    """
+    Suma un intento fallido y bloquea al llegar al máximo. Si el usuario
+    tenía un bloqueo ya vencido, el contador empieza de cero: un solo error
+    tras el bloqueo no vuelve a bloquearlo.
+    """
+    ahora = ahora or timezone.now()
+    umbral = getattr(settings, 'LOGIN_MAX_INTENTOS', 5) - 1
+    with transaction.atomic():
+        Usuario.objects.filter(pk=id_usuario, fecha_bloqueo__lte=ahora - duracion_bloqueo()).update(
+            intentos_fallidos=0, bloqueado=False, fecha_bloqueo=None
+        )
+        # bloqueado y fecha_bloqueo van antes que intentos_fallidos: MySQL evalúa
+        # las asignaciones del SET en orden y vería el contador ya incrementado
+        Usuario.objects.filter(pk=id_usuario).update(
+            bloqueado=Case(When(intentos_fallidos__gte=umbral, then=Value(True)), default=F('bloqueado')),
+            fecha_bloqueo=Case(When(intentos_fallidos__gte=umbral, then=Value(ahora)), default=F('fecha_bloqueo')),
+            intentos_fallidos=F('intentos_fallidos') + 1,
+        )
+    # El update no emite señales: si quedó bloqueado, sus sesiones en caché se releen
+    autenticacion.invalidar_usuario(id_usuario)
+
+
+def reiniciar_fallos(id_usuario):
+    Usuario.objects.filter(pk=id_usuario).update(intentos_fallidos=0, bloqueado=False, fecha_bloqueo=None)
+    autenticacion.invalidar_usuario(id_usuario)
+
+
+def duracion_bloqueo():
+    return timedelta(minutes=getattr(settings, 'LOGIN_BLOQUEO_MINUTOS', 15))
+
+
+def fin_bloqueo(usuario):
+    """Fecha en que vence el bloqueo por intentos, o None si es indefinido"""
+    if usuario.fecha_bloqueo is None:
+        return None
+    return usuario.fecha_bloqueo + duracion_bloqueo()
+
+
+# =============================================
+# INICIO DE SESIÓN
+# =============================================
+
+def autenticar(username, password, ip):
+    """Devuelve el Usuario o lanza InicioSesionRechazado"""
+    claves = {'ip': ip or '', 'usuario': username.lower()}
+    for tipo, clave in claves.items():
+        limitador = limitadores().get(tipo)
+        espera = limitador.intentar(clave) if limitador else 0
+        if espera:
+            raise InicioSesionRechazado('Demasiados intentos, intente más tarde', 429, reintentar=espera)
+
+    usuario = Usuario.objects.filter(username=username).first()
+    if usuario is None:
+        check_password(password, _hash_falso())
+        raise InicioSesionRechazado('Credenciales inválidas', 401)
+
+    ahora = timezone.now()
+    if usuario.bloqueado:
+        fin = fin_bloqueo(usuario)
+        if fin is None or fin > ahora:
+            raise InicioSesionRechazado(
+                'Usuario bloqueado', 403,
+                reintentar=(fin - ahora).total_seconds() if fin else None,
+            )
+    if usuario.estado != 'activo':
+        raise InicioSesionRechazado('Usuario inactivo', 403)
+
+    if not check_password(password, usuario.password_hash):
+        registrar_fallo(usuario.pk, ahora)
+        vencido = usuario.fecha_bloqueo is not None and fin_bloqueo(usuario) <= ahora
+        previos = 0 if vencido else usuario.intentos_fallidos
+        if previos + 1 >= getattr(settings, 'LOGIN_MAX_INTENTOS', 5):
+            logger.warning('Usuario bloqueado por intentos fallidos', extra={
+                'modulo': 'autenticacion', 'id_usuario': usuario.pk, 'ip_origen': ip,
+            })
+        raise InicioSesionRechazado('Credenciales inválidas', 401)
+
+    if usuario.intentos_fallidos or usuario.bloqueado:
+        reiniciar_fallos(usuario.pk)
+    if 'usuario' in limitadores():
+        limitadores()['usuario'].reiniciar(claves['usuario'])
+    return usuario
+
+
+def crear_sesion(usuario, ip=None, user_agent=None, dispositivo=None):
+    """Crea la sesión; devuelve (token, sesión). El token no se guarda"""
+    token = secrets.token_urlsafe(32)
+    sesion = Sesion.objects.create(
+        id_usuario=usuario,
+        token_sesion=autenticacion.hash_token(token),
+        ip_origen=ip,
+        user_agent=user_agent,
+        dispositivo=dispositivo,
+        fecha_expiracion=timezone.now() + timedelta(hours=getattr(settings, 'SESIONES_DURACION_HORAS', 8)),
+    )
+    accesos.registro.registrar(usuario.pk, sesion.pk)
+    return token, sesion
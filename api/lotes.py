@@ -0,0 +1,34 @@
+"""
+Recorrido de querysets grandes en lotes con memoria acotada.
+"""
+
+
+def iterar_lotes(queryset, campos, tamano_lote=1000, desde=None, **expresiones):
+    """
+    Recorre `queryset` en lotes de `tamano_lote` diccionarios (`.values()`),
+    avanzando por clave primaria (keyset) en vez de OFFSET.
+
+    Cada lote es una consulta independiente y acotada, así la memoria se
+    mantiene plana sin depender de cursores del lado del servidor, que el
+    backend de MariaDB/MySQL de Django no ofrece (carga el resultado
+    completo en el cliente aunque se use `.iterator()`).
+
+    Con `desde` se empieza después de esa clave primaria, para retomar un
+    recorrido interrumpido.
+    """
+    pk = queryset.model._meta.pk.attname
+    campos = list(campos)
+    if pk not in campos:
+        campos.insert(0, pk)
+
+    qs = queryset.order_by(pk).values(*campos, **expresiones)
+    ultimo = desde
+    while True:
+        lote_qs = qs if ultimo is None else qs.filter(**{f'{pk}__gt': ultimo})
+        lote = list(lote_qs[:tamano_lote])
+        if not lote:
+            return
+        yield lote
+        if len(lote) < tamano_lote:
+            return
+        ultimo = lote[-1][pk]
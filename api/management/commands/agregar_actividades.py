@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from api import resumenes
+
+
+class Command(BaseCommand):
+    help = (
+        'Suma las actividades nuevas al resumen horario actividades_resumen_hora '
+        'y elimina los resúmenes más antiguos que RESUMEN_ACTIVIDAD_DIAS'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=resumenes.TAMANO_LOTE_AGREGACION, help='Ids por lote')
+
+    def handle(self, *args, **options):
+        resultado = resumenes.agregar_actividades(options['lote'])
+        eliminados = resumenes.purgar_resumenes()
+        self.stdout.write(self.style.SUCCESS(
+            f"Agregadas {resultado['actividades']} actividades en {resultado['resumenes']} resúmenes "
+            f"(marca en {resultado['ultimo_id']}); {eliminados} resúmenes antiguos eliminados"
+        ))
@@ -0,0 +1,98 @@
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from api.models import (
+    Departamento, Rol, Empleado, Usuario, Sesion, Notificacion, ActividadUsuario, LogSistema
+)
+
+
+def formas_de_consulta():
+    """
+    Consultas representativas de las vistas de la API, con parámetros
+    tomados de los datos existentes. Al agregar una vista con un patrón de
+    acceso nuevo, su consulta debe sumarse aquí.
+    """
+    id_departamento = Departamento.objects.values_list('pk', flat=True).first() or 1
+    id_usuario = Usuario.objects.values_list('pk', flat=True).first() or 1
+    hace_un_dia = timezone.now() - timedelta(days=1)
+    
+    return [
+        ('empleados_list ?estado=&departamento=',
+         Empleado.objects.filter(estado='activo', id_departamento=id_departamento).order_by('id_empleado')[:51]),
+        ('departamento_detail (empleados del departamento)',
+         Empleado.objects.filter(id_departamento=id_departamento).order_by('id_empleado')[:51]),
+        ('roles_por_departamento',
+         Rol.objects.filter(id_departamento=id_departamento, estado='activo')),
+        ('notificaciones_usuario',
+         Notificacion.objects.filter(id_usuario=id_usuario).order_by('-fecha_creacion', '-id_notificacion')[:51]),
+        ('notificaciones_usuario ?leida=',
+         Notificacion.objects.filter(id_usuario=id_usuario, leida=False).order_by('-fecha_creacion', '-id_notificacion')[:51]),
+        ('notificaciones_usuario ?leida=&tipo=',
+         Notificacion.objects.filter(id_usuario=id_usuario, leida=False, tipo='info').order_by('-fecha_creacion', '-id_notificacion')[:51]),
+        ('sesiones activas',
+         Sesion.objects.filter(activa=True).values('pk')),
+        ('log_sistema por fecha',
+         LogSistema.objects.filter(fecha_log__gte=hace_un_dia).order_by('-fecha_log')[:50]),
+        ('actividades_usuario por fecha',
+         ActividadUsuario.objects.filter(fecha_actividad__gte=hace_un_dia).order_by('-fecha_actividad')[:50]),
+        ('logs_list ?nivel=',
+         LogSistema.objects.filter(nivel='ERROR').order_by('-fecha_log', '-id_log')[:51]),
+        ('logs_list ?modulo=&desde=',
+         LogSistema.objects.filter(modulo='usuarios', fecha_log__gte=hace_un_dia).order_by('-fecha_log', '-id_log')[:51]),
+        ('logs_list ?usuario=',
+         LogSistema.objects.filter(id_usuario=id_usuario).order_by('-fecha_log', '-id_log')[:51]),
+        ('actividades_list ?usuario=',
+         ActividadUsuario.objects.filter(id_usuario=id_usuario).order_by('-fecha_actividad', '-id_actividad')[:51]),
+        ('actividades_list ?modulo=',
+         ActividadUsuario.objects.filter(modulo='empleados').order_by('-fecha_actividad', '-id_actividad')[:51]),
+        ('actividades_list ?accion=',
+         ActividadUsuario.objects.filter(accion='GET empleados-list').order_by('-fecha_actividad', '-id_actividad')[:51]),
+        ('validadores de empleados (MAX fecha_modificacion)',
+         Empleado.objects.order_by('-fecha_modificacion').values('fecha_modificacion')[:1]),
+    ]
+
+
+def plan(queryset):
+    """Devuelve (texto del plan, tablas recorridas completas)"""
+    if connection.vendor == 'mysql':
+        texto = queryset.explain(format='json')
+        completas = re.findall(r'"table_name":\s*"(\w+)",\s*"access_type":\s*"ALL"', texto)
+    elif connection.vendor == 'postgresql':
+        texto = queryset.explain()
+        completas = re.findall(r'Seq Scan on (\w+)', texto)
+    else:
+        texto = queryset.explain()
+        completas = re.findall(r'SCAN (\w+)\b(?! USING)', texto)
+    return texto, completas
+
+
+class Command(BaseCommand):
+    help = (
+        'Ejecuta EXPLAIN sobre las consultas frecuentes de la API e informa las '
+        'que recorren tablas completas. Con --estricto termina con error si hay '
+        'alguna, para detectar regresiones de índices.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--estricto', action='store_true', help='Falla si alguna consulta recorre una tabla completa')
+        parser.add_argument('--planes', action='store_true', help='Muestra el plan completo de cada consulta')
+
+    def handle(self, *args, **options):
+        con_escaneo = []
+        for nombre, queryset in formas_de_consulta():
+            texto, completas = plan(queryset)
+            if completas:
+                con_escaneo.append(nombre)
+                self.stdout.write(self.style.WARNING(f'ESCANEO COMPLETO  {nombre}: {", ".join(sorted(set(completas)))}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'OK                {nombre}'))
+            if options['planes'] or completas:
+                for linea in texto.splitlines():
+                    self.stdout.write(f'    {linea}')
+
+        if con_escaneo and options['estricto']:
+            raise CommandError(f'{len(con_escaneo)} consultas recorren tablas completas')
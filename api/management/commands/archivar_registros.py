@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from api import archivo, retencion
+
+
+class Command(BaseCommand):
+    help = (
+        'Archiva en segmentos NDJSON comprimidos las filas de log_sistema y '
+        'actividades_usuario anteriores al horizonte de retención y las borra '
+        'por lotes. En tablas particionadas también crea las particiones de '
+        'los próximos meses. Crea el índice de los segmentos que no lo tengan.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recurso', choices=sorted(retencion.POLITICAS), help='Solo este recurso')
+        parser.add_argument('--dias', type=int, help='Horizonte en días (por defecto RETENCION_DIAS)')
+        parser.add_argument('--lote', type=int, default=retencion.TAMANO_LOTE_RETENCION, help='Filas por lote')
+        parser.add_argument('--pausa', type=float, default=retencion.PAUSA_ENTRE_LOTES, help='Segundos entre lotes')
+        parser.add_argument('--directorio', help='Directorio de archivo (por defecto RETENCION_DIRECTORIO)')
+        parser.add_argument('--meses-futuros', type=int, default=3, help='Particiones a mantener por delante')
+
+    def handle(self, *args, **options):
+        recursos = [options['recurso']] if options['recurso'] else sorted(retencion.POLITICAS)
+        for recurso in recursos:
+            resultado = retencion.archivar(
+                recurso,
+                limite=retencion.fecha_limite(recurso, options['dias']),
+                directorio=options['directorio'],
+                tamano_lote=options['lote'],
+                pausa=options['pausa'],
+            )
+            self.stdout.write(
+                f"{recurso}: {resultado['archivadas']} filas en {resultado['segmentos']} segmentos, "
+                f"{resultado['particiones_eliminadas']} particiones eliminadas"
+            )
+            indices = archivo.indexar_segmentos(recurso, options['directorio'])
+            if indices:
+                self.stdout.write(f"{recurso}: índices creados para {indices} segmentos")
+            creadas = retencion.asegurar_particiones(recurso, options['meses_futuros'])
+            if creadas:
+                self.stdout.write(f"{recurso}: particiones creadas {', '.join(creadas)}")
+        self.stdout.write(self.style.SUCCESS('Retención completada'))
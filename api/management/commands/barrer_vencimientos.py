@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from api import vencimientos
+
+
+class Command(BaseCommand):
+    help = (
+        'Desactiva las sesiones expiradas y elimina las notificaciones '
+        'vencidas, por lotes, ajustando los contadores.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=vencimientos.TAMANO_LOTE_VENCIMIENTOS, help='Filas por lote')
+        parser.add_argument('--pausa', type=float, default=vencimientos.PAUSA_ENTRE_LOTES, help='Segundos entre lotes')
+        parser.add_argument(
+            '--intervalo', type=float,
+            help='Repetir el barrido cada tantos segundos, sin terminar (un único proceso para todo el sistema)'
+        )
+
+    def handle(self, *args, **options):
+        if options['intervalo']:
+            self.stdout.write(f"Barriendo cada {options['intervalo']} s")
+            vencimientos.barrer_periodicamente(options['intervalo'], options['lote'], options['pausa'])
+            return
+        resultado = vencimientos.barrer(tamano_lote=options['lote'], pausa=options['pausa'])
+        for trabajo, datos in resultado.items():
+            self.stdout.write(
+                f"{trabajo}: {datos['filas']} filas en {datos['segundos']} s "
+                f"({datos['filas_por_segundo'] or 0} filas/s)"
+            )
+        self.stdout.write(self.style.SUCCESS('Barrido completado'))
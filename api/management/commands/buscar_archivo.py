@@ -0,0 +1,53 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import archivo
+from api.filtros import FiltroInvalido, parsear_fecha
+from api.retencion import POLITICAS
+
+
+class Command(BaseCommand):
+    help = (
+        'Busca en los segmentos archivados de logs o actividades y escribe las '
+        'coincidencias como NDJSON. Los segmentos se descartan por su índice '
+        'sin descomprimirlos cuando no pueden contener coincidencias.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recurso', choices=sorted(POLITICAS), default='logs')
+        parser.add_argument('--nivel')
+        parser.add_argument('--modulo')
+        parser.add_argument('--usuario', type=int)
+        parser.add_argument('--desde', help='Fecha o fecha y hora ISO 8601')
+        parser.add_argument('--hasta', help='Fecha o fecha y hora ISO 8601 (inclusiva)')
+        parser.add_argument('--limite', type=int, help='Máximo de resultados')
+        parser.add_argument('--directorio', help='Directorio de archivo (por defecto RETENCION_DIRECTORIO)')
+
+    def handle(self, *args, **options):
+        try:
+            desde = parsear_fecha(options['desde'], 'desde') if options['desde'] else None
+            hasta = parsear_fecha(options['hasta'], 'hasta', fin_del_dia=True) if options['hasta'] else None
+        except FiltroInvalido as e:
+            raise CommandError(str(e))
+
+        restantes = options['limite']
+        cursor = None
+        leidos = omitidos = 0
+        while restantes is None or restantes > 0:
+            pagina = min(restantes, 1000) if restantes is not None else 1000
+            resultado = archivo.buscar(
+                options['recurso'], nivel=options['nivel'], modulo=options['modulo'],
+                id_usuario=options['usuario'], desde=desde, hasta=hasta,
+                limite=pagina, cursor=cursor, directorio=options['directorio']
+            )
+            for fila in resultado['resultados']:
+                self.stdout.write(json.dumps(fila, ensure_ascii=False))
+            leidos += resultado['segmentos_leidos']
+            omitidos += resultado['segmentos_omitidos']
+            if restantes is not None:
+                restantes -= len(resultado['resultados'])
+            cursor = resultado['siguiente']
+            if not cursor:
+                break
+        self.stderr.write(f'Segmentos leídos: {leidos}, descartados por índice: {omitidos}')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api import notificaciones
+
+
+class Command(BaseCommand):
+    help = 'Agrupa las notificaciones pendientes del modo resumen en una notificación por usuario'
+
+    def handle(self, *args, **options):
+        enviados = notificaciones.enviar_resumenes()
+        self.stdout.write(self.style.SUCCESS(f'Enviados {enviados} resúmenes'))
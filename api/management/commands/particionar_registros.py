@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api import retencion
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera (y con --ejecutar aplica) el DDL para particionar por mes '
+        'log_sistema o actividades_usuario en MariaDB/MySQL. Elimina las claves '
+        'foráneas de la tabla y agrega la columna de fecha a la clave primaria, '
+        'requisitos del particionado. Conviene ejecutarlo en una ventana de '
+        'mantenimiento: reescribe la tabla completa.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('recurso', choices=sorted(retencion.POLITICAS))
+        parser.add_argument('--meses-futuros', type=int, default=3, help='Particiones a crear por delante')
+        parser.add_argument('--ejecutar', action='store_true', help='Aplica el DDL en lugar de mostrarlo')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'mysql':
+            raise CommandError('El particionado solo está disponible en MariaDB/MySQL')
+        modelo, _ = retencion.POLITICAS[options['recurso']]
+        if retencion.particiones(modelo):
+            raise CommandError(f'{modelo._meta.db_table} ya está particionada')
+
+        sentencias = retencion.sentencias_particionado(options['recurso'], options['meses_futuros'])
+        for sentencia in sentencias:
+            self.stdout.write(sentencia + ';')
+            if options['ejecutar']:
+                with connection.cursor() as cursor:
+                    cursor.execute(sentencia)
+        if options['ejecutar']:
+            self.stdout.write(self.style.SUCCESS(f'{modelo._meta.db_table} particionada'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from api import difusion
+from api.models import DifusionNotificacion
+
+
+class Command(BaseCommand):
+    help = 'Retoma en primer plano las difusiones de notificaciones pendientes o interrumpidas'
+
+    def handle(self, *args, **options):
+        ids = list(
+            DifusionNotificacion.objects.filter(estado__in=['pendiente', 'en_proceso'])
+            .order_by('id_difusion').values_list('id_difusion', flat=True)
+        )
+        procesadas = 0
+        for id_difusion in ids:
+            resultado = difusion.ejecutar(id_difusion)
+            if resultado is None:
+                self.stdout.write(f'Difusión {id_difusion}: en ejecución en otro proceso, se omite')
+                continue
+            procesadas += 1
+            self.stdout.write(
+                f'Difusión {id_difusion}: {resultado.estado} '
+                f'({resultado.enviadas}/{resultado.total_destinatarios})'
+            )
+        self.stdout.write(self.style.SUCCESS(f'Procesadas {procesadas} difusiones'))
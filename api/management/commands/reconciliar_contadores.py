@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from api import contadores
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula los contadores de estadisticas_generales y los de '
+        'notificaciones sin leer de cada usuario sobre las tablas y corrige '
+        'la deriva. Pensado para ejecutarse periódicamente (cron).'
+    )
+
+    def handle(self, *args, **options):
+        deriva = contadores.reconciliar()
+        deriva_usuarios = contadores.reconciliar_no_leidas_usuarios()
+        if not deriva and not deriva_usuarios:
+            self.stdout.write(self.style.SUCCESS('Contadores al día, sin deriva'))
+            return
+        for contador, (anterior, real) in sorted(deriva.items()):
+            self.stdout.write(f'  {contador}: {anterior} -> {real}')
+        for id_usuario, (anterior, real) in sorted(deriva_usuarios.items()):
+            self.stdout.write(f'  no_leidas del usuario {id_usuario}: {anterior} -> {real}')
+        self.stdout.write(self.style.WARNING(
+            f'Corregidos {len(deriva)} contadores generales y {len(deriva_usuarios)} de usuarios'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api import contadores
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye por completo la tabla departamento_estadisticas desde empleados'
+
+    def handle(self, *args, **options):
+        total = contadores.reconstruir_departamentos()
+        self.stdout.write(self.style.SUCCESS(f'Reconstruidas las estadísticas de {total} departamentos'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api import busqueda
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstruye la tabla de tokens de búsqueda de empleados. En '
+        'MariaDB/MySQL no hace nada: el índice FULLTEXT lo mantiene el motor.'
+    )
+
+    def handle(self, *args, **options):
+        if busqueda.usa_fulltext():
+            self.stdout.write('MariaDB/MySQL usa el índice FULLTEXT; no hay tabla que reconstruir')
+            return
+        total = busqueda.reindexar_todo()
+        self.stdout.write(self.style.SUCCESS(f'Indexados {total} empleados'))
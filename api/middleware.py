@@ -0,0 +1,100 @@
+"""
+Middleware de la API.
+"""
+import random
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from .autenticacion import autenticar_peticion
+from .escritura_diferida import EscritorPorLotes
+from .models import Usuario
+from .registro import ip_cliente
+
+METODOS_LECTURA = {'GET', 'HEAD', 'OPTIONS'}
+
+_escritor_actividades = None
+
+
+def escritor_actividades():
+    global _escritor_actividades
+    if _escritor_actividades is None:
+        _escritor_actividades = EscritorPorLotes(
+            'api.ActividadUsuario', **getattr(settings, 'ACTIVIDAD_ESCRITURA', {})
+        )
+    return _escritor_actividades
+
+
+def _usuario(request):
+    """Usuario de la API autenticado en la petición, si lo hay"""
+    usuario = getattr(request, 'usuario', None)
+    if usuario is None:
+        usuario = getattr(request, 'user', None)
+    return usuario if isinstance(usuario, Usuario) else None
+
+
+class SesionUsuarioMiddleware:
+    """
+    Valida el token de sesión ('Authorization: Bearer <token>') y deja el
+    Usuario en request.usuario y la Sesion en request.sesion (None si no hay
+    token o no es válido). No rechaza peticiones: eso lo hace la
+    autenticación de DRF, que reutiliza esta validación.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        resultado = autenticar_peticion(request)
+        request.usuario, request.sesion = resultado if isinstance(resultado, tuple) else (None, None)
+        return self.get_response(request)
+
+
+class ActividadUsuarioMiddleware:
+    """
+    Registra en ActividadUsuario las llamadas a la API de usuarios
+    autenticados, con escritura diferida por lotes.
+
+    Las lecturas (GET/HEAD/OPTIONS) se muestrean según ACTIVIDAD_MUESTREO,
+    un diccionario {nombre de ruta: fracción entre 0 y 1} con la clave '*'
+    como valor por defecto; las escrituras se registran siempre. La fracción
+    aplicada queda en datos_adicionales['muestreo'] para poder extrapolar.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        fecha = timezone.now()
+        inicio = time.monotonic()
+        response = self.get_response(request)
+
+        coincidencia = getattr(request, 'resolver_match', None)
+        if coincidencia is None or not coincidencia.route.startswith('api/'):
+            return response
+        usuario = _usuario(request)
+        if usuario is None:
+            return response
+
+        muestreo = 1.0
+        if request.method in METODOS_LECTURA:
+            tasas = getattr(settings, 'ACTIVIDAD_MUESTREO', {})
+            muestreo = tasas.get(coincidencia.url_name, tasas.get('*', 1.0))
+            if muestreo <= 0 or random.random() >= muestreo:
+                return response
+
+        partes = coincidencia.route.split('/')
+        escritor_actividades().agregar({
+            'fecha_actividad': fecha,
+            'id_usuario_id': usuario.pk,
+            'accion': f'{request.method} {coincidencia.url_name or coincidencia.route}'[:100],
+            'modulo': partes[1][:50] if len(partes) > 1 else None,
+            'ip_origen': ip_cliente(request),
+            'datos_adicionales': {
+                'ruta': request.path,
+                'parametros': coincidencia.kwargs,
+                'estado': response.status_code,
+                'duracion_ms': round((time.monotonic() - inicio) * 1000, 1),
+                'muestreo': muestreo,
+            },
+        })
+        return response
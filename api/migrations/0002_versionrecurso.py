@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionRecurso',
+            fields=[
+                ('recurso', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+                ('fecha_modificacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Versión de Recurso',
+                'verbose_name_plural': 'Versiones de Recursos',
+                'db_table': 'versiones_recursos',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='empleado',
+            index=models.Index(fields=['fecha_modificacion'], name='empleados_fecha_mod_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['fecha_modificacion'], name='usuarios_fecha_mod_idx'),
+        ),
+    ]
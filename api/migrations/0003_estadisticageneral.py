@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:01
+
+from django.db import migrations, models
+
+
+def inicializar_contadores(apps, schema_editor):
+    modelo = lambda nombre: apps.get_model('api', nombre)
+    modelo('EstadisticaGeneral').objects.update_or_create(pk=1, defaults={
+        'total_empleados': modelo('Empleado').objects.count(),
+        'empleados_activos': modelo('Empleado').objects.filter(estado='activo').count(),
+        'total_departamentos': modelo('Departamento').objects.filter(estado='activo').count(),
+        'total_roles': modelo('Rol').objects.filter(estado='activo').count(),
+        'usuarios_activos': modelo('Usuario').objects.filter(estado='activo').count(),
+        'sesiones_activas': modelo('Sesion').objects.filter(activa=True).count(),
+        'notificaciones_no_leidas': modelo('Notificacion').objects.filter(leida=False).count(),
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_versionrecurso'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaGeneral',
+            fields=[
+                ('id_estadistica', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('total_empleados', models.BigIntegerField(default=0)),
+                ('empleados_activos', models.BigIntegerField(default=0)),
+                ('total_departamentos', models.BigIntegerField(default=0)),
+                ('total_roles', models.BigIntegerField(default=0)),
+                ('usuarios_activos', models.BigIntegerField(default=0)),
+                ('sesiones_activas', models.BigIntegerField(default=0)),
+                ('notificaciones_no_leidas', models.BigIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('fecha_reconciliacion', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Estadística General',
+                'verbose_name_plural': 'Estadísticas Generales',
+                'db_table': 'estadisticas_generales',
+            },
+        ),
+        migrations.RunPython(inicializar_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.utils import timezone
+
+
+def construir_estadisticas(apps, schema_editor):
+    Departamento = apps.get_model('api', 'Departamento')
+    DepartamentoEstadistica = apps.get_model('api', 'DepartamentoEstadistica')
+    ahora = timezone.now()
+    for fila in Departamento.objects.annotate(
+        total=Count('empleado'),
+        activos=Count('empleado', filter=Q(empleado__estado='activo')),
+        inactivos=Count('empleado', filter=Q(empleado__estado='inactivo')),
+        suspendidos=Count('empleado', filter=Q(empleado__estado='suspendido'))
+    ).values('id_departamento', 'total', 'activos', 'inactivos', 'suspendidos'):
+        DepartamentoEstadistica.objects.create(
+            id_departamento_id=fila['id_departamento'],
+            total_empleados=fila['total'],
+            empleados_activos=fila['activos'],
+            empleados_inactivos=fila['inactivos'],
+            empleados_suspendidos=fila['suspendidos'],
+            fecha_reconstruccion=ahora,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_estadisticageneral'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartamentoEstadistica',
+            fields=[
+                ('id_departamento', models.OneToOneField(db_column='id_departamento', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='estadisticas', serialize=False, to='api.departamento')),
+                ('total_empleados', models.IntegerField(default=0)),
+                ('empleados_activos', models.IntegerField(default=0)),
+                ('empleados_inactivos', models.IntegerField(default=0)),
+                ('empleados_suspendidos', models.IntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('fecha_reconstruccion', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Estadística de Departamento',
+                'verbose_name_plural': 'Estadísticas de Departamentos',
+                'db_table': 'departamento_estadisticas',
+            },
+        ),
+        migrations.RunPython(construir_estadisticas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:03
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Copia de api.busqueda.tokenizar en el momento de esta migración, para que
+# no cambie si lo hace el módulo
+_SEPARADORES = re.compile(r'[^0-9a-zñ]+')
+
+
+def tokenizar(texto):
+    texto = (texto or '').lower().replace('ñ', '\0')
+    texto = ''.join(
+        caracter for caracter in unicodedata.normalize('NFKD', texto)
+        if not unicodedata.combining(caracter)
+    ).replace('\0', 'ñ')
+    tokens = []
+    for token in _SEPARADORES.split(texto):
+        if token and token not in tokens:
+            tokens.append(token[:100])
+    return tokens
+
+
+def crear_indice_busqueda(apps, schema_editor):
+    """FULLTEXT en MariaDB/MySQL; tabla de tokens en los demás motores"""
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            'ALTER TABLE empleados ADD FULLTEXT INDEX empleados_busqueda_ft (nombres, apellidos, email)'
+        )
+        return
+    Empleado = apps.get_model('api', 'Empleado')
+    EmpleadoTokenBusqueda = apps.get_model('api', 'EmpleadoTokenBusqueda')
+    tokens = []
+    for empleado in Empleado.objects.only('nombres', 'apellidos', 'email', 'numero_documento').iterator():
+        vistos = set()
+        for campo in ('nombres', 'apellidos', 'email', 'numero_documento'):
+            for token in tokenizar(getattr(empleado, campo)):
+                if token not in vistos:
+                    vistos.add(token)
+                    tokens.append(EmpleadoTokenBusqueda(id_empleado_id=empleado.pk, token=token))
+    EmpleadoTokenBusqueda.objects.bulk_create(tokens, batch_size=1000)
+
+
+def eliminar_indice_busqueda(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE empleados DROP INDEX empleados_busqueda_ft')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_departamentoestadistica'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmpleadoTokenBusqueda',
+            fields=[
+                ('id_token', models.BigAutoField(primary_key=True, serialize=False)),
+                ('token', models.CharField(max_length=100)),
+                ('id_empleado', models.ForeignKey(db_column='id_empleado', on_delete=django.db.models.deletion.CASCADE, related_name='tokens_busqueda', to='api.empleado')),
+            ],
+            options={
+                'verbose_name': 'Token de Búsqueda',
+                'verbose_name_plural': 'Tokens de Búsqueda',
+                'db_table': 'empleados_tokens_busqueda',
+                'indexes': [models.Index(fields=['token', 'id_empleado'], name='tokens_busqueda_token_idx')],
+                'unique_together': {('id_empleado', 'token')},
+            },
+        ),
+        migrations.RunPython(crear_indice_busqueda, eliminar_indice_busqueda),
+    ]
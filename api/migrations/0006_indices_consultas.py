@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_busqueda_empleados'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='actividadusuario',
+            index=models.Index(fields=['fecha_actividad'], name='actividades_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='empleado',
+            index=models.Index(fields=['estado', 'id_departamento'], name='empleados_estado_depto_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logsistema',
+            index=models.Index(fields=['fecha_log'], name='log_sistema_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['id_usuario', 'fecha_creacion'], name='notif_usuario_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['id_usuario', 'leida', 'fecha_creacion'], name='notif_usuario_leida_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['id_usuario', 'leida', 'tipo', 'fecha_creacion'], name='notif_usuario_leida_tipo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rol',
+            index=models.Index(fields=['id_departamento', 'estado'], name='roles_depto_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sesion',
+            index=models.Index(fields=['activa', 'fecha_expiracion'], name='sesiones_activa_exp_idx'),
+        ),
+    ]
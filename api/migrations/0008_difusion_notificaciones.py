@@ -0,0 +1,42 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_contador_notificaciones_usuario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DifusionNotificacion',
+            fields=[
+                ('id_difusion', models.AutoField(primary_key=True, serialize=False)),
+                ('titulo', models.CharField(max_length=200)),
+                ('mensaje', models.TextField()),
+                ('tipo', models.CharField(choices=[('info', 'Información'), ('warning', 'Advertencia'), ('error', 'Error'), ('success', 'Éxito')], default='info', max_length=10)),
+                ('categoria', models.CharField(choices=[('sistema', 'Sistema'), ('seguridad', 'Seguridad'), ('trabajo', 'Trabajo'), ('personal', 'Personal')], default='sistema', max_length=12)),
+                ('url_accion', models.CharField(blank=True, max_length=255, null=True)),
+                ('fecha_expiracion', models.DateTimeField(blank=True, null=True)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En proceso'), ('completada', 'Completada'), ('fallida', 'Fallida')], default='pendiente', max_length=12)),
+                ('total_destinatarios', models.IntegerField(blank=True, null=True)),
+                ('enviadas', models.IntegerField(default=0)),
+                ('ultimo_id_usuario', models.IntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('id_departamento', models.ForeignKey(blank=True, db_column='id_departamento', null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.departamento')),
+                ('id_rol', models.ForeignKey(blank=True, db_column='id_rol', null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.rol')),
+            ],
+            options={
+                'verbose_name': 'Difusión de Notificación',
+                'verbose_name_plural': 'Difusiones de Notificaciones',
+                'db_table': 'difusiones_notificaciones',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_difusion_notificaciones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificacionPendienteResumen',
+            fields=[
+                ('id_pendiente', models.AutoField(primary_key=True, serialize=False)),
+                ('titulo', models.CharField(max_length=200)),
+                ('mensaje', models.TextField()),
+                ('categoria', models.CharField(choices=[('sistema', 'Sistema'), ('seguridad', 'Seguridad'), ('trabajo', 'Trabajo'), ('personal', 'Personal')], default='sistema', max_length=12)),
+                ('url_accion', models.CharField(blank=True, max_length=255, null=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Notificación Pendiente de Resumen',
+                'verbose_name_plural': 'Notificaciones Pendientes de Resumen',
+                'db_table': 'notificaciones_pendientes_resumen',
+            },
+        ),
+        migrations.AddField(
+            model_name='notificacion',
+            name='clave_dedup',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='notificacion',
+            name='fecha_ultima_ocurrencia',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notificacion',
+            name='ocurrencias',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['id_usuario', 'clave_dedup', 'leida'], name='notif_usuario_dedup_idx'),
+        ),
+        migrations.AddField(
+            model_name='notificacionpendienteresumen',
+            name='id_usuario',
+            field=models.ForeignKey(db_column='id_usuario', on_delete=django.db.models.deletion.CASCADE, to='api.usuario'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacionpendienteresumen',
+            index=models.Index(fields=['id_usuario', 'id_pendiente'], name='notif_pend_usuario_idx'),
+        ),
+    ]
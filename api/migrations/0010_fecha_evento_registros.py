@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:17
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_deduplicacion_resumen_notificaciones'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='actividadusuario',
+            name='fecha_actividad',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='logsistema',
+            name='fecha_log',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
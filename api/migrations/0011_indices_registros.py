@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_fecha_evento_registros'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='actividadusuario',
+            index=models.Index(fields=['id_usuario', 'fecha_actividad'], name='actividades_usuario_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actividadusuario',
+            index=models.Index(fields=['modulo', 'fecha_actividad'], name='actividades_modulo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actividadusuario',
+            index=models.Index(fields=['accion', 'fecha_actividad'], name='actividades_accion_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logsistema',
+            index=models.Index(fields=['nivel', 'fecha_log'], name='log_sistema_nivel_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logsistema',
+            index=models.Index(fields=['modulo', 'fecha_log'], name='log_sistema_modulo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logsistema',
+            index=models.Index(fields=['id_usuario', 'fecha_log'], name='log_sistema_usuario_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_indices_registros'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarcaAgregacion',
+            fields=[
+                ('nombre', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('ultimo_id', models.BigIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Marca de Agregación',
+                'verbose_name_plural': 'Marcas de Agregación',
+                'db_table': 'marcas_agregacion',
+            },
+        ),
+        migrations.CreateModel(
+            name='ActividadResumenHora',
+            fields=[
+                ('id_resumen', models.BigAutoField(primary_key=True, serialize=False)),
+                ('hora', models.DateTimeField()),
+                ('modulo', models.CharField(blank=True, default='', max_length=50)),
+                ('accion', models.CharField(max_length=100)),
+                ('total', models.IntegerField(default=0)),
+                ('id_usuario', models.ForeignKey(db_column='id_usuario', on_delete=django.db.models.deletion.CASCADE, to='api.usuario')),
+            ],
+            options={
+                'verbose_name': 'Resumen Horario de Actividad',
+                'verbose_name_plural': 'Resúmenes Horarios de Actividad',
+                'db_table': 'actividades_resumen_hora',
+                'indexes': [models.Index(fields=['id_usuario', 'hora'], name='act_resumen_usuario_hora_idx'), models.Index(fields=['modulo', 'hora'], name='act_resumen_modulo_hora_idx')],
+                'unique_together': {('hora', 'modulo', 'accion', 'id_usuario')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:25
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def calcular_hashes(apps, schema_editor):
+    Sesion = apps.get_model('api', 'Sesion')
+    sesiones = []
+    for sesion in Sesion.objects.filter(token_hash__isnull=True).only('token_sesion').iterator():
+        sesion.token_hash = hashlib.sha256(sesion.token_sesion.encode('utf-8')).hexdigest()
+        sesiones.append(sesion)
+    Sesion.objects.bulk_update(sesiones, ['token_hash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_resumen_actividades'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sesion',
+            name='token_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(calcular_hashes, migrations.RunPython.noop),
+    ]
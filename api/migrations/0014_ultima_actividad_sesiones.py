@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_token_hash_sesiones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sesion',
+            name='ultima_actividad',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
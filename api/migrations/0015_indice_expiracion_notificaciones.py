@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_ultima_actividad_sesiones'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['fecha_expiracion'], name='notif_expiracion_idx'),
+        ),
+    ]
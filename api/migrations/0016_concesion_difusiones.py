@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_indice_expiracion_notificaciones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='difusionnotificacion',
+            name='procesando_desde',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:05
+
+import hashlib
+
+from django.db import migrations
+from django.db.models import F
+
+
+def guardar_solo_hash(apps, schema_editor):
+    """Las sesiones anteriores a 0013 guardaban el token en claro en token_sesion"""
+    Sesion = apps.get_model('api', 'Sesion')
+    sesiones = []
+    for sesion in Sesion.objects.filter(token_hash__isnull=True).only('token_sesion').iterator():
+        sesion.token_hash = hashlib.sha256(sesion.token_sesion.encode('utf-8')).hexdigest()
+        sesiones.append(sesion)
+    Sesion.objects.bulk_update(sesiones, ['token_hash'], batch_size=1000)
+    Sesion.objects.exclude(token_sesion=F('token_hash')).update(token_sesion=F('token_hash'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_concesion_difusiones'),
+    ]
+
+    # Sin reverse_code: el token en claro no se puede recuperar de su hash,
+    # así que revertir esta migración debe fallar en vez de no hacer nada
+    operations = [
+        migrations.RunPython(guardar_solo_hash),
+    ]
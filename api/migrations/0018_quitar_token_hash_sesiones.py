@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_sesiones_solo_hash'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='sesion',
+            name='token_hash',
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:20
+
+import re
+import unicodedata
+
+from django.db import migrations
+
+# Copias de api.busqueda en el momento de esta migración: la ñ se compara
+# como n (collation general_ci) y el documento deja de indexarse
+_SEPARADORES = re.compile(r'[^0-9a-z]+')
+CAMPOS = ('nombres', 'apellidos', 'email')
+
+# Reglas anteriores (0005), para revertir
+_SEPARADORES_ANTERIOR = re.compile(r'[^0-9a-zñ]+')
+CAMPOS_ANTERIOR = ('nombres', 'apellidos', 'email', 'numero_documento')
+
+
+def _normalizar(texto, conservar_enie):
+    texto = (texto or '').lower()
+    if conservar_enie:
+        texto = texto.replace('ñ', '\0')
+    texto = ''.join(
+        caracter for caracter in unicodedata.normalize('NFKD', texto)
+        if not unicodedata.combining(caracter)
+    )
+    return texto.replace('\0', 'ñ') if conservar_enie else texto
+
+
+def _reindexar(apps, schema_editor, campos, separadores, conservar_enie):
+    if schema_editor.connection.vendor == 'mysql':
+        # MariaDB/MySQL usa el índice FULLTEXT, no la tabla de tokens
+        return
+    Empleado = apps.get_model('api', 'Empleado')
+    EmpleadoTokenBusqueda = apps.get_model('api', 'EmpleadoTokenBusqueda')
+    EmpleadoTokenBusqueda.objects.all().delete()
+    tokens = []
+    for empleado in Empleado.objects.only(*campos).iterator():
+        vistos = set()
+        for campo in campos:
+            for token in separadores.split(_normalizar(getattr(empleado, campo), conservar_enie)):
+                if token and token[:100] not in vistos:
+                    vistos.add(token[:100])
+                    tokens.append(EmpleadoTokenBusqueda(id_empleado_id=empleado.pk, token=token[:100]))
+    EmpleadoTokenBusqueda.objects.bulk_create(tokens, batch_size=1000)
+
+
+def reindexar(apps, schema_editor):
+    _reindexar(apps, schema_editor, CAMPOS, _SEPARADORES, conservar_enie=False)
+
+
+def reindexar_anterior(apps, schema_editor):
+    _reindexar(apps, schema_editor, CAMPOS_ANTERIOR, _SEPARADORES_ANTERIOR, conservar_enie=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_quitar_token_hash_sesiones'),
+    ]
+
+    operations = [
+        migrations.RunPython(reindexar, reindexar_anterior),
+    ]
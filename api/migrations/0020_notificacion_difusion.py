@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_tokens_busqueda_sin_enie'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificacion',
+            name='id_difusion',
+            field=models.ForeignKey(blank=True, db_column='id_difusion', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notificaciones', to='api.difusionnotificacion'),
+        ),
+    ]
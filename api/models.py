@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 import json
 
@@ -54,6 +55,9 @@ class Rol(models.Model):
         db_table = 'roles'
         verbose_name = 'Rol'
         verbose_name_plural = 'Roles'
+        indexes = [
+            models.Index(fields=['id_departamento', 'estado'], name='roles_depto_estado_idx'),
+        ]
     
     def __str__(self):
         return f"{self.nombre} - {self.id_departamento.nombre}"
@@ -98,6 +102,10 @@ class Empleado(models.Model):
         db_table = 'empleados'
         verbose_name = 'Empleado'
         verbose_name_plural = 'Empleados'
+        indexes = [
+            models.Index(fields=['fecha_modificacion'], name='empleados_fecha_mod_idx'),
+            models.Index(fields=['estado', 'id_departamento'], name='empleados_estado_depto_idx'),
+        ]
     
     def __str__(self):
         return f"{self.nombres} {self.apellidos}"
@@ -136,14 +144,32 @@ class Usuario(models.Model):
         db_table = 'usuarios'
         verbose_name = 'Usuario'
         verbose_name_plural = 'Usuarios'
+        indexes = [
+            models.Index(fields=['fecha_modificacion'], name='usuarios_fecha_mod_idx'),
+        ]
     
     def __str__(self):
         return f"{self.username} - {self.id_empleado.nombre_completo}"
 
+    # Interfaz mínima de usuario para DRF (request.user) y los permisos
+    @property
+    def is_authenticated(self):
+        return True
+
+    @property
+    def is_anonymous(self):
+        return False
+
 # =============================================
 # 5. SESIONES
 # =============================================
 class Sesion(models.Model):
+    """
+    El token en claro solo lo recibe el cliente: token_sesion guarda su
+    SHA-256 (autenticacion.hash_token), que es la clave de búsqueda de la
+    autenticación. Para rotar el token se asigna
+    token_sesion = hash_token(nuevo_token).
+    """
     id_sesion = models.AutoField(primary_key=True)
     id_usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, db_column='id_usuario')
     token_sesion = models.CharField(max_length=255, unique=True)
@@ -152,6 +178,8 @@ class Sesion(models.Model):
     fecha_inicio = models.DateTimeField(auto_now_add=True)
     fecha_expiracion = models.DateTimeField()
     activa = models.BooleanField(default=True)
+    # Escrita en diferido por api.accesos
+    ultima_actividad = models.DateTimeField(blank=True, null=True)
     ubicacion = models.CharField(max_length=100, blank=True, null=True)
     dispositivo = models.CharField(max_length=100, blank=True, null=True)
     
@@ -159,6 +187,9 @@ class Sesion(models.Model):
         db_table = 'sesiones'
         verbose_name = 'Sesión'
         verbose_name_plural = 'Sesiones'
+        indexes = [
+            models.Index(fields=['activa', 'fecha_expiracion'], name='sesiones_activa_exp_idx'),
+        ]
     
     def __str__(self):
         return f"Sesión {self.id_usuario.username} - {self.fecha_inicio}"
@@ -216,12 +247,27 @@ class Notificacion(models.Model):
     url_accion = models.CharField(max_length=255, blank=True, null=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_expiracion = models.DateTimeField(blank=True, null=True)
+    clave_dedup = models.CharField(max_length=64, blank=True, null=True)
+    ocurrencias = models.PositiveIntegerField(default=1)
+    fecha_ultima_ocurrencia = models.DateTimeField(blank=True, null=True)
+    # Difusión que la creó (api.difusion), para releer las filas de un lote
+    id_difusion = models.ForeignKey(
+        'DifusionNotificacion', on_delete=models.SET_NULL, db_column='id_difusion', blank=True, null=True,
+        related_name='notificaciones'
+    )
     
     class Meta:
         db_table = 'notificaciones'
         verbose_name = 'Notificación'
         verbose_name_plural = 'Notificaciones'
         ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['id_usuario', 'fecha_creacion'], name='notif_usuario_fecha_idx'),
+            models.Index(fields=['id_usuario', 'leida', 'fecha_creacion'], name='notif_usuario_leida_idx'),
+            models.Index(fields=['id_usuario', 'leida', 'tipo', 'fecha_creacion'], name='notif_usuario_leida_tipo_idx'),
+            models.Index(fields=['id_usuario', 'clave_dedup', 'leida'], name='notif_usuario_dedup_idx'),
+            models.Index(fields=['fecha_expiracion'], name='notif_expiracion_idx'),
+        ]
     
     def __str__(self):
         return f"{self.titulo} - {self.id_usuario.username}"
@@ -237,13 +283,21 @@ class ActividadUsuario(models.Model):
     modulo = models.CharField(max_length=50, blank=True, null=True)
     ip_origen = models.CharField(max_length=45, blank=True, null=True)
     datos_adicionales = models.JSONField(default=dict)
-    fecha_actividad = models.DateTimeField(auto_now_add=True)
+    # Con default en lugar de auto_now_add para conservar la hora del evento
+    # en las inserciones diferidas por lotes
+    fecha_actividad = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         db_table = 'actividades_usuario'
         verbose_name = 'Actividad de Usuario'
         verbose_name_plural = 'Actividades de Usuario'
         ordering = ['-fecha_actividad']
+        indexes = [
+            models.Index(fields=['fecha_actividad'], name='actividades_fecha_idx'),
+            models.Index(fields=['id_usuario', 'fecha_actividad'], name='actividades_usuario_fecha_idx'),
+            models.Index(fields=['modulo', 'fecha_actividad'], name='actividades_modulo_fecha_idx'),
+            models.Index(fields=['accion', 'fecha_actividad'], name='actividades_accion_fecha_idx'),
+        ]
     
     def __str__(self):
         return f"{self.accion} - {self.id_usuario.username} - {self.fecha_actividad}"
@@ -268,13 +322,269 @@ class LogSistema(models.Model):
     ip_origen = models.CharField(max_length=45, blank=True, null=True)
     user_agent = models.TextField(blank=True, null=True)
     datos_contexto = models.JSONField(default=dict)
-    fecha_log = models.DateTimeField(auto_now_add=True)
+    fecha_log = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         db_table = 'log_sistema'
         verbose_name = 'Log del Sistema'
         verbose_name_plural = 'Logs del Sistema'
         ordering = ['-fecha_log']
+        indexes = [
+            models.Index(fields=['fecha_log'], name='log_sistema_fecha_idx'),
+            models.Index(fields=['nivel', 'fecha_log'], name='log_sistema_nivel_fecha_idx'),
+            models.Index(fields=['modulo', 'fecha_log'], name='log_sistema_modulo_fecha_idx'),
+            models.Index(fields=['id_usuario', 'fecha_log'], name='log_sistema_usuario_fecha_idx'),
+        ]
     
     def __str__(self):
         return f"{self.nivel} - {self.mensaje[:50]}... - {self.fecha_log}"
+
+# =============================================
+# 10. VERSIONES_RECURSOS
+# =============================================
+class VersionRecurso(models.Model):
+    """
+    Contador de versión por recurso, usado como validador de caché HTTP
+    (ETag / Last-Modified) para tablas sin fecha de modificación y para
+    registrar borrados, que no dejan rastro en MAX(fecha_modificacion).
+    """
+    recurso = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    fecha_modificacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'versiones_recursos'
+        verbose_name = 'Versión de Recurso'
+        verbose_name_plural = 'Versiones de Recursos'
+    
+    def __str__(self):
+        return f"{self.recurso} v{self.version}"
+
+# =============================================
+# 11. ESTADISTICAS_GENERALES
+# =============================================
+class EstadisticaGeneral(models.Model):
+    """
+    Contadores de estadisticas_generales repartidos en fragmentos (id 1..N,
+    api.contadores): el valor de cada contador es la suma de las filas.
+    Mantenidos por señales y corregidos periódicamente con
+    `manage.py reconciliar_contadores`.
+    """
+    id_estadistica = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    total_empleados = models.BigIntegerField(default=0)
+    empleados_activos = models.BigIntegerField(default=0)
+    total_departamentos = models.BigIntegerField(default=0)
+    total_roles = models.BigIntegerField(default=0)
+    usuarios_activos = models.BigIntegerField(default=0)
+    sesiones_activas = models.BigIntegerField(default=0)
+    notificaciones_no_leidas = models.BigIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    fecha_reconciliacion = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'estadisticas_generales'
+        verbose_name = 'Estadística General'
+        verbose_name_plural = 'Estadísticas Generales'
+    
+    def __str__(self):
+        return f"Estadísticas generales - {self.fecha_actualizacion}"
+
+# =============================================
+# 12. DEPARTAMENTO_ESTADISTICAS
+# =============================================
+class DepartamentoEstadistica(models.Model):
+    """
+    Conteo materializado de empleados por departamento y estado, mantenido
+    por señales de Empleado y reconstruible con
+    `manage.py reconstruir_estadisticas_departamentos`.
+    """
+    id_departamento = models.OneToOneField(
+        Departamento, on_delete=models.CASCADE, primary_key=True,
+        db_column='id_departamento', related_name='estadisticas'
+    )
+    total_empleados = models.IntegerField(default=0)
+    empleados_activos = models.IntegerField(default=0)
+    empleados_inactivos = models.IntegerField(default=0)
+    empleados_suspendidos = models.IntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    fecha_reconstruccion = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'departamento_estadisticas'
+        verbose_name = 'Estadística de Departamento'
+        verbose_name_plural = 'Estadísticas de Departamentos'
+    
+    def __str__(self):
+        return f"Estadísticas de {self.id_departamento_id}"
+
+# =============================================
+# 13. EMPLEADOS_TOKENS_BUSQUEDA
+# =============================================
+class EmpleadoTokenBusqueda(models.Model):
+    """
+    Tokens normalizados (minúsculas, sin tildes) de nombres, apellidos, email
+    y documento de cada empleado, para búsqueda indexada por prefijo en
+    motores sin índice FULLTEXT. En MariaDB/MySQL se usa FULLTEXT y esta
+    tabla no se mantiene.
+    """
+    id_token = models.BigAutoField(primary_key=True)
+    id_empleado = models.ForeignKey(Empleado, on_delete=models.CASCADE, db_column='id_empleado', related_name='tokens_busqueda')
+    token = models.CharField(max_length=100)
+    
+    class Meta:
+        db_table = 'empleados_tokens_busqueda'
+        verbose_name = 'Token de Búsqueda'
+        verbose_name_plural = 'Tokens de Búsqueda'
+        unique_together = [('id_empleado', 'token')]
+        indexes = [
+            models.Index(fields=['token', 'id_empleado'], name='tokens_busqueda_token_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.token} - {self.id_empleado_id}"
+
+# =============================================
+# 14. NOTIFICACIONES_NO_LEIDAS_USUARIO
+# =============================================
+class ContadorNotificacionesUsuario(models.Model):
+    """
+    Número de notificaciones sin leer de cada usuario, mantenido al crear,
+    leer o eliminar notificaciones, para el contador del buzón.
+    """
+    id_usuario = models.OneToOneField(
+        Usuario, on_delete=models.CASCADE, primary_key=True,
+        db_column='id_usuario', related_name='contador_notificaciones'
+    )
+    no_leidas = models.IntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'notificaciones_no_leidas_usuario'
+        verbose_name = 'Contador de Notificaciones'
+        verbose_name_plural = 'Contadores de Notificaciones'
+    
+    def __str__(self):
+        return f"{self.id_usuario_id}: {self.no_leidas} sin leer"
+
+# =============================================
+# 15. DIFUSIONES_NOTIFICACIONES
+# =============================================
+class DifusionNotificacion(models.Model):
+    """
+    Envío de una misma notificación a todos los usuarios activos de un
+    departamento y/o rol. Las notificaciones se crean en segundo plano y
+    por lotes; `enviadas` y `ultimo_id_usuario` registran el avance.
+    """
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En proceso'),
+        ('completada', 'Completada'),
+        ('fallida', 'Fallida'),
+    ]
+    
+    id_difusion = models.AutoField(primary_key=True)
+    titulo = models.CharField(max_length=200)
+    mensaje = models.TextField()
+    tipo = models.CharField(max_length=10, choices=Notificacion.TIPO_CHOICES, default='info')
+    categoria = models.CharField(max_length=12, choices=Notificacion.CATEGORIA_CHOICES, default='sistema')
+    url_accion = models.CharField(max_length=255, blank=True, null=True)
+    fecha_expiracion = models.DateTimeField(blank=True, null=True)
+    id_departamento = models.ForeignKey(
+        Departamento, on_delete=models.SET_NULL, db_column='id_departamento', blank=True, null=True
+    )
+    id_rol = models.ForeignKey(Rol, on_delete=models.SET_NULL, db_column='id_rol', blank=True, null=True)
+    estado = models.CharField(max_length=12, choices=ESTADO_CHOICES, default='pendiente')
+    total_destinatarios = models.IntegerField(blank=True, null=True)
+    enviadas = models.IntegerField(default=0)
+    ultimo_id_usuario = models.IntegerField(blank=True, null=True)
+    # Concesión del proceso que la ejecuta (api.difusion); se renueva en cada lote
+    procesando_desde = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(blank=True, null=True)
+    fecha_fin = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'difusiones_notificaciones'
+        verbose_name = 'Difusión de Notificación'
+        verbose_name_plural = 'Difusiones de Notificaciones'
+        ordering = ['-fecha_creacion']
+    
+    def __str__(self):
+        return f"{self.titulo} - {self.estado}"
+
+# =============================================
+# 16. NOTIFICACIONES_PENDIENTES_RESUMEN
+# =============================================
+class NotificacionPendienteResumen(models.Model):
+    """
+    Notificación informativa retenida para un usuario con el modo resumen
+    activo; se agrupa en una notificación de resumen con
+    `manage.py enviar_resumenes_notificaciones`.
+    """
+    id_pendiente = models.AutoField(primary_key=True)
+    id_usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, db_column='id_usuario')
+    titulo = models.CharField(max_length=200)
+    mensaje = models.TextField()
+    categoria = models.CharField(max_length=12, choices=Notificacion.CATEGORIA_CHOICES, default='sistema')
+    url_accion = models.CharField(max_length=255, blank=True, null=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'notificaciones_pendientes_resumen'
+        verbose_name = 'Notificación Pendiente de Resumen'
+        verbose_name_plural = 'Notificaciones Pendientes de Resumen'
+        indexes = [
+            models.Index(fields=['id_usuario', 'id_pendiente'], name='notif_pend_usuario_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.titulo} - {self.id_usuario_id}"
+
+# =============================================
+# 17. MARCAS_AGREGACION
+# =============================================
+class MarcaAgregacion(models.Model):
+    """
+    Último id procesado por un trabajo de agregación incremental; se
+    actualiza en la misma transacción que los resultados del lote.
+    """
+    nombre = models.CharField(max_length=50, primary_key=True)
+    ultimo_id = models.BigIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'marcas_agregacion'
+        verbose_name = 'Marca de Agregación'
+        verbose_name_plural = 'Marcas de Agregación'
+    
+    def __str__(self):
+        return f"{self.nombre}: {self.ultimo_id}"
+
+# =============================================
+# 18. ACTIVIDADES_RESUMEN_HORA
+# =============================================
+class ActividadResumenHora(models.Model):
+    """
+    Número de actividades por hora, módulo, acción y usuario, mantenido por
+    `manage.py agregar_actividades` para las series de los tableros.
+    """
+    id_resumen = models.BigAutoField(primary_key=True)
+    hora = models.DateTimeField()
+    modulo = models.CharField(max_length=50, blank=True, default='')
+    accion = models.CharField(max_length=100)
+    id_usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, db_column='id_usuario')
+    total = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'actividades_resumen_hora'
+        verbose_name = 'Resumen Horario de Actividad'
+        verbose_name_plural = 'Resúmenes Horarios de Actividad'
+        unique_together = [('hora', 'modulo', 'accion', 'id_usuario')]
+        indexes = [
+            models.Index(fields=['id_usuario', 'hora'], name='act_resumen_usuario_hora_idx'),
+            models.Index(fields=['modulo', 'hora'], name='act_resumen_modulo_hora_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.hora} {self.modulo} {self.accion} {self.id_usuario_id}: {self.total}"
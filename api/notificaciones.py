@@ -0,0 +1,157 @@
+"""
+Creación de notificaciones con deduplicación y modo resumen.
+
+Deduplicación: cada notificación lleva una clave (hash de la clave del
+productor, o del título, y la categoría). Si el usuario ya tiene una sin
+leer y sin vencer con la misma clave cuya última ocurrencia cae dentro de
+la ventana NOTIFICACIONES_VENTANA_DEDUP, se incrementa su contador de
+ocurrencias en lugar de insertar otra fila. La búsqueda y la inserción se
+hacen con la fila de contador del usuario bloqueada (SELECT ... FOR
+UPDATE), así dos productores concurrentes para el mismo usuario no pueden
+insertar ambos.
+
+Resumen: los usuarios con configuracion_usuario['resumen_notificaciones']
+activo no reciben al instante las notificaciones de tipo 'info'; se guardan
+como pendientes y `enviar_resumenes()` (manage.py
+enviar_resumenes_notificaciones, ejecutado periódicamente) las agrupa en
+una sola notificación por usuario.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, Q, Value, When
+from django.utils import timezone
+
+from . import contadores
+from .models import ContadorNotificacionesUsuario, Notificacion, NotificacionPendienteResumen, Usuario
+
+# Títulos distintos que se detallan en el mensaje de un resumen
+MAXIMO_TITULOS_RESUMEN = 20
+
+
+def calcular_clave_dedup(titulo, categoria, clave=None):
+    base = f'{clave or titulo}\x1f{categoria}'
+    return hashlib.sha256(base.encode('utf-8')).hexdigest()
+
+
+def usa_resumen(id_usuario):
+    configuracion = Usuario.objects.filter(pk=id_usuario).values_list('configuracion_usuario', flat=True).first()
+    return isinstance(configuracion, dict) and bool(configuracion.get('resumen_notificaciones'))
+
+
+def crear_notificacion(id_usuario, titulo, mensaje, tipo='info', categoria='sistema',
+                       url_accion=None, fecha_expiracion=None, clave_dedup=None):
+    """
+    Crea, agrupa o difiere una notificación. Devuelve (resultado, objeto):
+    ('creada', Notificacion), ('agrupada', Notificacion existente) o
+    ('diferida', NotificacionPendienteResumen).
+    """
+    if tipo == 'info' and usa_resumen(id_usuario):
+        pendiente = NotificacionPendienteResumen.objects.create(
+            id_usuario_id=id_usuario, titulo=titulo, mensaje=mensaje,
+            categoria=categoria, url_accion=url_accion
+        )
+        return 'diferida', pendiente
+
+    clave = calcular_clave_dedup(titulo, categoria, clave_dedup)
+    ventana = getattr(settings, 'NOTIFICACIONES_VENTANA_DEDUP', 600)
+    if ventana:
+        # La fila que se bloquea debe existir: si no, se crea antes y fuera del bloqueo
+        contadores.obtener_no_leidas(id_usuario)
+    with transaction.atomic():
+        ahora = timezone.now()
+        if ventana:
+            _bloquear_usuario(id_usuario)
+            # Lectura con bloqueo: ve lo confirmado por quien tuvo el bloqueo antes
+            existente = Notificacion.objects.select_for_update().filter(
+                Q(fecha_expiracion__isnull=True) | Q(fecha_expiracion__gt=ahora),
+                id_usuario=id_usuario, clave_dedup=clave, leida=False,
+                fecha_ultima_ocurrencia__gte=ahora - timedelta(seconds=ventana),
+            ).order_by('-id_notificacion').first()
+            if existente is not None:
+                # La agrupada dura al menos lo que la nueva ocurrencia (NULL: no vence)
+                Notificacion.objects.filter(pk=existente.pk).update(
+                    ocurrencias=F('ocurrencias') + 1, fecha_ultima_ocurrencia=ahora,
+                    fecha_expiracion=None if fecha_expiracion is None else Case(
+                        When(fecha_expiracion__lt=fecha_expiracion, then=Value(fecha_expiracion)),
+                        default=F('fecha_expiracion'),
+                    ),
+                )
+                existente.refresh_from_db()
+                return 'agrupada', existente
+
+        notificacion = Notificacion.objects.create(
+            id_usuario_id=id_usuario, titulo=titulo, mensaje=mensaje, tipo=tipo,
+            categoria=categoria, url_accion=url_accion, fecha_expiracion=fecha_expiracion,
+            clave_dedup=clave, fecha_ultima_ocurrencia=ahora
+        )
+    return 'creada', notificacion
+
+
+def _bloquear_usuario(id_usuario):
+    """
+    Bloquea hasta el final de la transacción la fila de contador del
+    usuario, que serializa la deduplicación de sus notificaciones
+    """
+    list(ContadorNotificacionesUsuario.objects.select_for_update().filter(pk=id_usuario).values_list('pk'))
+
+
+def _mensaje_resumen(grupos, total):
+    lineas = []
+    detalladas = 0
+    for grupo in grupos:
+        repeticiones = f" (x{grupo['total']})" if grupo['total'] > 1 else ''
+        lineas.append(f"- {grupo['titulo']}{repeticiones}")
+        detalladas += grupo['total']
+    if total > detalladas:
+        lineas.append(f'... y {total - detalladas} más')
+    return '\n'.join(lineas)
+
+
+def enviar_resumen_usuario(id_usuario, hasta_id):
+    """
+    Agrupa las pendientes del usuario con id <= `hasta_id` en una
+    notificación y las elimina. Devuelve la notificación o None.
+    """
+    with transaction.atomic():
+        pendientes = NotificacionPendienteResumen.objects.filter(id_usuario=id_usuario, id_pendiente__lte=hasta_id)
+        total = pendientes.count()
+        if not total:
+            return None
+        grupos = list(
+            pendientes.values('titulo').annotate(total=Count('pk'), ultima=Max('id_pendiente'))
+            .order_by('-total', '-ultima')[:MAXIMO_TITULOS_RESUMEN]
+        )
+        categorias = set(pendientes.values_list('categoria', flat=True).distinct()[:2])
+        notificacion = Notificacion.objects.create(
+            id_usuario_id=id_usuario,
+            titulo=f'Resumen: {total} notificaciones',
+            mensaje=_mensaje_resumen(grupos, total),
+            tipo='info',
+            categoria=categorias.pop() if len(categorias) == 1 else 'sistema',
+            fecha_ultima_ocurrencia=timezone.now(),
+        )
+        pendientes.delete()
+    return notificacion
+
+
+def enviar_resumenes():
+    """
+    Envía un resumen a cada usuario con notificaciones pendientes. Lo que
+    llegue mientras tanto queda para la siguiente ejecución. Devuelve el
+    número de resúmenes creados.
+    """
+    hasta_id = NotificacionPendienteResumen.objects.aggregate(ultima=Max('id_pendiente'))['ultima']
+    if hasta_id is None:
+        return 0
+    usuarios = list(
+        NotificacionPendienteResumen.objects.filter(id_pendiente__lte=hasta_id)
+        .order_by('id_usuario').values_list('id_usuario', flat=True).distinct()
+    )
+    enviados = 0
+    for id_usuario in usuarios:
+        if enviar_resumen_usuario(id_usuario, hasta_id) is not None:
+            enviados += 1
+    return enviados
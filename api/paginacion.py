@@ -0,0 +1,224 @@
+"""
+Paginación por cursor (keyset) para las vistas de listado.
+
+En lugar de OFFSET, cada página se pide a partir de los valores de orden de
+la última fila entregada, por lo que el costo de una página no depende de
+su posición y el orden es estable aunque se inserten filas nuevas.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connection
+from django.db.models import Q
+from rest_framework.utils.urls import replace_query_param
+
+# Tope para el total "estimado": se cuenta como máximo hasta este número de filas
+TOPE_TOTAL_ESTIMADO = 10000
+
+
+class CursorInvalido(ValueError):
+    """El parámetro cursor no es válido para este listado"""
+
+
+class PaginadorKeyset:
+    """
+    Pagina un queryset con ?limit= y ?cursor= usando comparación de tuplas
+    sobre los campos de `orden`, que deben identificar una fila de forma única
+    (se recomienda terminar siempre con la clave primaria).
+
+    El total se omite por defecto; con ?total=exacto se cuenta y con
+    ?total=estimado se usa un valor aproximado y barato. En tablas donde un
+    COUNT completo es caro, `permitir_total_exacto=False` responde ambos
+    modos con la estimación.
+    """
+    parametro_cursor = 'cursor'
+    parametro_limite = 'limit'
+    parametro_total = 'total'
+
+    def __init__(self, orden, limite_defecto=50, limite_maximo=200, permitir_total_exacto=True):
+        self.orden = tuple(orden)
+        self.limite_defecto = limite_defecto
+        self.limite_maximo = limite_maximo
+        self.permitir_total_exacto = permitir_total_exacto
+
+    # -----------------------------------------
+    # Entrada
+    # -----------------------------------------
+    def obtener_limite(self, request):
+        try:
+            limite = int(request.GET.get(self.parametro_limite, self.limite_defecto))
+        except (TypeError, ValueError):
+            return self.limite_defecto
+        if limite <= 0:
+            return self.limite_defecto
+        return min(limite, self.limite_maximo)
+
+    def decodificar_cursor(self, valor):
+        try:
+            relleno = '=' * (-len(valor) % 4)
+            datos = json.loads(base64.urlsafe_b64decode(valor + relleno).decode('utf-8'))
+            posicion = datos['p']
+            direccion = datos['d']
+        except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+            raise CursorInvalido('Cursor inválido')
+        if direccion not in ('s', 'a') or not isinstance(posicion, list) or len(posicion) != len(self.orden):
+            raise CursorInvalido('Cursor inválido')
+        return posicion, direccion == 'a'
+
+    def codificar_cursor(self, posicion, hacia_atras=False):
+        datos = json.dumps({'p': posicion, 'd': 'a' if hacia_atras else 's'}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(datos.encode('utf-8')).decode('ascii').rstrip('=')
+
+    # -----------------------------------------
+    # Consulta
+    # -----------------------------------------
+    def _campos(self, invertir=False):
+        """Devuelve [(campo, descendente)] según el orden configurado"""
+        campos = []
+        for campo in self.orden:
+            descendente = campo.startswith('-')
+            campos.append((campo.lstrip('-'), descendente != invertir))
+        return campos
+
+    def _convertir_posicion(self, modelo, posicion):
+        """
+        Convierte cada valor del cursor con el to_python() de su campo; un
+        tipo que no corresponde (o un nulo) es un cursor inválido.
+        """
+        convertida = []
+        for (campo, _), valor in zip(self._campos(), posicion):
+            if valor is None or not isinstance(valor, (str, int, float)):
+                raise CursorInvalido('Cursor inválido')
+            try:
+                campo_modelo = modelo._meta.pk if campo == 'pk' else modelo._meta.get_field(campo)
+            except FieldDoesNotExist:
+                # Anotaciones: se compara el valor tal cual
+                convertida.append(valor)
+                continue
+            try:
+                convertida.append(campo_modelo.to_python(valor))
+            except (ValidationError, ValueError, TypeError):
+                raise CursorInvalido('Cursor inválido')
+        return convertida
+
+    def _filtro_posterior(self, campos, posicion):
+        """Construye (a > x) OR (a = x AND b > y) ... para la dirección dada"""
+        filtro = Q()
+        for i, (campo, descendente) in enumerate(campos):
+            condicion = Q(**{f"{campo}__{'lt' if descendente else 'gt'}": posicion[i]})
+            for j, (campo_previo, _) in enumerate(campos[:i]):
+                condicion &= Q(**{campo_previo: posicion[j]})
+            filtro |= condicion
+        return filtro
+
+    def _posicion(self, obj):
+        posicion = []
+        for campo, _ in self._campos():
+            valor = getattr(obj, campo)
+            if hasattr(valor, 'isoformat'):
+                valor = valor.isoformat()
+            posicion.append(valor)
+        return posicion
+
+    def paginar_queryset(self, queryset, request):
+        """
+        Devuelve la lista de objetos de la página pedida. Lanza CursorInvalido
+        si el cursor no se puede interpretar.
+        """
+        self.request = request
+        self.limite = self.obtener_limite(request)
+        self.queryset = queryset
+
+        cursor = request.GET.get(self.parametro_cursor)
+        posicion, hacia_atras = (None, False)
+        if cursor:
+            posicion, hacia_atras = self.decodificar_cursor(cursor)
+            posicion = self._convertir_posicion(queryset.model, posicion)
+
+        campos = self._campos(invertir=hacia_atras)
+        qs = queryset.order_by(*[f"{'-' if desc else ''}{campo}" for campo, desc in campos])
+        if posicion is not None:
+            qs = qs.filter(self._filtro_posterior(campos, posicion))
+
+        resultados = list(qs[:self.limite + 1])
+        hay_mas = len(resultados) > self.limite
+        resultados = resultados[:self.limite]
+
+        if hacia_atras:
+            resultados.reverse()
+            self.hay_siguiente = posicion is not None
+            self.hay_anterior = hay_mas
+        else:
+            self.hay_siguiente = hay_mas
+            self.hay_anterior = posicion is not None
+
+        self.pagina = resultados
+        return resultados
+
+    # -----------------------------------------
+    # Salida
+    # -----------------------------------------
+    def enlace_siguiente(self):
+        if not self.hay_siguiente or not self.pagina:
+            return None
+        cursor = self.codificar_cursor(self._posicion(self.pagina[-1]))
+        return replace_query_param(self.request.build_absolute_uri(), self.parametro_cursor, cursor)
+
+    def enlace_anterior(self):
+        if not self.hay_anterior or not self.pagina:
+            return None
+        cursor = self.codificar_cursor(self._posicion(self.pagina[0]), hacia_atras=True)
+        return replace_query_param(self.request.build_absolute_uri(), self.parametro_cursor, cursor)
+
+    def obtener_total(self):
+        """
+        Devuelve (total, es_estimado) o None si no se pidió total.
+        """
+        modo = self.request.GET.get(self.parametro_total)
+        if modo == 'exacto' and self.permitir_total_exacto:
+            return self.queryset.count(), False
+        if modo in ('exacto', 'estimado'):
+            return estimar_total(self.queryset)
+        return None
+
+    def respuesta(self, data, **extra):
+        contenido = {
+            'success': True,
+            'data': data,
+            'count': len(data),
+            'next': self.enlace_siguiente(),
+            'previous': self.enlace_anterior(),
+        }
+        total = self.obtener_total()
+        if total is not None:
+            contenido['total'], contenido['total_estimado'] = total
+        contenido.update(extra)
+        return contenido
+
+
+def estimar_total(queryset):
+    """
+    Estimación barata del número de filas de un queryset.
+
+    Sin filtros en MariaDB/MySQL se usan las estadísticas de la tabla
+    (information_schema); en los demás casos se cuenta como máximo hasta
+    TOPE_TOTAL_ESTIMADO filas. Devuelve (total, es_estimado).
+    """
+    modelo = queryset.model
+    if connection.vendor == 'mysql' and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                [modelo._meta.db_table]
+            )
+            fila = cursor.fetchone()
+        if fila and fila[0] is not None:
+            return int(fila[0]), True
+
+    total = queryset.order_by()[:TOPE_TOTAL_ESTIMADO + 1].count()
+    if total > TOPE_TOTAL_ESTIMADO:
+        return TOPE_TOTAL_ESTIMADO, True
+    return total, False
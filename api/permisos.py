@@ -0,0 +1,197 @@
+"""
+Permisos por rol compilados en memoria.
+
+Rol.permisos_sistema es un JSON libre; cada rol se compila una vez a un
+PermisosRol inmutable (frozenset de permisos y nivel de acceso numérico):
+
+    {"reportes": true}                      -> reportes (y reportes.*)
+    {"empleados": ["leer", "editar"]}       -> empleados.leer, empleados.editar
+    {"logs": {"leer": true, "borrar": false}} -> logs.leer
+
+Un permiso concedido incluye a sus derivados ("reportes" permite
+"reportes.exportar"), el nivel 'admin' lo permite todo y los roles
+inactivos no tienen permisos.
+
+Cada proceso guarda todos los roles compilados. Las señales de Rol vacían
+la caché del proceso que hizo el cambio; los demás comparan la versión
+'roles' de VersionRecurso como mucho cada PERMISOS_VERIFICAR_CADA segundos,
+así que una comprobación normal no hace consultas. El rol del usuario se
+toma de su empleado, que la autenticación por token ya trae en caché.
+"""
+import functools
+import threading
+import time
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.permissions import BasePermission
+from rest_framework.response import Response
+
+from .condicional import obtener_versiones
+from .models import Rol, Usuario
+
+RECURSO_VERSION = 'roles'
+NIVELES = ('basico', 'intermedio', 'avanzado', 'admin')
+NIVEL_ADMIN = NIVELES.index('admin')
+
+
+def _compilar_permisos(permisos, prefijo=''):
+    concedidos = set()
+    if isinstance(permisos, dict):
+        for clave, valor in permisos.items():
+            nombre = f'{prefijo}{clave}'
+            if valor is True:
+                concedidos.add(nombre)
+            elif isinstance(valor, (dict, list)):
+                concedidos.update(_compilar_permisos(valor, f'{nombre}.'))
+    elif isinstance(permisos, list):
+        concedidos.update(f'{prefijo}{accion}' for accion in permisos if isinstance(accion, str))
+    return concedidos
+
+
+class PermisosRol:
+    __slots__ = ('id_rol', 'permisos', 'nivel')
+
+    def __init__(self, id_rol, permisos=frozenset(), nivel=-1):
+        object.__setattr__(self, 'id_rol', id_rol)
+        object.__setattr__(self, 'permisos', frozenset(permisos))
+        object.__setattr__(self, 'nivel', nivel)
+
+    def __setattr__(self, nombre, valor):
+        raise AttributeError('PermisosRol es inmutable')
+
+    @classmethod
+    def compilar(cls, id_rol, permisos_sistema, nivel_acceso, estado='activo'):
+        if estado != 'activo':
+            return cls(id_rol)
+        nivel = NIVELES.index(nivel_acceso) if nivel_acceso in NIVELES else -1
+        return cls(id_rol, _compilar_permisos(permisos_sistema or {}), nivel)
+
+    def tiene(self, permiso):
+        if self.nivel == NIVEL_ADMIN:
+            return True
+        partes = permiso.split('.')
+        return any('.'.join(partes[:i]) in self.permisos for i in range(len(partes), 0, -1))
+
+    def alcanza(self, nivel):
+        return self.nivel >= NIVELES.index(nivel)
+
+
+SIN_PERMISOS = PermisosRol(None)
+
+
+# =============================================
+# CACHÉ POR PROCESO
+# =============================================
+
+class CachePermisos:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._roles = None
+        self._version = None
+        self._verificado = 0.0
+
+    def invalidar(self):
+        with self._lock:
+            self._roles = None
+
+    def _cargar(self):
+        version = obtener_versiones(RECURSO_VERSION)[RECURSO_VERSION][0]
+        roles = {
+            id_rol: PermisosRol.compilar(id_rol, permisos, nivel, estado)
+            for id_rol, permisos, nivel, estado in Rol.objects.values_list(
+                'id_rol', 'permisos_sistema', 'nivel_acceso', 'estado'
+            )
+        }
+        self._roles, self._version, self._verificado = roles, version, time.monotonic()
+
+    def roles(self):
+        """{id_rol: PermisosRol}, recargado si cambió la versión de 'roles'"""
+        vigencia = getattr(settings, 'PERMISOS_VERIFICAR_CADA', 5)
+        if self._roles is not None and time.monotonic() - self._verificado < vigencia:
+            return self._roles
+        with self._lock:
+            if self._roles is not None:
+                if time.monotonic() - self._verificado < vigencia:
+                    return self._roles
+                if obtener_versiones(RECURSO_VERSION)[RECURSO_VERSION][0] == self._version:
+                    self._verificado = time.monotonic()
+                    return self._roles
+            self._cargar()
+            return self._roles
+
+    def obtener(self, id_rol):
+        return self.roles().get(id_rol, SIN_PERMISOS)
+
+
+cache = CachePermisos()
+
+
+def permisos_usuario(usuario):
+    """PermisosRol del usuario, o SIN_PERMISOS si no es un Usuario de la API"""
+    if not isinstance(usuario, Usuario):
+        return SIN_PERMISOS
+    return cache.obtener(usuario.id_empleado.id_rol_id)
+
+
+# =============================================
+# PERMISOS DE DRF Y DECORADOR
+# =============================================
+
+class TienePermiso(BasePermission):
+    """
+    Exige el permiso `permiso` de la clase o el atributo `permiso_requerido`
+    de la vista. Para vistas de función: @permission_classes([permiso_requerido('reportes')]).
+    """
+    permiso = None
+    message = 'No tiene permiso para esta operación'
+
+    def has_permission(self, request, view):
+        permiso = self.permiso or getattr(view, 'permiso_requerido', None)
+        return permiso is not None and permisos_usuario(request.user).tiene(permiso)
+
+
+class TieneNivel(BasePermission):
+    """Exige un nivel_acceso mínimo (clase `nivel` o `nivel_requerido` de la vista)"""
+    nivel = None
+    message = 'Nivel de acceso insuficiente'
+
+    def has_permission(self, request, view):
+        nivel = self.nivel or getattr(view, 'nivel_requerido', None)
+        return nivel is not None and permisos_usuario(request.user).alcanza(nivel)
+
+
+def permiso_requerido(permiso):
+    """Clase de permiso de DRF para `permiso`"""
+    return type(f'TienePermiso_{permiso}', (TienePermiso,), {'permiso': permiso})
+
+
+def nivel_requerido(nivel):
+    """Clase de permiso de DRF para un nivel_acceso mínimo"""
+    if nivel not in NIVELES:
+        raise ValueError(f'Nivel de acceso desconocido: {nivel}')
+    return type(f'TieneNivel_{nivel}', (TieneNivel,), {'nivel': nivel})
+
+
+def requiere_permiso(permiso):
+    """
+    Decorador para vistas de función con @api_view; se aplica debajo de
+    este para que la autenticación de DRF corra antes. Responde 401 sin
+    usuario autenticado y 403 sin el permiso.
+    """
+    def decorador(vista):
+        @functools.wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if not isinstance(request.user, Usuario):
+                return Response({
+                    'success': False,
+                    'message': 'Autenticación requerida'
+                }, status=status.HTTP_401_UNAUTHORIZED)
+            if not permisos_usuario(request.user).tiene(permiso):
+                return Response({
+                    'success': False,
+                    'message': f'Se requiere el permiso "{permiso}"'
+                }, status=status.HTTP_403_FORBIDDEN)
+            return vista(request, *args, **kwargs)
+        return envoltura
+    return decorador
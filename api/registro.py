@@ -0,0 +1,98 @@
+"""
+Handler de logging que guarda los registros en LogSistema sin bloquear la
+petición: cada registro se convierte en un diccionario de campos y se
+encola en un EscritorPorLotes, que los inserta por lotes en segundo plano.
+
+Campos reconocidos en `extra`: modulo, id_usuario, ip_origen, user_agent,
+datos_contexto (dict) y request (como hace el logger django.request), del
+que se toman la IP, el user agent y el usuario autenticado.
+"""
+import json
+import logging
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from .escritura_diferida import EscritorPorLotes, DESCARTAR_NUEVOS
+
+NIVELES = {'DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'}
+
+
+def ip_cliente(request):
+    """
+    IP de origen. X-Forwarded-For solo se tiene en cuenta si la conexión
+    viene de un proxy de PROXIES_CONFIABLES; en ese caso se toma la última
+    dirección de la cadena que no es un proxy confiable (las de la izquierda
+    las puede inventar el cliente).
+    """
+    remota = request.META.get('REMOTE_ADDR') or ''
+    confiables = set(getattr(settings, 'PROXIES_CONFIABLES', ()))
+    reenviada = request.META.get('HTTP_X_FORWARDED_FOR')
+    if reenviada and remota in confiables:
+        for direccion in reversed([parte.strip() for parte in reenviada.split(',')]):
+            if direccion and direccion not in confiables:
+                return direccion[:45]
+    return remota[:45] or None
+
+
+def _serializable(datos):
+    return json.loads(json.dumps(datos, default=str))
+
+
+class LogSistemaHandler(logging.Handler):
+    def __init__(self, level=logging.NOTSET, tamano_lote=200, intervalo=2.0, capacidad=10000,
+                 politica=DESCARTAR_NUEVOS):
+        super().__init__(level)
+        self.escritor = EscritorPorLotes(
+            'api.LogSistema', tamano_lote=tamano_lote, intervalo=intervalo,
+            capacidad=capacidad, politica=politica
+        )
+
+    def emit(self, record):
+        # Los errores del propio escritor no se guardan en la tabla que falla
+        if record.name == 'api.escritura_diferida':
+            return
+        try:
+            self.escritor.agregar(self.campos(record))
+        except Exception:
+            self.handleError(record)
+
+    def campos(self, record):
+        request = getattr(record, 'request', None)
+        contexto = {
+            'logger': record.name,
+            'funcion': record.funcName,
+            'linea': record.lineno,
+        }
+        extra = getattr(record, 'datos_contexto', None)
+        if isinstance(extra, dict):
+            contexto.update(extra)
+        if record.exc_info:
+            contexto['excepcion'] = logging.Formatter().formatException(record.exc_info)
+
+        id_usuario = getattr(record, 'id_usuario', None)
+        ip_origen = getattr(record, 'ip_origen', None)
+        user_agent = getattr(record, 'user_agent', None)
+        if request is not None and hasattr(request, 'META'):
+            if id_usuario is None:
+                id_usuario = getattr(getattr(request, 'usuario', None), 'pk', None)
+            ip_origen = ip_origen or ip_cliente(request)
+            user_agent = user_agent or request.META.get('HTTP_USER_AGENT')
+
+        return {
+            'fecha_log': datetime.fromtimestamp(record.created, tz=timezone.utc),
+            'nivel': record.levelname if record.levelname in NIVELES else 'INFO',
+            'mensaje': record.getMessage(),
+            'modulo': (getattr(record, 'modulo', None) or record.name)[:50],
+            'id_usuario_id': id_usuario,
+            'ip_origen': ip_origen,
+            'user_agent': user_agent,
+            'datos_contexto': _serializable(contexto),
+        }
+
+    def flush(self):
+        self.escritor.vaciar()
+
+    def close(self):
+        self.escritor.detener()
+        super().close()
@@ -0,0 +1,151 @@
+"""
+Resumen horario de actividades_usuario para los tableros.
+
+`agregar_actividades()` recorre las actividades nuevas por id a partir de
+una marca (MarcaAgregacion), las agrupa por (hora, módulo, acción, usuario)
+y suma los conteos en actividades_resumen_hora. Cada lote escribe sus
+conteos y avanza la marca en la misma transacción, así que ninguna
+actividad se cuenta dos veces aunque el trabajo se interrumpa.
+
+Solo se procesan actividades con más de RETRASO_AGREGACION de antigüedad,
+para no adelantar la marca sobre inserciones que aún no confirmaron con un
+id menor. Los resúmenes se conservan RESUMEN_ACTIVIDAD_DIAS días.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .models import ActividadUsuario, ActividadResumenHora, MarcaAgregacion
+
+MARCA = 'actividades_resumen_hora'
+TAMANO_LOTE_AGREGACION = 50000
+RETRASO_AGREGACION = timedelta(minutes=5)
+
+GRANULARIDADES = ('hora', 'dia', 'semana')
+_TRUNC = {'hora': 'hour', 'dia': 'day', 'semana': 'week'}
+# Parámetro de agrupación -> campo del resumen
+AGRUPACIONES = {'modulo': 'modulo', 'accion': 'accion', 'usuario': 'id_usuario'}
+
+
+def _bloquear_marca():
+    """Marca del trabajo, bloqueada hasta el fin de la transacción"""
+    try:
+        with transaction.atomic():
+            MarcaAgregacion.objects.get_or_create(nombre=MARCA)
+    except IntegrityError:
+        # Otro proceso la creó al mismo tiempo
+        pass
+    return MarcaAgregacion.objects.select_for_update().get(nombre=MARCA)
+
+
+def _agregar_lote(desde_id, hasta_id):
+    """
+    Suma al resumen las actividades con id en (desde_id, hasta_id].
+    Devuelve (actividades, resúmenes escritos).
+    """
+    grupos = (
+        ActividadUsuario.objects.filter(id_actividad__gt=desde_id, id_actividad__lte=hasta_id)
+        .annotate(hora=Trunc('fecha_actividad', 'hour'))
+        .values('hora', 'modulo', 'accion', 'id_usuario')
+        .annotate(total=Count('pk'))
+        .order_by()
+    )
+    conteos = {}
+    for grupo in grupos:
+        clave = (grupo['hora'], grupo['modulo'] or '', grupo['accion'], grupo['id_usuario'])
+        conteos[clave] = conteos.get(clave, 0) + grupo['total']
+    if not conteos:
+        return 0, 0
+    actividades = sum(conteos.values())
+
+    existentes = ActividadResumenHora.objects.filter(hora__in={clave[0] for clave in conteos})
+    actualizar = []
+    for resumen in existentes:
+        clave = (resumen.hora, resumen.modulo, resumen.accion, resumen.id_usuario_id)
+        if clave in conteos:
+            resumen.total += conteos.pop(clave)
+            actualizar.append(resumen)
+    ActividadResumenHora.objects.bulk_update(actualizar, ['total'], batch_size=1000)
+    ActividadResumenHora.objects.bulk_create([
+        ActividadResumenHora(hora=hora, modulo=modulo, accion=accion, id_usuario_id=id_usuario, total=total)
+        for (hora, modulo, accion, id_usuario), total in conteos.items()
+    ], batch_size=1000)
+    return actividades, len(actualizar) + len(conteos)
+
+
+def agregar_actividades(tamano_lote=TAMANO_LOTE_AGREGACION):
+    """
+    Procesa las actividades posteriores a la marca. Devuelve
+    {'actividades', 'resumenes', 'ultimo_id'}.
+    """
+    tope = ActividadUsuario.objects.filter(
+        fecha_actividad__lt=timezone.now() - RETRASO_AGREGACION
+    ).aggregate(tope=Max('id_actividad'))['tope'] or 0
+    resultado = {'actividades': 0, 'resumenes': 0, 'ultimo_id': None}
+    while True:
+        with transaction.atomic():
+            marca = _bloquear_marca()
+            resultado['ultimo_id'] = marca.ultimo_id
+            if marca.ultimo_id >= tope:
+                return resultado
+            # Salta los huecos de ids (p. ej. filas ya archivadas)
+            primero = ActividadUsuario.objects.filter(id_actividad__gt=marca.ultimo_id).aggregate(
+                primero=Min('id_actividad')
+            )['primero'] or tope
+            hasta_id = min(primero - 1 + tamano_lote, tope)
+            actividades, resumenes = _agregar_lote(marca.ultimo_id, hasta_id)
+            resultado['actividades'] += actividades
+            resultado['resumenes'] += resumenes
+            marca.ultimo_id = hasta_id
+            marca.save(update_fields=['ultimo_id', 'fecha_actualizacion'])
+            resultado['ultimo_id'] = hasta_id
+
+
+def purgar_resumenes(dias=None):
+    """Elimina los resúmenes más antiguos que el período de conservación"""
+    if dias is None:
+        dias = getattr(settings, 'RESUMEN_ACTIVIDAD_DIAS', 90)
+    eliminados, _ = ActividadResumenHora.objects.filter(hora__lt=timezone.now() - timedelta(days=dias)).delete()
+    return eliminados
+
+
+def serie(granularidad='hora', desde=None, hasta=None, id_usuario=None, modulo=None, accion=None, agrupar=None):
+    """
+    Serie temporal de actividades desde el resumen: [{'periodo', 'total'}]
+    (más el campo de `agrupar` si se indica), ordenada por período.
+    """
+    resumenes = ActividadResumenHora.objects.all()
+    if desde:
+        resumenes = resumenes.filter(hora__gte=desde)
+    if hasta:
+        resumenes = resumenes.filter(hora__lte=hasta)
+    if id_usuario is not None:
+        resumenes = resumenes.filter(id_usuario=id_usuario)
+    if modulo:
+        resumenes = resumenes.filter(modulo=modulo)
+    if accion:
+        resumenes = resumenes.filter(accion=accion)
+
+    columnas = ['periodo'] + ([AGRUPACIONES[agrupar]] if agrupar else [])
+    filas = (
+        resumenes.annotate(periodo=Trunc('hora', _TRUNC[granularidad]))
+        .values(*columnas)
+        .annotate(total=Sum('total'))
+        .order_by(*columnas)
+    )
+    if agrupar == 'usuario':
+        return [
+            {'periodo': fila['periodo'], 'usuario': fila['id_usuario'], 'total': fila['total']}
+            for fila in filas
+        ]
+    return list(filas)
+
+
+def estado_marca():
+    """(último id agregado, fecha de la última agregación) o (0, None)"""
+    marca = MarcaAgregacion.objects.filter(nombre=MARCA).values_list('ultimo_id', 'fecha_actualizacion').first()
+    return marca or (0, None)
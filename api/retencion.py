@@ -0,0 +1,300 @@
+"""
+Retención y archivo de log_sistema y actividades_usuario.
+
+Las filas anteriores al horizonte de cada tabla (RETENCION_DIAS) se copian a
+segmentos NDJSON comprimidos con gzip bajo RETENCION_DIRECTORIO, uno por día
+y lote:
+
+    <directorio>/<recurso>/<AAAA>/<MM>/<recurso>-<AAAA-MM-DD>-<primer id>.ndjson.gz
+
+y después se borran de la tabla en transacciones pequeñas, con una pausa
+entre lotes para no bloquear la tabla ni saturar la replicación. Cada
+segmento se escribe completo (archivo temporal, fsync y rename) antes de
+borrar sus filas; si el proceso se interrumpe, la siguiente ejecución toma
+el mismo lote y reescribe el mismo segmento, sin duplicados. Junto a cada
+segmento se guarda un índice pequeño (<segmento>.idx.json) con su rango de
+fechas, conteo por nivel y módulos/usuarios presentes, que las búsquedas en
+el archivo (api.archivo) usan para descartar segmentos sin descomprimirlos.
+
+En MariaDB/MySQL las tablas pueden particionarse por rango mensual de fecha
+(`manage.py particionar_registros`). Con particiones, las que quedan
+completas antes del horizonte se archivan y se eliminan con DROP PARTITION
+en lugar de DELETE. El particionado exige que la columna de fecha forme
+parte de la clave primaria y no admite claves foráneas, así que la
+restricción hacia usuarios se elimina en la base de datos (el modelo
+conserva la relación).
+"""
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .lotes import iterar_lotes
+from .models import ActividadUsuario, LogSistema
+
+TAMANO_LOTE_RETENCION = 1000
+# Usuarios distintos que se listan en el índice de un segmento; con más se
+# omite la lista y el segmento no se puede descartar por usuario
+MAXIMO_USUARIOS_INDICE = 1000
+# Segundos de pausa entre lotes de borrado
+PAUSA_ENTRE_LOTES = 0.05
+
+# recurso -> (modelo, campo de fecha)
+POLITICAS = {
+    'logs': (LogSistema, 'fecha_log'),
+    'actividades': (ActividadUsuario, 'fecha_actividad'),
+}
+
+
+def _campos(modelo):
+    return [campo.name for campo in modelo._meta.concrete_fields]
+
+
+def directorio_archivo():
+    return Path(getattr(settings, 'RETENCION_DIRECTORIO', Path(settings.BASE_DIR) / 'archivo'))
+
+
+def fecha_limite(recurso, dias=None):
+    if dias is None:
+        dias = getattr(settings, 'RETENCION_DIAS', {}).get(recurso, 90)
+    return timezone.now() - timedelta(days=dias)
+
+
+# =============================================
+# SEGMENTOS
+# =============================================
+
+def ruta_segmento(directorio, recurso, dia, primer_id):
+    return (
+        Path(directorio) / recurso / f'{dia:%Y}' / f'{dia:%m}' /
+        f'{recurso}-{dia:%Y-%m-%d}-{primer_id:012d}.ndjson.gz'
+    )
+
+
+def ruta_indice(ruta):
+    return ruta.with_name(ruta.name[:-len('.ndjson.gz')] + '.idx.json')
+
+
+def _escribir_atomico(ruta, escribir):
+    temporal = ruta.with_name(ruta.name + '.tmp')
+    with open(temporal, 'wb') as crudo:
+        escribir(crudo)
+        crudo.flush()
+        os.fsync(crudo.fileno())
+    os.replace(temporal, ruta)
+
+
+def indice_segmento(filas, campo):
+    """
+    Resumen de un segmento: registros, rango de `campo`, conteo por nivel
+    (si la tabla tiene nivel), módulos y usuarios (None si son demasiados).
+    """
+    fechas = [fila[campo] for fila in filas]
+    niveles = {}
+    modulos = set()
+    usuarios = set()
+    for fila in filas:
+        if 'nivel' in fila:
+            niveles[fila['nivel']] = niveles.get(fila['nivel'], 0) + 1
+        modulos.add(fila.get('modulo'))
+        usuarios.add(fila.get('id_usuario'))
+    return {
+        'registros': len(filas),
+        'desde': min(fechas).isoformat() if fechas else None,
+        'hasta': max(fechas).isoformat() if fechas else None,
+        'niveles': niveles,
+        'modulos': sorted(modulos, key=lambda valor: (valor is None, valor or '')),
+        'usuarios': sorted(usuarios, key=lambda valor: (valor is None, valor or 0))
+                    if len(usuarios) <= MAXIMO_USUARIOS_INDICE else None,
+    }
+
+
+def escribir_indice(ruta, indice):
+    _escribir_atomico(ruta_indice(ruta), lambda archivo: archivo.write(json.dumps(indice).encode('utf-8')))
+
+
+def escribir_segmento(ruta, filas, campo):
+    """Escribe `filas` como NDJSON comprimido, y su índice, de forma atómica"""
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    codificador = DjangoJSONEncoder(ensure_ascii=False)
+
+    def escribir(crudo):
+        with gzip.GzipFile(filename=ruta.name[:-3], mode='wb', fileobj=crudo, mtime=0) as comprimido:
+            for fila in filas:
+                comprimido.write((codificador.encode(fila) + '\n').encode('utf-8'))
+
+    _escribir_atomico(ruta, escribir)
+    escribir_indice(ruta, indice_segmento(filas, campo))
+
+
+def _archivar_filas(recurso, campo, filas, directorio, pk):
+    """Escribe un segmento por día con `filas`; devuelve cuántos escribió"""
+    por_dia = {}
+    for fila in filas:
+        por_dia.setdefault(fila[campo].astimezone(dt_timezone.utc).date(), []).append(fila)
+    for dia, filas_dia in por_dia.items():
+        escribir_segmento(ruta_segmento(directorio, recurso, dia, filas_dia[0][pk]), filas_dia, campo)
+    return len(por_dia)
+
+
+# =============================================
+# ARCHIVO
+# =============================================
+
+def archivar(recurso, limite=None, directorio=None, tamano_lote=TAMANO_LOTE_RETENCION, pausa=PAUSA_ENTRE_LOTES):
+    """
+    Archiva y borra las filas de `recurso` anteriores a `limite`. Devuelve
+    {'archivadas', 'segmentos', 'particiones_eliminadas'}.
+    """
+    modelo, campo = POLITICAS[recurso]
+    limite = limite or fecha_limite(recurso)
+    directorio = directorio or directorio_archivo()
+    pk = modelo._meta.pk.attname
+    campos = _campos(modelo)
+    resultado = {'archivadas': 0, 'segmentos': 0, 'particiones_eliminadas': 0}
+
+    # Particiones completas: se copian por lotes y se eliminan de una vez
+    for nombre, hasta in particiones_vencidas(modelo, limite):
+        for filas in iterar_lotes(modelo.objects.filter(**{f'{campo}__lt': hasta}), campos, tamano_lote):
+            resultado['segmentos'] += _archivar_filas(recurso, campo, filas, directorio, pk)
+            resultado['archivadas'] += len(filas)
+        with connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {modelo._meta.db_table} DROP PARTITION {nombre}')
+        resultado['particiones_eliminadas'] += 1
+
+    # Resto: borrado por lotes pequeños (siempre desde el principio, porque
+    # cada lote desaparece de la tabla)
+    vencidas = modelo.objects.filter(**{f'{campo}__lt': limite}).order_by(pk)
+    while True:
+        filas = list(vencidas.values(*campos)[:tamano_lote])
+        if not filas:
+            break
+        resultado['segmentos'] += _archivar_filas(recurso, campo, filas, directorio, pk)
+        with transaction.atomic():
+            modelo.objects.filter(pk__in=[fila[pk] for fila in filas]).delete()
+        resultado['archivadas'] += len(filas)
+        if pausa:
+            time.sleep(pausa)
+    return resultado
+
+
+# =============================================
+# PARTICIONADO (MariaDB/MySQL)
+# =============================================
+
+def _columna(modelo, campo):
+    return modelo._meta.get_field(campo).column
+
+
+def _nombre_particion(mes):
+    return f'p{mes:%Y%m}'
+
+
+def _mes_siguiente(mes):
+    return (mes.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def particiones(modelo):
+    """[(nombre, límite superior naive UTC o None para MAXVALUE)] en orden"""
+    if connection.vendor != 'mysql':
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL "
+            "ORDER BY PARTITION_ORDINAL_POSITION",
+            [modelo._meta.db_table]
+        )
+        filas = cursor.fetchall()
+    resultado = []
+    for nombre, descripcion in filas:
+        valor = descripcion.strip("'")
+        if valor.upper() == 'MAXVALUE':
+            resultado.append((nombre, None))
+        else:
+            resultado.append((nombre, datetime.fromisoformat(valor[:19])))
+    return resultado
+
+
+def particiones_vencidas(modelo, limite):
+    """Particiones cuyas filas son todas anteriores a `limite`, con su límite (aware)"""
+    limite = limite.astimezone(dt_timezone.utc).replace(tzinfo=None)
+    return [
+        (nombre, hasta.replace(tzinfo=dt_timezone.utc))
+        for nombre, hasta in particiones(modelo)
+        if hasta is not None and hasta <= limite
+    ]
+
+
+def sentencias_particionado(recurso, meses_futuros=3):
+    """
+    DDL para particionar la tabla de `recurso` por mes, desde el mes de su
+    fila más antigua hasta `meses_futuros` meses después del actual.
+    """
+    modelo, campo = POLITICAS[recurso]
+    tabla = modelo._meta.db_table
+    columna = _columna(modelo, campo)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT CONSTRAINT_NAME FROM information_schema.KEY_COLUMN_USAGE "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND REFERENCED_TABLE_NAME IS NOT NULL",
+            [tabla]
+        )
+        claves_foraneas = sorted({fila[0] for fila in cursor.fetchall()})
+
+    sentencias = [f'ALTER TABLE {tabla} DROP FOREIGN KEY {nombre}' for nombre in claves_foraneas]
+    sentencias.append(
+        f'ALTER TABLE {tabla} DROP PRIMARY KEY, ADD PRIMARY KEY ({modelo._meta.pk.column}, {columna})'
+    )
+
+    mas_antigua = modelo.objects.order_by(campo).values_list(campo, flat=True).first() or timezone.now()
+    mes = mas_antigua.astimezone(dt_timezone.utc).date().replace(day=1)
+    ultimo = timezone.now().date().replace(day=1)
+    for _ in range(meses_futuros):
+        ultimo = _mes_siguiente(ultimo)
+    definiciones = []
+    while mes <= ultimo:
+        siguiente = _mes_siguiente(mes)
+        definiciones.append(f"PARTITION {_nombre_particion(mes)} VALUES LESS THAN ('{siguiente:%Y-%m-%d}')")
+        mes = siguiente
+    definiciones.append('PARTITION pmax VALUES LESS THAN (MAXVALUE)')
+    sentencias.append(f'ALTER TABLE {tabla} PARTITION BY RANGE COLUMNS({columna}) ({", ".join(definiciones)})')
+    return sentencias
+
+
+def asegurar_particiones(recurso, meses_futuros=3):
+    """
+    Separa de pmax las particiones de los próximos `meses_futuros` meses en
+    una tabla ya particionada. Devuelve los nombres creados.
+    """
+    modelo, _ = POLITICAS[recurso]
+    actuales = particiones(modelo)
+    if not actuales or actuales[-1][1] is not None:
+        return []
+    acotadas = [hasta for _, hasta in actuales if hasta is not None]
+    mes = max(acotadas).date() if acotadas else timezone.now().date().replace(day=1)
+    objetivo = timezone.now().date().replace(day=1)
+    for _ in range(meses_futuros + 1):
+        objetivo = _mes_siguiente(objetivo)
+
+    nuevas = []
+    while mes < objetivo:
+        siguiente = _mes_siguiente(mes)
+        nuevas.append((_nombre_particion(mes), siguiente))
+        mes = siguiente
+    if not nuevas:
+        return []
+    definiciones = [f"PARTITION {nombre} VALUES LESS THAN ('{hasta:%Y-%m-%d}')" for nombre, hasta in nuevas]
+    definiciones.append('PARTITION pmax VALUES LESS THAN (MAXVALUE)')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'ALTER TABLE {modelo._meta.db_table} REORGANIZE PARTITION pmax INTO ({", ".join(definiciones)})'
+        )
+    return [nombre for nombre, _ in nuevas]
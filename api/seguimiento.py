@@ -0,0 +1,63 @@
+"""
+Seguimiento de cambios en campos de modelos sin consultas adicionales.
+
+Al cargar una instancia (post_init) se guarda una copia de los campos
+seguidos; en pre_save se calcula qué valores quedaron persistidos antes y
+después del guardado. Los receptores de post_save/post_delete pueden así
+calcular deltas (contadores, tablas de resumen, invalidación de cachés) sin
+volver a leer la fila.
+"""
+from django.db.models.signals import post_init, pre_save
+
+# Marca para campos diferidos (.only()/.defer()) que no se cargaron
+NO_CARGADO = object()
+
+_campos_seguidos = {}
+
+
+def seguir_campos(modelo, *campos):
+    """
+    Registra `campos` (nombres de atributo, p. ej. 'id_departamento_id')
+    para seguimiento en `modelo`. Puede llamarse varias veces por modelo.
+    """
+    ya_registrado = modelo in _campos_seguidos
+    _campos_seguidos.setdefault(modelo, set()).update(campos)
+    if not ya_registrado:
+        post_init.connect(_al_cargar, sender=modelo, dispatch_uid=f'seguimiento_init_{modelo._meta.label}')
+        pre_save.connect(_antes_de_guardar, sender=modelo, dispatch_uid=f'seguimiento_save_{modelo._meta.label}')
+
+
+def _instantanea(instance):
+    return {
+        campo: instance.__dict__.get(campo, NO_CARGADO)
+        for campo in _campos_seguidos[instance.__class__]
+    }
+
+
+def _al_cargar(sender, instance, **kwargs):
+    instance._valores_persistidos = _instantanea(instance)
+
+
+def _antes_de_guardar(sender, instance, update_fields=None, raw=False, **kwargs):
+    previos = getattr(instance, '_valores_persistidos', None) or _instantanea(instance)
+    actuales = _instantanea(instance)
+    if update_fields is not None:
+        # Los campos que no se escriben conservan su valor en la base de datos
+        nombres = {instance._meta.get_field(campo).attname for campo in update_fields}
+        for campo in actuales:
+            if campo not in nombres:
+                actuales[campo] = previos.get(campo, NO_CARGADO)
+    instance._valores_previos = previos
+    instance._valores_persistidos = actuales
+
+
+def valores_previos(instance):
+    """Valores persistidos antes del último guardado (para post_save)"""
+    return getattr(instance, '_valores_previos', {})
+
+
+def valores_actuales(instance):
+    """Valores persistidos tras el último guardado o la última carga"""
+    if not hasattr(instance, '_valores_persistidos'):
+        instance._valores_persistidos = _instantanea(instance)
+    return instance._valores_persistidos
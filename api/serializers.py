@@ -1,29 +1,205 @@
 from rest_framework import serializers
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Prefetch, Q
 from .models import (
     Departamento, Rol, Empleado, Usuario, Sesion, 
-    PerfilEmpleado, Notificacion, ActividadUsuario, LogSistema
+    PerfilEmpleado, Notificacion, ActividadUsuario, LogSistema, DifusionNotificacion
 )
 
+# =============================================
+# CAMPOS DINÁMICOS (?fields= / ?expand=)
+# =============================================
+
+class CamposInvalidos(ValueError):
+    """?fields= o ?expand= nombran campos que el serializer no tiene"""
+
+
+def leer_campos_solicitados(params, serializer=None):
+    """
+    Lee ?fields= y ?expand= (listas separadas por comas) y devuelve
+    (campos, expandir). `campos` es None cuando no se pidió ninguno.
+    Con `serializer` (una clase con CamposDinamicosMixin) lanza
+    CamposInvalidos si algún nombre no existe en él.
+    """
+    def _lista(valor):
+        return {parte.strip() for parte in valor.split(',') if parte.strip()}
+    
+    campos = _lista(params['fields']) if params.get('fields') else None
+    expandir = _lista(params.get('expand', ''))
+    if serializer is not None:
+        desconocidos = serializer(expandir=expandir)._nombres_desconocidos(campos or (), expandir)
+        if desconocidos:
+            raise CamposInvalidos(f"Campos desconocidos en fields/expand: {', '.join(sorted(desconocidos))}")
+    return campos, expandir
+
+
+class CamposDinamicosMixin:
+    """
+    Permite reducir los campos serializados y expandir relaciones bajo demanda.
+    
+    - campos: conjunto de nombres a incluir; 'empleado.email' selecciona
+      campos de un serializer anidado. None incluye todos los campos.
+    - expandir: relaciones de `expandibles` a incluir como objeto anidado;
+      'empleado.departamento' expande dentro de un serializer anidado.
+    
+    `optimizar_queryset` traduce los campos resultantes a select_related y
+    only(), de modo que solo se consultan las columnas y relaciones usadas.
+    """
+    # nombre -> (clase de serializer, source)
+    expandibles = {}
+    # campo que no es columna -> columnas del modelo que necesita
+    campos_requeridos = {}
+    
+    def __init__(self, *args, campos=None, expandir=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        expandir = set(expandir or ())
+        
+        for nombre in sorted(expandir & set(self.expandibles)):
+            clase, source = self.expandibles[nombre]
+            self.fields[nombre] = clase(
+                source=source, read_only=True,
+                campos=_subcampos(campos, nombre), expandir=_subcampos(expandir, nombre)
+            )
+        
+        # Los serializers anidados declarados reciben su parte de ?expand=
+        for nombre, campo in list(self.fields.items()):
+            subexpandir = _subcampos(expandir, nombre)
+            if nombre not in self.expandibles and isinstance(campo, CamposDinamicosMixin) and subexpandir:
+                kwargs_campo = dict(campo._kwargs, expandir=subexpandir)
+                self.fields[nombre] = campo.__class__(*campo._args, **kwargs_campo)
+        
+        if campos is None:
+            return
+        
+        raiz = {campo.split('.', 1)[0] for campo in campos} | (expandir & set(self.expandibles))
+        for nombre in list(self.fields):
+            if nombre not in raiz:
+                self.fields.pop(nombre)
+                continue
+            campo = self.fields[nombre]
+            subcampos = _subcampos(campos, nombre)
+            if isinstance(campo, CamposDinamicosMixin) and subcampos is not None:
+                kwargs_campo = dict(campo._kwargs, campos=subcampos)
+                self.fields[nombre] = campo.__class__(*campo._args, **kwargs_campo)
+    
+    @classmethod
+    def optimizar_queryset(cls, queryset, campos=None, expandir=None):
+        """
+        Aplica select_related y only() según los campos que el serializer
+        va a leer con esos ?fields= / ?expand=.
+        """
+        relaciones, columnas, completo = cls(campos=campos, expandir=expandir)._plan_consulta('')
+        if relaciones:
+            queryset = queryset.select_related(*relaciones)
+        if campos is not None and not completo:
+            queryset = queryset.only(*columnas)
+        return queryset
+    
+    def _nombres_desconocidos(self, campos, expandir, prefijo=''):
+        """Nombres de `campos` y `expandir` que no existen en este serializer"""
+        desconocidos = []
+        for nombre in expandir:
+            raiz, _, resto = nombre.partition('.')
+            campo = self.fields.get(raiz)
+            if raiz in self.expandibles and not resto:
+                continue
+            if isinstance(campo, CamposDinamicosMixin) and resto:
+                desconocidos += campo._nombres_desconocidos((), {resto}, f'{prefijo}{raiz}.')
+            else:
+                desconocidos.append(prefijo + nombre)
+        for nombre in campos:
+            raiz, _, resto = nombre.partition('.')
+            campo = self.fields.get(raiz)
+            if campo is None and raiz in self.expandibles:
+                # Campo de una relación que no se expandió: se valida igual
+                campo = self.expandibles[raiz][0]()
+            if campo is None or (resto and not isinstance(campo, CamposDinamicosMixin)):
+                desconocidos.append(prefijo + nombre)
+            elif resto:
+                desconocidos += campo._nombres_desconocidos({resto}, (), f'{prefijo}{raiz}.')
+        return desconocidos
+    
+    def _plan_consulta(self, prefijo):
+        """
+        Devuelve (relaciones para select_related, columnas para only(),
+        completo) donde `completo` indica que algún campo necesita el objeto
+        entero y no se puede restringir con only().
+        """
+        modelo = self.Meta.model
+        relaciones, columnas, completo = [], [], False
+        
+        for nombre, campo in self.fields.items():
+            if isinstance(campo, CamposDinamicosMixin):
+                ruta = prefijo + campo.source
+                relaciones.append(ruta)
+                columnas.append(ruta)
+                sub_relaciones, sub_columnas, sub_completo = campo._plan_consulta(ruta + '__')
+                relaciones += sub_relaciones
+                columnas += sub_columnas
+                completo = completo or sub_completo
+                continue
+            
+            if campo.source == '*':
+                completo = True
+                continue
+            
+            atributos = campo.source.split('.')
+            if len(atributos) > 1:
+                relaciones.append(prefijo + '__'.join(atributos[:-1]))
+                columnas.append(prefijo + '__'.join(atributos))
+            elif atributos[0] in self.campos_requeridos:
+                columnas += [prefijo + columna for columna in self.campos_requeridos[atributos[0]]]
+            elif _es_columna(modelo, atributos[0]):
+                columnas.append(prefijo + atributos[0])
+            else:
+                completo = True
+        
+        return relaciones, columnas, completo
+
+
+def _subcampos(campos, nombre):
+    """Campos con prefijo 'nombre.' sin el prefijo, o None si no hay"""
+    if campos is None:
+        return None
+    prefijo = nombre + '.'
+    subcampos = {campo[len(prefijo):] for campo in campos if campo.startswith(prefijo)}
+    return subcampos or None
+
+
+def _es_columna(modelo, nombre):
+    try:
+        return modelo._meta.get_field(nombre).concrete
+    except FieldDoesNotExist:
+        return False
+
 # =============================================
 # SERIALIZERS BÁSICOS
 # =============================================
 
-class DepartamentoSerializer(serializers.ModelSerializer):
+class DepartamentoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Departamento
         fields = '__all__'
 
-class RolSerializer(serializers.ModelSerializer):
+class RolSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     departamento_nombre = serializers.CharField(source='id_departamento.nombre', read_only=True)
     
     class Meta:
         model = Rol
         fields = '__all__'
 
-class EmpleadoSerializer(serializers.ModelSerializer):
+class EmpleadoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     departamento_nombre = serializers.CharField(source='id_departamento.nombre', read_only=True)
     rol_nombre = serializers.CharField(source='id_rol.nombre', read_only=True)
     nombre_completo = serializers.CharField(read_only=True)
+    # departamento_nombre y rol_nombre son parte de la respuesta por defecto:
+    # sin ?fields= el listado los lee con JOIN en vez de una consulta por fila
+    
+    expandibles = {
+        'departamento': (DepartamentoSerializer, 'id_departamento'),
+        'rol': (RolSerializer, 'id_rol'),
+    }
+    campos_requeridos = {'nombre_completo': ('nombres', 'apellidos')}
     
     class Meta:
         model = Empleado
@@ -75,7 +251,7 @@ class ActividadUsuarioSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 class LogSistemaSerializer(serializers.ModelSerializer):
-    usuario_nombre = serializers.CharField(source='id_usuario.username', read_only=True)
+    usuario_nombre = serializers.CharField(source='id_usuario.username', read_only=True, default=None)
     
     class Meta:
         model = LogSistema
@@ -100,18 +276,51 @@ class EmpleadoResumenSerializer(serializers.ModelSerializer):
         ]
 
 class DepartamentoConEmpleadosSerializer(serializers.ModelSerializer):
-    """Serializer que incluye empleados del departamento"""
-    empleados = EmpleadoResumenSerializer(source='empleado_set', many=True, read_only=True)
+    """
+    Serializer que incluye una muestra acotada de empleados del departamento.
+    
+    Espera el departamento cargado con `con_empleados()`: los empleados vienen
+    de un Prefetch limitado (to_attr='empleados_muestra') y el total de
+    activos de una anotación, así no hay consultas por fila. El listado
+    completo está en /departamentos/<id>/empleados/.
+    """
+    LIMITE_EMPLEADOS = 50
+    
+    empleados = serializers.SerializerMethodField()
     total_empleados = serializers.SerializerMethodField()
     
     class Meta:
         model = Departamento
         fields = '__all__'
     
+    @classmethod
+    def con_empleados(cls, queryset):
+        """Anota el total de activos y precarga la muestra de empleados"""
+        empleados = Empleado.objects.select_related('id_rol').order_by('id_empleado')
+        return queryset.annotate(
+            total_empleados_activos=Count('empleado', filter=Q(empleado__estado='activo'))
+        ).prefetch_related(
+            Prefetch('empleado_set', queryset=empleados[:cls.LIMITE_EMPLEADOS + 1], to_attr='empleados_muestra')
+        )
+    
+    def _muestra(self, obj):
+        muestra = getattr(obj, 'empleados_muestra', None)
+        if muestra is None:
+            muestra = list(obj.empleado_set.select_related('id_rol').order_by('id_empleado')[:self.LIMITE_EMPLEADOS + 1])
+        return muestra
+    
+    def hay_mas_empleados(self, obj):
+        return len(self._muestra(obj)) > self.LIMITE_EMPLEADOS
+    
+    def get_empleados(self, obj):
+        return EmpleadoResumenSerializer(self._muestra(obj)[:self.LIMITE_EMPLEADOS], many=True).data
+    
     def get_total_empleados(self, obj):
+        if hasattr(obj, 'total_empleados_activos'):
+            return obj.total_empleados_activos
         return obj.empleado_set.filter(estado='activo').count()
 
-class UsuarioConPerfilSerializer(serializers.ModelSerializer):
+class UsuarioConPerfilSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializer que incluye información del empleado y perfil"""
     empleado = EmpleadoSerializer(source='id_empleado', read_only=True)
     
@@ -125,9 +334,46 @@ class NotificacionesUsuarioSerializer(serializers.ModelSerializer):
         model = Notificacion
         fields = [
             'id_notificacion', 'titulo', 'mensaje', 'tipo', 
-            'categoria', 'leida', 'fecha_creacion', 'url_accion'
+            'categoria', 'leida', 'fecha_creacion', 'url_accion',
+            'ocurrencias', 'fecha_ultima_ocurrencia'
         ]
 
+class DifusionNotificacionSerializer(serializers.ModelSerializer):
+    """Serializer para difusiones de notificaciones y su avance"""
+    progreso = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = DifusionNotificacion
+        fields = [
+            'id_difusion', 'titulo', 'mensaje', 'tipo', 'categoria', 'url_accion',
+            'fecha_expiracion', 'id_departamento', 'id_rol', 'estado',
+            'total_destinatarios', 'enviadas', 'progreso', 'error',
+            'fecha_creacion', 'fecha_inicio', 'fecha_fin'
+        ]
+        read_only_fields = [
+            'estado', 'total_destinatarios', 'enviadas', 'error',
+            'fecha_creacion', 'fecha_inicio', 'fecha_fin'
+        ]
+    
+    def validate(self, data):
+        if not data.get('id_departamento') and not data.get('id_rol'):
+            raise serializers.ValidationError('Se requiere id_departamento o id_rol')
+        return data
+    
+    def get_progreso(self, obj):
+        """Porcentaje enviado, o None si aún no se contaron los destinatarios"""
+        if obj.total_destinatarios is None:
+            return None
+        if not obj.total_destinatarios:
+            return 100.0
+        return round(obj.enviadas * 100 / obj.total_destinatarios, 1)
+
+class InicioSesionSerializer(serializers.Serializer):
+    """Credenciales para POST /auth/login/"""
+    username = serializers.CharField(max_length=50)
+    password = serializers.CharField(max_length=128, trim_whitespace=False)
+    dispositivo = serializers.CharField(max_length=100, required=False, allow_blank=True)
+
 # =============================================
 # SERIALIZERS PARA ESTADÍSTICAS Y REPORTES
 # =============================================
@@ -0,0 +1,158 @@
+"""
+Receptores de señales de los modelos de la API.
+
+Se conectan en ApiConfig.ready().
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Departamento, Rol, Empleado, Usuario, Sesion, Notificacion
+from .condicional import incrementar_version
+from .seguimiento import seguir_campos, valores_previos, valores_actuales
+from . import contadores, busqueda, autocompletado, tiempo_real, autenticacion, permisos
+
+for modelo, campos in contadores.campos_seguidos().items():
+    seguir_campos(modelo, *campos)
+seguir_campos(Empleado, *busqueda.CAMPOS_INDEXADOS)
+seguir_campos(Empleado, 'id_rol_id')
+seguir_campos(Sesion, 'token_sesion')
+
+# =============================================
+# VERSIONES PARA GET CONDICIONAL
+# =============================================
+
+@receiver([post_save, post_delete], sender=Departamento)
+def departamento_modificado(sender, **kwargs):
+    incrementar_version('departamentos')
+
+@receiver([post_save, post_delete], sender=Rol)
+def rol_modificado(sender, **kwargs):
+    incrementar_version('roles')
+    # Los demás procesos lo detectan por la versión (api.permisos)
+    permisos.cache.invalidar()
+
+@receiver(post_delete, sender=Empleado)
+def empleado_eliminado(sender, **kwargs):
+    # Las altas y cambios ya se reflejan en MAX(fecha_modificacion)
+    incrementar_version('empleados')
+
+@receiver(post_delete, sender=Usuario)
+def usuario_eliminado(sender, **kwargs):
+    incrementar_version('usuarios')
+
+# =============================================
+# CONTADORES DE ESTADÍSTICAS GENERALES
+# =============================================
+
+@receiver(post_save, sender=Empleado)
+@receiver(post_save, sender=Departamento)
+@receiver(post_save, sender=Rol)
+@receiver(post_save, sender=Usuario)
+@receiver(post_save, sender=Sesion)
+@receiver(post_save, sender=Notificacion)
+def actualizar_contadores_guardado(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        contadores.registrar_guardado(instance, created)
+
+@receiver(post_delete, sender=Empleado)
+@receiver(post_delete, sender=Departamento)
+@receiver(post_delete, sender=Rol)
+@receiver(post_delete, sender=Usuario)
+@receiver(post_delete, sender=Sesion)
+@receiver(post_delete, sender=Notificacion)
+def actualizar_contadores_eliminacion(sender, instance, **kwargs):
+    contadores.registrar_eliminacion(instance)
+
+# =============================================
+# ESTADÍSTICAS POR DEPARTAMENTO
+# =============================================
+
+@receiver(post_save, sender=Departamento)
+def crear_estadisticas_departamento(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        contadores.registrar_departamento_creado(instance)
+
+@receiver(post_save, sender=Empleado)
+def actualizar_estadisticas_departamento(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        contadores.registrar_empleado_guardado(instance, created)
+
+@receiver(post_delete, sender=Empleado)
+def descontar_estadisticas_departamento(sender, instance, **kwargs):
+    contadores.registrar_empleado_eliminado(instance)
+
+# =============================================
+# ÍNDICE DE BÚSQUEDA DE EMPLEADOS
+# =============================================
+
+@receiver(post_save, sender=Empleado)
+def indexar_empleado(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previos = valores_previos(instance)
+    actuales = valores_actuales(instance)
+    if created or any(previos.get(campo) != actuales.get(campo) for campo in busqueda.CAMPOS_INDEXADOS):
+        busqueda.indexar_empleado(instance)
+
+# =============================================
+# ÍNDICE DE AUTOCOMPLETADO EN MEMORIA
+# =============================================
+
+@receiver(post_save, sender=Empleado)
+def actualizar_autocompletado(sender, instance, raw=False, **kwargs):
+    if not raw:
+        autocompletado.indice.actualizar(instance)
+
+@receiver(post_delete, sender=Empleado)
+def quitar_de_autocompletado(sender, instance, **kwargs):
+    autocompletado.indice.eliminar(instance.pk)
+
+# =============================================
+# NOTIFICACIONES NO LEÍDAS POR USUARIO
+# =============================================
+
+@receiver(post_save, sender=Notificacion)
+def actualizar_no_leidas_usuario(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        contadores.registrar_notificacion_guardada(instance, created)
+
+@receiver(post_delete, sender=Notificacion)
+def descontar_no_leidas_usuario(sender, instance, **kwargs):
+    contadores.registrar_notificacion_eliminada(instance)
+
+# =============================================
+# ENTREGA EN TIEMPO REAL
+# =============================================
+
+@receiver(post_save, sender=Notificacion)
+def publicar_notificacion(sender, instance, created, raw=False, **kwargs):
+    # Se publica al confirmar para que el reenvío por Last-Event-ID la encuentre
+    if created and not raw:
+        transaction.on_commit(lambda: tiempo_real.publicar_notificacion(instance))
+
+# =============================================
+# CACHÉ DE SESIONES
+# =============================================
+
+@receiver([post_save, post_delete], sender=Sesion)
+def invalidar_sesion(sender, instance, **kwargs):
+    # Cualquier cambio (desactivación, nueva expiración) obliga a releerla;
+    # si se rotó el token, también se descarta el anterior
+    autenticacion.invalidar_sesion(instance.token_sesion)
+    anterior = valores_previos(instance).get('token_sesion')
+    if isinstance(anterior, str) and anterior != instance.token_sesion:
+        autenticacion.invalidar_sesion(anterior)
+
+@receiver([post_save, post_delete], sender=Usuario)
+def invalidar_sesiones_usuario(sender, instance, **kwargs):
+    # Bloqueo, cambio de estado o de datos: las sesiones en caché se releen
+    autenticacion.invalidar_usuario(instance.pk)
+
+@receiver(post_save, sender=Empleado)
+def invalidar_sesiones_cambio_rol(sender, instance, created, raw=False, **kwargs):
+    # Las sesiones en caché llevan el empleado y su rol para los permisos
+    if created or raw or valores_previos(instance).get('id_rol_id') == valores_actuales(instance).get('id_rol_id'):
+        return
+    for id_usuario in Usuario.objects.filter(id_empleado=instance.pk).values_list('pk', flat=True):
+        autenticacion.invalidar_usuario(id_usuario)
@@ -1,3 +1,1264 @@
-from django.test import TestCase
+import base64
+import csv
+import gzip
+import io
+import json
+import logging
+import tempfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.db.models.signals import post_delete
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework.utils.urls import replace_query_param
+
+from . import (
+    accesos, archivo, autenticacion, autocompletado, contadores, escritura_diferida, exportacion, inicio_sesion,
+    middleware, notificaciones, permisos, registro, resumenes, retencion, tiempo_real, vencimientos
+)
+from . import difusion as difusion_notificaciones
+from .condicional import incrementar_version
+from .models import (
+    Departamento, Rol, Empleado, Usuario, ActividadUsuario, LogSistema, Notificacion, ContadorNotificacionesUsuario,
+    NotificacionPendienteResumen, DifusionNotificacion, EstadisticaGeneral, ActividadResumenHora
+)
+from .busqueda import normalizar
+from .paginacion import PaginadorKeyset
+from .serializers import DepartamentoConEmpleadosSerializer
+
+
+def crear_empleado(nombres, apellidos='Prueba', rol=None, departamento='Sistemas', **campos):
+    departamento, _ = Departamento.objects.get_or_create(nombre=departamento)
+    if rol is None:
+        rol, _ = Rol.objects.get_or_create(nombre=f'General {departamento.nombre}', id_departamento=departamento)
+    usuario_email = normalizar(f'{nombres}.{apellidos}').replace(' ', '')
+    datos = {
+        'numero_documento': f'doc-{usuario_email}',
+        'email': f'{usuario_email}@example.com',
+        'fecha_ingreso': date(2024, 1, 1),
+    }
+    datos.update(campos)
+    return Empleado.objects.create(nombres=nombres, apellidos=apellidos, id_departamento=departamento, id_rol=rol, **datos)
+
+
+def crear_usuario(username='ana', password='secreta', permisos_sistema=None, nivel_acceso='basico'):
+    departamento, _ = Departamento.objects.get_or_create(nombre='Sistemas')
+    rol = Rol.objects.create(
+        nombre=f'Rol {username}', id_departamento=departamento,
+        permisos_sistema=permisos_sistema or {}, nivel_acceso=nivel_acceso,
+    )
+    empleado = crear_empleado(
+        username.title(), rol=rol, numero_documento=f'doc-{username}', email=f'{username}@example.com',
+    )
+    return Usuario.objects.create(id_empleado=empleado, username=username, password_hash=make_password(password))
+
+
+def cursor_crudo(posicion, direccion='s'):
+    datos = json.dumps({'p': posicion, 'd': direccion}).encode('utf-8')
+    return base64.urlsafe_b64encode(datos).decode('ascii').rstrip('=')
+
+
+class PruebaAPI(APITestCase):
+    """Base de las pruebas: cliente de DRF en self.client y reloj simulado"""
+
+    def fijar_reloj(self, *modulos, inicio=1000.0):
+        """time.monotonic() de cada módulo devuelve self.ahora, que la prueba avanza a mano"""
+        self.ahora = inicio
+        for modulo in modulos:
+            parche = mock.patch.object(modulo.time, 'monotonic', lambda: self.ahora)
+            parche.start()
+            self.addCleanup(parche.stop)
+
+
+# =============================================
+# PAGINACIÓN POR CURSOR
+# =============================================
+
+class PaginacionCursorTests(PruebaAPI):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuarios = [crear_usuario(f'user{i}', permisos_sistema={'logs': True}) for i in range(7)]
+        for usuario in cls.usuarios[:3]:
+            ActividadUsuario.objects.create(id_usuario=usuario, accion='GET x', modulo='pruebas')
+
+    def setUp(self):
+        self.client.force_authenticate(self.usuarios[0])
+
+    def test_codificar_y_decodificar(self):
+        paginador = PaginadorKeyset(orden=('-fecha_creacion', 'id_usuario'))
+        cursor = paginador.codificar_cursor(['2026-01-01T00:00:00+00:00', 5], hacia_atras=True)
+        self.assertEqual(paginador.decodificar_cursor(cursor), (['2026-01-01T00:00:00+00:00', 5], True))
+
+    def test_recorre_todas_las_filas_en_ambas_direcciones(self):
+        vistos = []
+        url = '/api/usuarios/?limit=3'
+        while url:
+            contenido = self.client.get(url).json()
+            vistos.extend(usuario['id_usuario'] for usuario in contenido['data'])
+            url, anterior = contenido['next'], contenido['previous']
+        self.assertEqual(vistos, sorted(usuario.pk for usuario in self.usuarios))
+
+        contenido = self.client.get(anterior).json()
+        self.assertEqual([usuario['id_usuario'] for usuario in contenido['data']], vistos[3:6])
+
+    def recorrer(self, url, campo):
+        vistos, paginas = [], []
+        while url:
+            contenido = self.client.get(url).json()
+            paginas.append([fila[campo] for fila in contenido['data']])
+            vistos.extend(paginas[-1])
+            url, anterior = contenido['next'], contenido['previous']
+        return vistos, paginas, anterior
+
+    def test_logs_recorridos_con_filtro_y_empates_de_fecha(self):
+        fecha = timezone.now() - timedelta(hours=1)
+        for i in range(7):
+            LogSistema.objects.create(nivel='ERROR' if i % 3 else 'INFO', mensaje=f'log {i}', fecha_log=fecha)
+        LogSistema.objects.create(nivel='ERROR', mensaje='más reciente')
+        errores = list(
+            LogSistema.objects.filter(nivel='ERROR').order_by('-fecha_log', '-id_log').values_list('id_log', flat=True)
+        )
+
+        vistos, paginas, anterior = self.recorrer('/api/logs/?nivel=error&limit=2', 'id_log')
+        self.assertEqual(vistos, errores)
+        self.assertIn('nivel=error', anterior)
+        contenido = self.client.get(anterior).json()
+        self.assertEqual([log['id_log'] for log in contenido['data']], paginas[-2])
+
+    def test_actividades_recorridas_con_filtro(self):
+        fecha = timezone.now() - timedelta(days=1)
+        for i, usuario in enumerate(self.usuarios):
+            ActividadUsuario.objects.create(
+                id_usuario=usuario, accion='POST y', modulo='otros', fecha_actividad=fecha + timedelta(minutes=i % 2)
+            )
+        otros = list(
+            ActividadUsuario.objects.filter(modulo='otros')
+            .order_by('-fecha_actividad', '-id_actividad').values_list('id_actividad', flat=True)
+        )
+
+        vistos, paginas, anterior = self.recorrer('/api/actividades/?modulo=otros&limit=3', 'id_actividad')
+        self.assertEqual(vistos, otros)
+        self.assertEqual([len(pagina) for pagina in paginas], [3, 3, 1])
+        contenido = self.client.get(anterior).json()
+        self.assertEqual([actividad['id_actividad'] for actividad in contenido['data']], paginas[1])
+        self.assertNotIn('total', contenido)
+
+    def test_cursores_invalidos_responden_400(self):
+        casos = [
+            ('/api/usuarios/', 'no-es-base64!'),
+            ('/api/usuarios/', cursor_crudo(['abc'])),
+            ('/api/usuarios/', cursor_crudo([[1]])),
+            ('/api/usuarios/', cursor_crudo([1, 2])),
+            ('/api/usuarios/', cursor_crudo([1], direccion='x')),
+            ('/api/logs/', cursor_crudo(['notadate', 'x'])),
+            ('/api/actividades/', cursor_crudo([1, 'x'])),
+            ('/api/actividades/', cursor_crudo([None, 1])),
+        ]
+        for url, cursor in casos:
+            with self.subTest(url=url, cursor=cursor):
+                respuesta = self.client.get(url, {'cursor': cursor})
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertFalse(respuesta.json()['success'])
+
+
+# =============================================
+# EXPORTACIÓN EN STREAMING
+# =============================================
+
+class ExportacionTests(PruebaAPI):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuarios = [crear_usuario(f'user{i}', permisos_sistema={'reportes': True}) for i in range(5)]
+        Usuario.objects.update(token_2fa='secreto-2fa', token_recuperacion='secreto-recuperacion')
+
+    def setUp(self):
+        self.client.force_authenticate(self.usuarios[0])
+        # Lotes pequeños para recorrer varios
+        parche = mock.patch.object(exportacion, 'TAMANO_LOTE_EXPORTACION', 2)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def exportar(self, recurso, **parametros):
+        respuesta = self.client.get(f'/api/export/{recurso}/', parametros)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.streaming)
+        return b''.join(respuesta.streaming_content).decode('utf-8')
+
+    def test_ndjson_sin_campos_sensibles(self):
+        filas = [json.loads(linea) for linea in self.exportar('usuarios').splitlines()]
+        self.assertEqual([fila['username'] for fila in filas], [f'user{i}' for i in range(5)])
+        self.assertEqual(filas[0]['empleado_email'], 'user0@example.com')
+        for fila in filas:
+            self.assertFalse(set(fila) & exportacion.CAMPOS_EXCLUIDOS[Usuario])
+        self.assertNotIn('secreto', self.exportar('usuarios'))
+
+    def test_csv_con_encabezado_y_filtros(self):
+        filas = list(csv.reader(io.StringIO(self.exportar('usuarios', formato='csv'))))
+        self.assertIn('username', filas[0])
+        self.assertFalse(set(filas[0]) & exportacion.CAMPOS_EXCLUIDOS[Usuario])
+        self.assertEqual(len(filas), 6)
+        self.assertNotIn('secreto', self.exportar('usuarios', formato='csv'))
+
+        Usuario.objects.filter(username='user4').update(estado='inactivo')
+        filas = list(csv.reader(io.StringIO(self.exportar('usuarios', formato='csv', estado='inactivo'))))
+        self.assertEqual(len(filas), 2)
+
+    def test_recurso_o_formato_invalido(self):
+        self.assertEqual(self.client.get('/api/export/sesiones/').status_code, 404)
+        self.assertEqual(self.client.get('/api/export/usuarios/', {'formato': 'xml'}).status_code, 400)
+
+
+# =============================================
+# CAMPOS DINÁMICOS
+# =============================================
+
+class CamposDinamicosTests(PruebaAPI):
+    @classmethod
+    def setUpTestData(cls):
+        crear_usuario()
+
+    def test_expandir_dentro_del_empleado_de_usuarios(self):
+        respuesta = self.client.get('/api/usuarios/', {
+            'expand': 'empleado.departamento',
+            'fields': 'username,empleado.email,empleado.departamento.nombre',
+        })
+        self.assertEqual(respuesta.json()['data'], [
+            {'username': 'ana', 'empleado': {'email': 'ana@example.com', 'departamento': {'nombre': 'Sistemas'}}}
+        ])
+
+    def test_nombres_desconocidos_responden_400(self):
+        casos = [
+            ('/api/empleados/', {'fields': 'foo'}),
+            ('/api/empleados/', {'fields': 'email,departamento.foo'}),
+            ('/api/empleados/', {'fields': 'email.x'}),
+            ('/api/empleados/', {'expand': 'jefe'}),
+            ('/api/usuarios/', {'expand': 'empleado.id_departamento'}),
+            ('/api/usuarios/', {'fields': 'username,empleado.foo'}),
+        ]
+        for url, parametros in casos:
+            with self.subTest(url=url, parametros=parametros):
+                respuesta = self.client.get(url, parametros)
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertFalse(respuesta.json()['success'])
+
+        empleado = Empleado.objects.get()
+        respuesta = self.client.get(f'/api/empleados/{empleado.pk}/', {'fields': 'foo'})
+        self.assertEqual(respuesta.status_code, 400)
+        respuesta = self.client.get(
+            '/api/empleados/', {'fields': 'email,departamento.nombre', 'expand': 'departamento'}
+        )
+        self.assertEqual(
+            respuesta.json()['data'], [{'email': 'ana@example.com', 'departamento': {'nombre': 'Sistemas'}}]
+        )
+
+
+# =============================================
+# GET CONDICIONAL
+# =============================================
+
+class GetCondicionalTests(PruebaAPI):
+    def setUp(self):
+        self.usuario = crear_usuario()
+
+    def test_if_none_match_responde_304(self):
+        for url in ('/api/usuarios/', '/api/empleados/'):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(respuesta.status_code, 304)
+                self.assertEqual(respuesta['ETag'], etag)
+
+    def test_escritura_invalida_el_etag_de_usuarios(self):
+        etag = self.client.get('/api/usuarios/')['ETag']
+        empleado = self.usuario.id_empleado
+        empleado.telefono = '555-0101'
+        empleado.save()
+        self.assertEqual(self.client.get('/api/usuarios/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_empleados_sin_usuario_no_cambian_el_etag_de_usuarios(self):
+        etag = self.client.get('/api/usuarios/')['ETag']
+        crear_empleado('Luis', rol=self.usuario.id_empleado.id_rol)
+        self.assertEqual(self.client.get('/api/usuarios/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+# =============================================
+# CONTADORES DE ESTADÍSTICAS GENERALES
+# =============================================
+
+@override_settings(CONTADORES_FRAGMENTOS=4)
+class ContadoresGeneralesTests(PruebaAPI):
+    def setUp(self):
+        contadores.reconciliar()
+        self.addCleanup(setattr, contadores._local, 'fila', None)
+
+    def test_suma_los_deltas_de_todos_los_fragmentos(self):
+        self.assertEqual(EstadisticaGeneral.objects.count(), 4)
+        for fila in range(1, 5):
+            contadores._local.fila = fila
+            crear_empleado(f'Empleado{fila}')
+
+        self.assertEqual(EstadisticaGeneral.objects.filter(total_empleados__gt=0).count(), 4)
+        self.assertEqual(contadores.obtener_contadores()['total_empleados'], 4)
+        self.assertEqual(contadores.reconciliar(), {})
+        self.assertEqual(
+            list(EstadisticaGeneral.objects.order_by('pk').values_list('total_empleados', flat=True)), [4, 0, 0, 0]
+        )
+
+    def test_reconciliar_corrige_la_deriva(self):
+        crear_empleado('Luis')
+        # Cambio masivo sin señales: los contadores quedan desactualizados
+        Empleado.objects.update(estado='inactivo')
+        self.assertEqual(contadores.obtener_contadores()['empleados_activos'], 1)
+
+        self.assertEqual(contadores.reconciliar(), {'empleados_activos': (1, 0)})
+        self.assertEqual(contadores.obtener_contadores()['empleados_activos'], 0)
+
+    def test_fragmento_sin_crear_escribe_en_la_fila_principal(self):
+        EstadisticaGeneral.objects.filter(pk=3).delete()
+        contadores._local.fila = 3
+        crear_empleado('Luis')
+        self.assertEqual(EstadisticaGeneral.objects.get(pk=contadores.ID_FILA).total_empleados, 1)
+        self.assertEqual(contadores.reconciliar(), {})
+        self.assertEqual(EstadisticaGeneral.objects.count(), 4)
+
+
+# =============================================
+# ESTADÍSTICAS POR DEPARTAMENTO
+# =============================================
+
+class EstadisticasDepartamentosTests(PruebaAPI):
+    def setUp(self):
+        self.ventas = crear_empleado('Ana', departamento='Ventas').id_departamento
+        crear_empleado('Beto', departamento='Ventas')
+        self.sistemas = crear_empleado('Carla').id_departamento
+
+    def materializadas(self):
+        return {
+            fila['id_departamento']: (fila['total_empleados'], fila['empleados_activos'], fila['empleados_inactivos'])
+            for fila in contadores.estadisticas_departamentos_materializadas()
+        }
+
+    def en_vivo(self):
+        return {
+            fila['id_departamento']: (fila['total_empleados'], fila['empleados_activos'], fila['empleados_inactivos'])
+            for fila in contadores.estadisticas_departamentos_en_vivo()
+        }
+
+    def test_mover_un_empleado_entre_departamentos(self):
+        empleado = Empleado.objects.get(nombres='Beto')
+        empleado.id_departamento = self.sistemas
+        empleado.estado = 'inactivo'
+        empleado.save()
+
+        self.assertEqual(self.materializadas()[self.ventas.pk], (1, 1, 0))
+        self.assertEqual(self.materializadas()[self.sistemas.pk], (2, 1, 1))
+        self.assertEqual(self.materializadas(), self.en_vivo())
+
+        Empleado.objects.get(nombres='Carla').delete()
+        self.assertEqual(self.materializadas()[self.sistemas.pk], (1, 0, 1))
+        self.assertEqual(self.materializadas(), self.en_vivo())
+
+    def test_reconstruir_corrige_cambios_masivos(self):
+        # QuerySet.update no emite señales
+        Empleado.objects.filter(id_departamento=self.ventas).update(id_departamento=self.sistemas)
+        self.assertNotEqual(self.materializadas(), self.en_vivo())
+        self.assertEqual(contadores.reconstruir_departamentos(), 2)
+        self.assertEqual(self.materializadas(), self.en_vivo())
+
+    def test_la_vista_lee_la_tabla_materializada(self):
+        self.client.force_authenticate(crear_usuario(permisos_sistema={'reportes': True}))
+        contenido = self.client.get('/api/estadisticas/departamentos/').json()
+        self.assertEqual(contenido['fuente'], 'materializada')
+        totales = {fila['nombre']: fila['total_empleados'] for fila in contenido['data']}
+        self.assertEqual(totales, {'Ventas': 2, 'Sistemas': 2})
+
+
+# =============================================
+# DETALLE DE DEPARTAMENTO Y SUS EMPLEADOS
+# =============================================
+
+@mock.patch.object(DepartamentoConEmpleadosSerializer, 'LIMITE_EMPLEADOS', 3)
+class EmpleadosDepartamentoTests(PruebaAPI):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ids = [crear_empleado(f'Empleado{i}').pk for i in range(5)]
+        cls.sistemas = Departamento.objects.get(nombre='Sistemas')
+        cls.ventas = crear_empleado('Luis', departamento='Ventas').id_departamento
+
+    def test_muestra_acotada_y_cursor_del_subrecurso(self):
+        contenido = self.client.get(f'/api/departamentos/{self.sistemas.pk}/').json()
+        self.assertEqual([empleado['id_empleado'] for empleado in contenido['data']['empleados']], self.ids[:3])
+        self.assertEqual(contenido['data']['total_empleados'], 5)
+
+        vistos = []
+        # Los enlaces next conservan el límite de la primera página
+        url = replace_query_param(contenido['empleados_siguiente'], 'limit', 1)
+        while url:
+            pagina = self.client.get(url).json()
+            vistos.extend(empleado['id_empleado'] for empleado in pagina['data'])
+            url = pagina['next']
+        self.assertEqual(vistos, self.ids[3:])
+
+    def test_sin_mas_empleados_no_hay_enlace(self):
+        contenido = self.client.get(f'/api/departamentos/{self.ventas.pk}/').json()
+        self.assertEqual(len(contenido['data']['empleados']), 1)
+        self.assertIsNone(contenido['empleados_siguiente'])
+
+    def test_la_muestra_se_limita_en_la_consulta(self):
+        departamentos = DepartamentoConEmpleadosSerializer.con_empleados(Departamento.objects.order_by('pk'))
+        with self.assertNumQueries(2):
+            muestras = {departamento.pk: len(departamento.empleados_muestra) for departamento in departamentos}
+        # LIMITE_EMPLEADOS + 1 para saber si hay más
+        self.assertEqual(muestras, {self.sistemas.pk: 4, self.ventas.pk: 1})
+
+
+# =============================================
+# BÚSQUEDA DE EMPLEADOS
+# =============================================
+
+class BusquedaEmpleadosTests(PruebaAPI):
+    def buscar(self, consulta, **parametros):
+        return self.client.get('/api/empleados/buscar/', dict(parametros, q=consulta)).json()
+
+    def nombres(self, consulta):
+        return [empleado['nombre_completo'] for empleado in self.buscar(consulta)['data']]
+
+    def test_ignora_tildes_mayusculas_y_enie(self):
+        crear_empleado('José', 'Muñoz')
+        for consulta in ('jose', 'JOSÉ', 'munoz', 'Muñoz', 'muñ'):
+            with self.subTest(consulta=consulta):
+                contenido = self.buscar(consulta)
+                self.assertEqual(contenido['modo'], 'indice')
+                self.assertEqual([e['nombre_completo'] for e in contenido['data']], ['José Muñoz'])
+
+    def test_ordena_por_relevancia(self):
+        crear_empleado('Anabel', 'Ruiz')
+        crear_empleado('Ana María', 'Torresano')
+        crear_empleado('Ana', 'Torres')
+        # Ambos términos exactos, luego uno exacto y otro por prefijo, luego un prefijo
+        self.assertEqual(self.nombres('ana torres'), ['Ana Torres', 'Ana María Torresano', 'Anabel Ruiz'])
+
+    def test_documento_exacto_sin_pasar_por_el_indice(self):
+        crear_empleado('Luis', 'Gómez', numero_documento='12345678')
+        contenido = self.buscar('12345678')
+        self.assertEqual(contenido['modo'], 'exacto')
+        self.assertEqual([e['numero_documento'] for e in contenido['data']], ['12345678'])
+        # Un documento parcial no se indexa (tampoco en FULLTEXT)
+        self.assertEqual(self.buscar('1234')['data'], [])
+
+    def test_pagina_mas_alla_de_20(self):
+        esperados = {crear_empleado(f'Persona{i:02d}', 'García').pk for i in range(25)}
+        vistos, url, paginas = [], '/api/empleados/buscar/?q=garcia', 0
+        while url:
+            contenido = self.client.get(url).json()
+            vistos += [empleado['id_empleado'] for empleado in contenido['data']]
+            url, paginas = contenido['next'], paginas + 1
+        self.assertEqual(paginas, 2)
+        self.assertEqual(len(vistos), 25)
+        self.assertEqual(set(vistos), esperados)
+
+
+# =============================================
+# AUTOCOMPLETADO
+# =============================================
+
+class AutocompletadoTests(PruebaAPI):
+    @classmethod
+    def setUpTestData(cls):
+        for nombre in ('valentina', 'valeria', 'rodrigo'):
+            crear_usuario(nombre)
+
+    def setUp(self):
+        self.indice = autocompletado.IndiceAutocompletado()
+
+    def nombres(self, consulta):
+        return [entrada['nombre_completo'] for entrada in self.indice.buscar(consulta)]
+
+    def test_prefijo_y_errores_de_tipeo(self):
+        self.assertEqual(self.nombres('val'), ['Valentina Prueba', 'Valeria Prueba'])
+        self.assertEqual(self.nombres('rodirgo'), ['Rodrigo Prueba'])
+        self.assertEqual(self.nombres('valnetina')[:1], ['Valentina Prueba'])
+
+    def test_cambios_durante_la_carga_no_se_pierden(self):
+        empleado = Empleado.objects.get(nombres='Rodrigo')
+        original = autocompletado.iterar_lotes
+
+        def iterar_y_renombrar(*args, **kwargs):
+            # La señal llega mientras se lee la tabla, después de leer la fila
+            lotes = list(original(*args, **kwargs))
+            empleado.nombres = 'Ramiro'
+            self.indice.actualizar(empleado)
+            return lotes
+
+        with mock.patch.object(autocompletado, 'iterar_lotes', iterar_y_renombrar):
+            self.indice.cargar()
+        self.assertEqual(self.nombres('ramiro'), ['Ramiro Prueba'])
+        # El email sigue siendo rodrigo@...: misma entrada, ya actualizada
+        self.assertEqual(self.nombres('rodrigo'), ['Ramiro Prueba'])
+
+    def test_solo_sugiere_activos(self):
+        Empleado.objects.filter(nombres='Valeria').update(estado='inactivo')
+        self.assertEqual(self.nombres('val'), ['Valentina Prueba'])
+        todos = [entrada['nombre_completo'] for entrada in self.indice.buscar('val', estado=None)]
+        self.assertEqual(todos, ['Valentina Prueba', 'Valeria Prueba'])
+
+    def test_los_cambios_no_modifican_las_estructuras_publicadas(self):
+        self.assertEqual(self.nombres('rodrigo'), ['Rodrigo Prueba'])
+        publicadas = self.indice._datos
+        empleado = Empleado.objects.get(nombres='Rodrigo')
+        empleado.nombres = 'Ramiro'
+        self.indice.actualizar(empleado)
+
+        # Una consulta que tomó la referencia antes del cambio sigue viendo lo anterior
+        self.assertIn('rodrigo', publicadas.ids_por_token)
+        self.assertNotIn('ramiro', publicadas.ids_por_token)
+        self.assertEqual(publicadas.entradas[empleado.pk]['nombre_completo'], 'Rodrigo Prueba')
+        self.assertEqual(self.nombres('ramiro'), ['Ramiro Prueba'])
+
+
+# =============================================
+# INICIO DE SESIÓN
+# =============================================
+
+@override_settings(LOGIN_LIMITES={'ip': (3, 60), 'usuario': (100, 60)}, PROXIES_CONFIABLES=[])
+class LimitadorIpTests(PruebaAPI):
+    def setUp(self):
+        inicio_sesion._limitadores = None
+
+    def tearDown(self):
+        inicio_sesion._limitadores = None
+
+    def intentar(self, username, **extra):
+        return self.client.post('/api/auth/login/', {'username': username, 'password': 'x'}, format='json', **extra)
+
+    def test_x_forwarded_for_falsificado_no_evita_el_limite(self):
+        estados = [
+            self.intentar(f'usuario{i}', HTTP_X_FORWARDED_FOR=f'10.0.0.{i}').status_code
+            for i in range(5)
+        ]
+        self.assertEqual(estados, [401, 401, 401, 429, 429])
+
+    @override_settings(PROXIES_CONFIABLES=['127.0.0.1'])
+    def test_proxy_confiable_usa_la_ip_anterior_al_proxy(self):
+        # La entrada de la izquierda la controla el cliente; cuenta la que añadió el proxy
+        estados = [
+            self.intentar(f'usuario{i}', HTTP_X_FORWARDED_FOR=f'10.0.0.{i}, 203.0.113.7').status_code
+            for i in range(4)
+        ]
+        self.assertEqual(estados, [401, 401, 401, 429])
+        self.assertEqual(self.intentar('otro', HTTP_X_FORWARDED_FOR='198.51.100.1').status_code, 401)
+
+
+class LimitadorVentanaTests(PruebaAPI):
+    def setUp(self):
+        self.fijar_reloj(inicio_sesion)
+
+    def test_limite_por_ventana_deslizante(self):
+        limitador = inicio_sesion.LimitadorVentana(2, 60)
+        self.assertEqual([limitador.intentar('a'), limitador.intentar('a')], [0, 0])
+        self.assertEqual(limitador.intentar('a'), 60)
+        self.assertEqual(limitador.intentar('b'), 0)
+
+        self.ahora += 30
+        self.assertEqual(limitador.intentar('a'), 30)
+        self.ahora += 30
+        self.assertEqual(limitador.intentar('a'), 0)
+
+    def test_reiniciar_y_maximo_de_claves(self):
+        limitador = inicio_sesion.LimitadorVentana(1, 60, maximo_claves=2)
+        limitador.intentar('a')
+        limitador.reiniciar('a')
+        self.assertEqual(limitador.intentar('a'), 0)
+
+        limitador.intentar('b')
+        limitador.intentar('c')
+        # 'a' era la menos reciente y se olvidó
+        self.assertEqual(limitador.intentar('a'), 0)
+        self.assertEqual(limitador.intentar('c'), 60)
+
+
+@override_settings(LOGIN_LIMITES={}, LOGIN_MAX_INTENTOS=3, LOGIN_BLOQUEO_MINUTOS=15)
+class BloqueoPorIntentosTests(PruebaAPI):
+    def setUp(self):
+        inicio_sesion._limitadores = None
+        self.addCleanup(setattr, inicio_sesion, '_limitadores', None)
+        self.usuario = crear_usuario()
+
+    def intentar(self, password):
+        return self.client.post('/api/auth/login/', {'username': 'ana', 'password': password}, format='json')
+
+    def test_bloquea_al_llegar_al_umbral(self):
+        self.assertEqual([self.intentar('x').status_code for _ in range(3)], [401, 401, 401])
+        self.usuario.refresh_from_db()
+        self.assertTrue(self.usuario.bloqueado)
+        self.assertEqual(self.usuario.intentos_fallidos, 3)
+
+        respuesta = self.intentar('secreta')
+        self.assertEqual(respuesta.status_code, 403)
+        self.assertIn('Retry-After', respuesta)
+
+    def test_el_bloqueo_vence_y_un_inicio_correcto_reinicia(self):
+        for _ in range(3):
+            self.intentar('x')
+        Usuario.objects.filter(pk=self.usuario.pk).update(fecha_bloqueo=timezone.now() - timedelta(minutes=16))
+
+        self.assertEqual(self.intentar('secreta').status_code, 200)
+        self.usuario.refresh_from_db()
+        self.assertFalse(self.usuario.bloqueado)
+        self.assertEqual(self.usuario.intentos_fallidos, 0)
+        self.assertIsNone(self.usuario.fecha_bloqueo)
+
+    def test_un_fallo_tras_vencer_el_bloqueo_no_vuelve_a_bloquear(self):
+        for _ in range(3):
+            self.intentar('x')
+        Usuario.objects.filter(pk=self.usuario.pk).update(fecha_bloqueo=timezone.now() - timedelta(minutes=16))
+
+        self.assertEqual(self.intentar('x').status_code, 401)
+        self.usuario.refresh_from_db()
+        self.assertFalse(self.usuario.bloqueado)
+        self.assertEqual(self.usuario.intentos_fallidos, 1)
+        self.assertEqual(self.intentar('secreta').status_code, 200)
+
+    def test_fallos_no_consecutivos_no_bloquean(self):
+        self.assertEqual([self.intentar(p).status_code for p in ('x', 'x', 'secreta', 'x', 'x')], [401, 401, 200, 401, 401])
+        self.usuario.refresh_from_db()
+        self.assertFalse(self.usuario.bloqueado)
+
+
+class RotacionTokenTests(PruebaAPI):
+    def setUp(self):
+        self.token, self.sesion = inicio_sesion.crear_sesion(crear_usuario())
+        self.assertIsNotNone(autenticacion.validar_token(self.token))
+
+    def test_solo_se_guarda_el_hash(self):
+        self.assertEqual(self.sesion.token_sesion, autenticacion.hash_token(self.token))
+
+    def test_rotar_con_save(self):
+        for update_fields in (None, ['token_sesion']):
+            with self.subTest(update_fields=update_fields):
+                anterior, nuevo = self.token, f'{self.token}-rotado'
+                self.sesion.token_sesion = autenticacion.hash_token(nuevo)
+                self.sesion.save(update_fields=update_fields)
+
+                self.assertIsNone(autenticacion.validar_token(anterior))
+                self.assertIsNotNone(autenticacion.validar_token(nuevo))
+                self.token = nuevo
+
+
+# =============================================
+# PERMISOS
+# =============================================
+
+@override_settings(PERMISOS_VERIFICAR_CADA=5)
+class CachePermisosTests(PruebaAPI):
+    def setUp(self):
+        self.usuario = crear_usuario(permisos_sistema={'reportes': True, 'empleados': ['leer']})
+        self.usuario = Usuario.objects.select_related('id_empleado').get(pk=self.usuario.pk)
+        self.fijar_reloj(permisos)
+        permisos.cache.invalidar()
+        self.addCleanup(permisos.cache.invalidar)
+
+    def test_acierto_sin_consultas(self):
+        permisos.permisos_usuario(self.usuario)
+        with self.assertNumQueries(0):
+            concedidos = permisos.permisos_usuario(self.usuario)
+            self.assertTrue(concedidos.tiene('reportes.exportar'))
+            self.assertTrue(concedidos.tiene('empleados.leer'))
+            self.assertFalse(concedidos.tiene('empleados.editar'))
+
+    def test_verifica_la_version_al_vencer_y_recarga_si_cambio(self):
+        permisos.permisos_usuario(self.usuario)
+        self.ahora += 6
+        with self.assertNumQueries(1):
+            permisos.permisos_usuario(self.usuario)
+
+        # Cambio hecho por otro proceso: solo llega la nueva versión de 'roles'
+        Rol.objects.filter(pk=self.usuario.id_empleado.id_rol_id).update(permisos_sistema={})
+        incrementar_version(permisos.RECURSO_VERSION)
+
+        self.assertTrue(permisos.permisos_usuario(self.usuario).tiene('reportes'))
+        self.ahora += 6
+        self.assertFalse(permisos.permisos_usuario(self.usuario).tiene('reportes'))
+
+
+class PermisosVistasTests(PruebaAPI):
+    URLS_REPORTES = (
+        '/api/estadisticas/generales/', '/api/estadisticas/departamentos/',
+        '/api/actividades/series/', '/api/export/empleados/',
+    )
+    URLS_LOGS = ('/api/logs/', '/api/logs/archivo/')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sin_permisos = crear_usuario('ana')
+        cls.reportes = crear_usuario('beto', permisos_sistema={'reportes': True})
+        cls.logs = crear_usuario('carla', permisos_sistema={'logs': True})
+
+    def consultar(self, url, usuario=None):
+        self.client.force_authenticate(usuario)
+        return self.client.get(url)
+
+    def test_sin_autenticar_responde_401(self):
+        for url in self.URLS_REPORTES + self.URLS_LOGS:
+            with self.subTest(url=url):
+                self.assertEqual(self.consultar(url).status_code, 401)
+
+    def test_sin_el_permiso_responde_403(self):
+        casos = [(url, self.sin_permisos) for url in self.URLS_REPORTES + self.URLS_LOGS]
+        casos += [(url, self.logs) for url in self.URLS_REPORTES]
+        casos += [(url, self.reportes) for url in self.URLS_LOGS]
+        for url, usuario in casos:
+            with self.subTest(url=url, usuario=usuario.username):
+                self.assertEqual(self.consultar(url, usuario).status_code, 403)
+
+    def test_con_el_permiso_responde_200(self):
+        casos = [(url, self.reportes) for url in self.URLS_REPORTES]
+        casos += [(url, self.logs) for url in self.URLS_LOGS]
+        for url, usuario in casos:
+            with self.subTest(url=url, usuario=usuario.username):
+                self.assertEqual(self.consultar(url, usuario).status_code, 200)
+
+
+# =============================================
+# ESCRITURA DIFERIDA DE ACCESOS
+# =============================================
+
+class RegistroAccesosTests(PruebaAPI):
+    def setUp(self):
+        self.usuario = crear_usuario()
+        # Instancia propia, sin hilo de fondo: se vacía a mano
+        self.registro = accesos.RegistroAccesos()
+        self.registro._asegurar_hilo = lambda: None
+
+    def test_vaciar_actualiza_el_etag_del_listado_de_usuarios(self):
+        respuesta = self.client.get('/api/usuarios/')
+        etag = respuesta['ETag']
+
+        self.registro.registrar(self.usuario.pk)
+        self.registro.vaciar()
+
+        self.usuario.refresh_from_db()
+        self.assertIsNotNone(self.usuario.ultimo_acceso)
+        self.assertEqual(self.client.get('/api/usuarios/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_vaciados_seguidos_no_cambian_el_etag(self):
+        self.fijar_reloj(accesos)
+
+        self.registro.registrar(self.usuario.pk)
+        self.registro.vaciar()
+        etag = self.client.get('/api/usuarios/')['ETag']
+
+        self.ahora += 30
+        self.registro.registrar(self.usuario.pk)
+        self.registro.vaciar()
+        self.assertEqual(self.client.get('/api/usuarios/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.ahora += 300
+        self.registro.registrar(self.usuario.pk)
+        self.registro.vaciar()
+        self.assertEqual(self.client.get('/api/usuarios/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_no_retrocede_fechas(self):
+        ahora = timezone.now()
+        self.registro.registrar(self.usuario.pk, fecha=ahora)
+        self.registro.vaciar()
+        self.registro.registrar(self.usuario.pk, fecha=ahora - timedelta(hours=1))
+        self.registro.vaciar()
+        self.usuario.refresh_from_db()
+        self.assertEqual(self.usuario.ultimo_acceso, ahora)
+
+    def test_fallo_conserva_las_fechas_para_reintentar(self):
+        ahora = timezone.now()
+        self.registro.registrar(self.usuario.pk, fecha=ahora)
+        with mock.patch.object(accesos, '_actualizar', side_effect=RuntimeError('sin conexión')):
+            self.registro.vaciar()
+        self.assertEqual(self.registro.estadisticas()['usuarios_pendientes'], 1)
+
+        self.registro.registrar(self.usuario.pk, fecha=ahora - timedelta(minutes=5))
+        self.registro.vaciar()
+        self.usuario.refresh_from_db()
+        self.assertEqual(self.usuario.ultimo_acceso, ahora)
+
+
+# =============================================
+# CONTADORES DE NOTIFICACIONES NO LEÍDAS
+# =============================================
+
+class ContadorNoLeidasTests(PruebaAPI):
+    def setUp(self):
+        self.usuario = crear_usuario()
+        for i in range(3):
+            Notificacion.objects.create(id_usuario=self.usuario, titulo=f'Aviso {i}', mensaje='...')
+
+    def contador(self):
+        return ContadorNotificacionesUsuario.objects.get(pk=self.usuario.pk).no_leidas
+
+    def test_no_baja_de_cero(self):
+        contadores.ajustar_no_leidas(self.usuario.pk, -10)
+        self.assertEqual(self.contador(), 0)
+        contadores.ajustar_no_leidas_usuarios([self.usuario.pk], -10)
+        self.assertEqual(self.contador(), 0)
+
+    def test_reconciliar_corrige_la_deriva_por_usuario(self):
+        otro = crear_usuario('beto')
+        contadores.obtener_no_leidas(otro.pk)
+        # Doble descuento: marcar_leidas y luego la señal de una instancia desactualizada
+        contadores.marcar_leidas(self.usuario.pk)
+        contadores.ajustar_no_leidas(self.usuario.pk, 1)
+        ContadorNotificacionesUsuario.objects.filter(pk=otro.pk).update(no_leidas=4)
+
+        deriva = contadores.reconciliar_no_leidas_usuarios()
+
+        self.assertEqual(deriva, {self.usuario.pk: (1, 0), otro.pk: (4, 0)})
+        self.assertEqual(self.contador(), 0)
+        self.assertEqual(contadores.reconciliar_no_leidas_usuarios(), {})
+
+
+# =============================================
+# DIFUSIÓN DE NOTIFICACIONES
+# =============================================
+
+class DifusionNotificacionesTests(PruebaAPI):
+    def setUp(self):
+        self.usuarios = [crear_usuario(username) for username in ('ana', 'beto', 'carla')]
+        self.difusion = DifusionNotificacion.objects.create(
+            titulo='Mantenimiento', mensaje='Esta noche', id_departamento=self.usuarios[0].id_empleado.id_departamento
+        )
+        self.publicadas = []
+        parche = mock.patch.object(tiempo_real, 'publicar_notificacion', self.publicadas.append)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def test_publica_aunque_bulk_create_no_devuelva_ids(self):
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False), \
+                self.captureOnCommitCallbacks(execute=True):
+            difusion = difusion_notificaciones.ejecutar(self.difusion.pk, tamano_lote=2)
+
+        self.assertEqual(difusion.estado, 'completada')
+        self.assertEqual(difusion.enviadas, 3)
+        self.assertEqual(
+            sorted(notificacion.id_usuario_id for notificacion in self.publicadas),
+            sorted(usuario.pk for usuario in self.usuarios),
+        )
+        self.assertTrue(all(notificacion.pk is not None for notificacion in self.publicadas))
+
+    @override_settings(DIFUSION_CONCESION_SEGUNDOS=300)
+    def test_concesion_vigente_impide_reclamar_y_vencida_se_retoma(self):
+        # Otro proceso la tomó y envió el primer lote
+        primero = self.usuarios[0]
+        Notificacion.objects.create(id_usuario=primero, titulo='Mantenimiento', mensaje='Esta noche')
+        DifusionNotificacion.objects.filter(pk=self.difusion.pk).update(
+            estado='en_proceso', procesando_desde=timezone.now(), ultimo_id_usuario=primero.pk, enviadas=1,
+            total_destinatarios=3,
+        )
+        self.assertIsNone(difusion_notificaciones.ejecutar(self.difusion.pk))
+
+        DifusionNotificacion.objects.filter(pk=self.difusion.pk).update(
+            procesando_desde=timezone.now() - timedelta(seconds=301)
+        )
+        difusion = difusion_notificaciones.ejecutar(self.difusion.pk, tamano_lote=1)
+
+        self.assertEqual((difusion.estado, difusion.enviadas), ('completada', 3))
+        self.assertIsNone(difusion.procesando_desde)
+        recibidas = Notificacion.objects.values_list('id_usuario', flat=True)
+        self.assertEqual(sorted(recibidas), sorted(usuario.pk for usuario in self.usuarios))
+
+    def test_quien_pierde_la_concesion_deja_de_enviar(self):
+        original = contadores.ajustar_no_leidas_usuarios
+
+        def ajustar_y_perder_la_concesion(*args, **kwargs):
+            original(*args, **kwargs)
+            # Otro proceso reclama la difusión tras el primer lote
+            DifusionNotificacion.objects.filter(pk=self.difusion.pk).update(procesando_desde=timezone.now())
+
+        with mock.patch.object(contadores, 'ajustar_no_leidas_usuarios', ajustar_y_perder_la_concesion):
+            difusion = difusion_notificaciones.ejecutar(self.difusion.pk, tamano_lote=1)
+
+        self.assertEqual((difusion.estado, difusion.enviadas), ('en_proceso', 1))
+        self.assertEqual(Notificacion.objects.count(), 1)
+
+    def test_broker_exige_la_interfaz_completa(self):
+        class BrokerIncompleto(tiempo_real.Broker):
+            def publicar(self, canal, evento):
+                pass
+
+        with self.assertRaises(TypeError):
+            BrokerIncompleto()
+
+
+# =============================================
+# DEDUPLICACIÓN Y RESUMEN DE NOTIFICACIONES
+# =============================================
+
+class DeduplicacionNotificacionesTests(PruebaAPI):
+    def setUp(self):
+        self.usuario = crear_usuario()
+
+    def crear(self, titulo='Copia de seguridad fallida', **kwargs):
+        return notificaciones.crear_notificacion(self.usuario.pk, titulo, '...', tipo='warning', **kwargs)
+
+    def test_agrupa_repeticiones_dentro_de_la_ventana(self):
+        resultado, primera = self.crear()
+        self.assertEqual(resultado, 'creada')
+        resultado, agrupada = self.crear()
+        self.assertEqual((resultado, agrupada.pk, agrupada.ocurrencias), ('agrupada', primera.pk, 2))
+        self.assertEqual(contadores.obtener_no_leidas(self.usuario.pk), 1)
+        # Otra clave de productor o de título no se agrupa
+        self.assertEqual(self.crear('Otro aviso')[0], 'creada')
+
+    @override_settings(NOTIFICACIONES_VENTANA_DEDUP=600)
+    def test_no_agrupa_fuera_de_ventana_leidas_ni_vencidas(self):
+        _, notificacion = self.crear()
+        Notificacion.objects.filter(pk=notificacion.pk).update(
+            fecha_ultima_ocurrencia=timezone.now() - timedelta(seconds=601)
+        )
+        self.assertEqual(self.crear()[0], 'creada')
+
+        contadores.marcar_leidas(self.usuario.pk)
+        self.assertEqual(self.crear()[0], 'creada')
+
+        Notificacion.objects.filter(leida=False).update(fecha_expiracion=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.crear()[0], 'creada')
+
+    def test_agrupar_extiende_la_expiracion(self):
+        ahora = timezone.now()
+        _, notificacion = self.crear(fecha_expiracion=ahora + timedelta(minutes=1))
+        _, agrupada = self.crear(fecha_expiracion=ahora + timedelta(days=1))
+        self.assertEqual(agrupada.fecha_expiracion, ahora + timedelta(days=1))
+        _, agrupada = self.crear(fecha_expiracion=ahora + timedelta(hours=1))
+        self.assertEqual(agrupada.fecha_expiracion, ahora + timedelta(days=1))
+        _, agrupada = self.crear()
+        self.assertIsNone(agrupada.fecha_expiracion)
+
+    def test_modo_resumen(self):
+        Usuario.objects.filter(pk=self.usuario.pk).update(configuracion_usuario={'resumen_notificaciones': True})
+        for titulo in ('Nuevo comentario', 'Nuevo comentario', 'Tarea asignada'):
+            resultado, _ = notificaciones.crear_notificacion(self.usuario.pk, titulo, '...', categoria='trabajo')
+            self.assertEqual(resultado, 'diferida')
+        # Las que no son 'info' se entregan al instante
+        self.assertEqual(self.crear()[0], 'creada')
+
+        self.assertEqual(notificaciones.enviar_resumenes(), 1)
+        resumen = Notificacion.objects.get(titulo__startswith='Resumen')
+        self.assertEqual(resumen.titulo, 'Resumen: 3 notificaciones')
+        self.assertEqual(resumen.mensaje, '- Nuevo comentario (x2)\n- Tarea asignada')
+        self.assertEqual(resumen.categoria, 'trabajo')
+        self.assertFalse(NotificacionPendienteResumen.objects.exists())
+        self.assertEqual(notificaciones.enviar_resumenes(), 0)
+
+
+# =============================================
+# REGISTRO EN LOG_SISTEMA POR LOTES
+# =============================================
+
+class RegistroLogSistemaTests(PruebaAPI):
+    def setUp(self):
+        self.usuario = crear_usuario()
+        self.handler = registro.LogSistemaHandler(tamano_lote=2)
+        # Sin hilo de fondo: se vacía a mano
+        self.handler.escritor._asegurar_hilo = lambda: None
+        self.logger = logging.getLogger('api.pruebas.registro')
+        self.logger.propagate = False
+        self.logger.addHandler(self.handler)
+        self.addCleanup(self.logger.removeHandler, self.handler)
+
+    def test_escribe_por_lotes_al_vaciar(self):
+        for i in range(5):
+            self.logger.warning('Aviso %s', i, extra={
+                'modulo': 'pruebas', 'id_usuario': self.usuario.pk, 'datos_contexto': {'pedido': i},
+            })
+        # Solo las filas de esta prueba: el logger 'api' escribe en la misma tabla
+        propias = LogSistema.objects.filter(modulo='pruebas')
+        self.assertEqual(propias.count(), 0)
+
+        self.handler.flush()
+        estadisticas = self.handler.escritor.estadisticas()
+        self.assertEqual((estadisticas['escritas'], estadisticas['lotes'], estadisticas['pendientes']), (5, 3, 0))
+        self.assertEqual(propias.count(), 5)
+        log = propias.get(mensaje='Aviso 3')
+        self.assertEqual((log.nivel, log.modulo, log.id_usuario_id), ('WARNING', 'pruebas', self.usuario.pk))
+        self.assertEqual(log.datos_contexto['pedido'], 3)
+
+    def test_una_fila_invalida_no_descarta_el_lote(self):
+        escritor = self.handler.escritor
+        for nivel in ('INFO', None, 'ERROR'):
+            escritor.agregar({
+                'fecha_log': timezone.now(), 'nivel': nivel, 'mensaje': f'nivel {nivel}', 'modulo': 'pruebas',
+            })
+        with self.assertLogs('api.escritura_diferida', 'WARNING'):
+            escritor.vaciar()
+
+        estadisticas = escritor.estadisticas()
+        self.assertEqual((estadisticas['escritas'], estadisticas['fallidas']), (2, 1))
+        niveles = LogSistema.objects.filter(modulo='pruebas').values_list('nivel', flat=True)
+        self.assertEqual(sorted(niveles), ['ERROR', 'INFO'])
+
+    def test_cola_acotada_descarta_y_cuenta(self):
+        escritor = escritura_diferida.EscritorPorLotes('api.LogSistema', capacidad=2)
+        escritor._asegurar_hilo = lambda: None
+        aceptadas = [
+            escritor.agregar({'fecha_log': timezone.now(), 'nivel': 'INFO', 'mensaje': str(i)}) for i in range(3)
+        ]
+        self.assertEqual(aceptadas, [True, True, False])
+        self.assertEqual(escritor.estadisticas()['descartadas'], 1)
+
+
+# =============================================
+# MUESTREO DE ACTIVIDAD DE USUARIO
+# =============================================
+
+@override_settings(ACTIVIDAD_MUESTREO={'*': 1.0, 'departamentos-list': 0.25})
+class ActividadMuestreoTests(PruebaAPI):
+    def setUp(self):
+        self.usuario = crear_usuario()
+        token, _ = inicio_sesion.crear_sesion(self.usuario)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.escritor = escritura_diferida.EscritorPorLotes('api.ActividadUsuario')
+        self.escritor._asegurar_hilo = lambda: None
+        parche = mock.patch.object(middleware, '_escritor_actividades', self.escritor)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def _registradas(self):
+        self.escritor.vaciar()
+        return list(ActividadUsuario.objects.filter(id_usuario=self.usuario).order_by('id_actividad'))
+
+    def test_lecturas_muestreadas_por_ruta(self):
+        with mock.patch.object(middleware.random, 'random', side_effect=[0.1, 0.5]):
+            self.client.get('/api/departamentos/')
+            self.client.get('/api/departamentos/')
+
+        actividades = self._registradas()
+        self.assertEqual(len(actividades), 1)
+        self.assertEqual(actividades[0].accion, 'GET departamentos-list')
+        self.assertEqual(actividades[0].datos_adicionales['muestreo'], 0.25)
+        self.assertEqual(actividades[0].datos_adicionales['estado'], 200)
+
+    def test_escrituras_siempre_registradas(self):
+        with mock.patch.object(middleware.random, 'random', return_value=0.99) as aleatorio:
+            for _ in range(3):
+                self.client.post('/api/departamentos/', {}, format='json')
+
+        aleatorio.assert_not_called()
+        actividades = self._registradas()
+        self.assertEqual(len(actividades), 3)
+        self.assertEqual({a.datos_adicionales['muestreo'] for a in actividades}, {1.0})
+
+    def test_sin_usuario_no_registra(self):
+        self.client.credentials()
+        self.client.get('/api/departamentos/')
+        self.assertEqual(self.escritor.estadisticas()['encoladas'], 0)
+
+
+# =============================================
+# RETENCIÓN Y ARCHIVO
+# =============================================
+
+class RetencionArchivoTests(PruebaAPI):
+    def setUp(self):
+        temporal = tempfile.TemporaryDirectory()
+        self.addCleanup(temporal.cleanup)
+        self.directorio = Path(temporal.name)
+        antigua = timezone.now() - timedelta(days=100)
+        for i in range(3):
+            LogSistema.objects.create(nivel='INFO', mensaje=f'antiguo {i}', fecha_log=antigua + timedelta(minutes=i))
+        self.reciente = LogSistema.objects.create(nivel='INFO', mensaje='reciente')
+        self.antiguos = LogSistema.objects.filter(mensaje__startswith='antiguo')
+
+    def archivar(self):
+        return retencion.archivar('logs', directorio=self.directorio, pausa=0)
+
+    def archivos(self):
+        return sorted(ruta for ruta in self.directorio.rglob('*') if ruta.is_file())
+
+    def leer(self, ruta):
+        with gzip.open(ruta, 'rt', encoding='utf-8') as segmento:
+            return [json.loads(linea) for linea in segmento]
+
+    def test_interrumpido_reescribe_el_mismo_segmento(self):
+        original = retencion._archivar_filas
+
+        def archivar_y_cortar(*args):
+            original(*args)
+            raise RuntimeError('corte antes de borrar')
+
+        with mock.patch.object(retencion, '_archivar_filas', archivar_y_cortar):
+            with self.assertRaises(RuntimeError):
+                self.archivar()
+        self.assertEqual(self.antiguos.count(), 3)
+        indice, segmento = self.archivos()
+        contenido = segmento.read_bytes()
+
+        resultado = self.archivar()
+        self.assertEqual((resultado['archivadas'], resultado['segmentos']), (3, 1))
+        self.assertEqual(self.archivos(), [indice, segmento])
+        self.assertEqual(segmento.read_bytes(), contenido)
+        self.assertEqual([fila['mensaje'] for fila in self.leer(segmento)], ['antiguo 0', 'antiguo 1', 'antiguo 2'])
+        self.assertEqual(json.loads(indice.read_text())['registros'], 3)
+        self.assertFalse(self.antiguos.exists())
+        self.assertTrue(LogSistema.objects.filter(pk=self.reciente.pk).exists())
+
+    def test_segunda_ejecucion_no_archiva_nada(self):
+        self.archivar()
+        archivos = self.archivos()
+        self.assertEqual(self.archivar(), {'archivadas': 0, 'segmentos': 0, 'particiones_eliminadas': 0})
+        self.assertEqual(self.archivos(), archivos)
+
+
+# =============================================
+# RESUMEN HORARIO DE ACTIVIDADES
+# =============================================
+
+class ResumenActividadesTests(PruebaAPI):
+    def setUp(self):
+        self.usuario = crear_usuario()
+        self.hora = (timezone.now() - timedelta(hours=3)).replace(minute=0, second=0, microsecond=0)
+
+    def actividad(self, fecha, accion='GET x'):
+        return ActividadUsuario.objects.create(
+            id_usuario=self.usuario, accion=accion, modulo='pruebas', fecha_actividad=fecha
+        )
+
+    def totales(self):
+        return {
+            (resumen.hora, resumen.accion): resumen.total
+            for resumen in ActividadResumenHora.objects.filter(id_usuario=self.usuario)
+        }
+
+    def test_la_marca_avanza_por_lotes_sin_contar_dos_veces(self):
+        actividades = [self.actividad(self.hora + timedelta(minutes=i)) for i in range(5)]
+
+        resultado = resumenes.agregar_actividades(tamano_lote=2)
+        self.assertEqual((resultado['actividades'], resultado['ultimo_id']), (5, actividades[-1].pk))
+        self.assertEqual(resumenes.estado_marca()[0], actividades[-1].pk)
+        self.assertEqual(self.totales(), {(self.hora, 'GET x'): 5})
+
+        resultado = resumenes.agregar_actividades(tamano_lote=2)
+        self.assertEqual((resultado['actividades'], resultado['ultimo_id']), (0, actividades[-1].pk))
+        self.assertEqual(self.totales(), {(self.hora, 'GET x'): 5})
+
+    def test_filas_recientes_y_tardias(self):
+        antigua = self.actividad(self.hora)
+        reciente = self.actividad(timezone.now())
+
+        resumenes.agregar_actividades()
+        # La reciente queda fuera del retraso: la marca no la sobrepasa
+        self.assertEqual(resumenes.estado_marca()[0], antigua.pk)
+        self.assertEqual(self.totales(), {(self.hora, 'GET x'): 1})
+
+        # Una fila tardía (id mayor, fecha de una hora ya resumida) se suma
+        # a ese resumen; la reciente entra cuando supera el retraso
+        tardia = self.actividad(self.hora + timedelta(minutes=30))
+        ActividadUsuario.objects.filter(pk=reciente.pk).update(
+            fecha_actividad=self.hora + timedelta(hours=1), accion='POST y'
+        )
+        resultado = resumenes.agregar_actividades()
+        self.assertEqual((resultado['actividades'], resultado['ultimo_id']), (2, tardia.pk))
+        self.assertEqual(self.totales(), {(self.hora, 'GET x'): 2, (self.hora + timedelta(hours=1), 'POST y'): 1})
+
+        serie = resumenes.serie('dia', id_usuario=self.usuario.pk)
+        self.assertEqual(sum(fila['total'] for fila in serie), 3)
+
+
+# =============================================
+# BARRIDO DE VENCIMIENTOS
+# =============================================
+
+class BarridoVencimientosTests(PruebaAPI):
+    def test_purga_notificaciones_y_ajusta_contadores(self):
+        usuario = crear_usuario()
+        ayer = timezone.now() - timedelta(days=1)
+        for i in range(5):
+            Notificacion.objects.create(
+                id_usuario=usuario, titulo=f'Aviso {i}', mensaje='...',
+                leida=i == 0, fecha_expiracion=ayer if i < 3 else None,
+            )
+        contadores.reconciliar()
+        self.assertEqual(contadores.obtener_no_leidas(usuario.pk), 4)
+
+        resultado = vencimientos.purgar_notificaciones(tamano_lote=2, pausa=0)
+
+        self.assertEqual(resultado['filas'], 3)
+        self.assertEqual(Notificacion.objects.count(), 2)
+        self.assertEqual(contadores.obtener_no_leidas(usuario.pk), 2)
+        self.assertEqual(contadores.obtener_contadores()['notificaciones_no_leidas'], 2)
+        self.assertEqual(contadores.reconciliar(), {})
+
+    def test_purga_emite_las_senales_de_borrado(self):
+        usuario = crear_usuario()
+        vencida = Notificacion.objects.create(
+            id_usuario=usuario, titulo='Aviso', mensaje='...', fecha_expiracion=timezone.now() - timedelta(days=1)
+        )
+        borradas = []
+
+        def receptor(sender, instance, **kwargs):
+            borradas.append(instance.pk)
+
+        post_delete.connect(receptor, sender=Notificacion)
+        self.addCleanup(post_delete.disconnect, receptor, sender=Notificacion)
+        vencimientos.purgar_notificaciones(pausa=0)
+        self.assertEqual(borradas, [vencida.pk])
+
+
+# =============================================
+# BÚSQUEDA EN EL ARCHIVO DE REGISTROS
+# =============================================
+
+class BusquedaArchivoTests(PruebaAPI):
+    def setUp(self):
+        temporal = tempfile.TemporaryDirectory()
+        self.addCleanup(temporal.cleanup)
+        self.directorio = temporal.name
+        self.rutas = []
+        id_log = 0
+        for dia, niveles in ((1, ['INFO', 'INFO']), (2, ['ERROR', 'INFO', 'ERROR']), (3, ['ERROR', 'ERROR'])):
+            filas = []
+            for hora, nivel in enumerate(niveles):
+                id_log += 1
+                filas.append({
+                    'id_log': id_log, 'nivel': nivel, 'mensaje': f'mensaje {id_log}', 'modulo': 'auth',
+                    'id_usuario': 1, 'fecha_log': datetime(2025, 1, dia, hora, tzinfo=dt_timezone.utc),
+                })
+            ruta = retencion.ruta_segmento(self.directorio, 'logs', date(2025, 1, dia), filas[0]['id_log'])
+            retencion.escribir_segmento(ruta, filas, 'fecha_log')
+            self.rutas.append(ruta)
+
+    def buscar(self, **filtros):
+        return archivo.buscar('logs', directorio=self.directorio, **filtros)
+
+    def test_descarta_segmentos_por_su_indice(self):
+        resultado = self.buscar(nivel='error')
+        self.assertEqual([fila['id_log'] for fila in resultado['resultados']], [3, 5, 6, 7])
+        self.assertEqual((resultado['segmentos_leidos'], resultado['segmentos_omitidos']), (2, 1))
+
+        resultado = self.buscar(desde=datetime(2025, 1, 3, tzinfo=dt_timezone.utc))
+        self.assertEqual((resultado['segmentos_leidos'], resultado['segmentos_omitidos']), (1, 0))
+
+    def test_el_cursor_recorre_todas_las_coincidencias(self):
+        vistos, cursor = [], None
+        while True:
+            resultado = self.buscar(nivel='ERROR', limite=3, cursor=cursor)
+            vistos.extend(fila['id_log'] for fila in resultado['resultados'])
+            cursor = resultado['siguiente']
+            if not cursor:
+                break
+        self.assertEqual(vistos, [3, 5, 6, 7])
+        with self.assertRaises(archivo.CursorArchivoInvalido):
+            self.buscar(cursor='sin-linea')
+
+    def test_sin_indice_recorre_el_segmento_sin_escribirlo(self):
+        indice = retencion.ruta_indice(self.rutas[0])
+        indice.unlink()
+
+        resultado = self.buscar(nivel='ERROR')
+        self.assertEqual([fila['id_log'] for fila in resultado['resultados']], [3, 5, 6, 7])
+        self.assertEqual((resultado['segmentos_leidos'], resultado['segmentos_omitidos']), (3, 0))
+        self.assertFalse(indice.exists())
+
+        self.assertEqual(archivo.indexar_segmentos('logs', self.directorio), 1)
+        self.assertEqual(self.buscar(nivel='ERROR')['segmentos_omitidos'], 1)
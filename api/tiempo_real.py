@@ -0,0 +1,207 @@
+"""
+Entrega en tiempo real de notificaciones por Server-Sent Events.
+
+Las notificaciones nuevas se publican, al confirmarse la transacción, en el
+canal 'usuario:<id>' de un broker pub/sub. La vista SSE se suscribe a ese
+canal y, al reconectarse, reenvía desde la base de datos lo creado después
+del último id recibido (cabecera Last-Event-ID), así que no se pierden
+eventos entre conexiones.
+
+El broker es intercambiable con el setting NOTIFICACIONES_BROKER. BrokerMemoria
+solo reparte eventos dentro del proceso: sirve para un único worker ASGI y
+para pruebas; con varios workers hace falta un broker compartido (p. ej.
+Redis) que implemente la misma interfaz.
+"""
+import abc
+import asyncio
+import json
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Eventos pendientes por suscriptor antes de considerarlo desbordado
+CAPACIDAD_SUSCRIPCION = 256
+# Notificaciones reenviadas desde la base de datos al reconectar; si hay más,
+# se pide al cliente que recargue el listado por la API REST
+LIMITE_REENVIO = 500
+# Milisegundos que el navegador espera antes de reconectar
+ESPERA_RECONEXION = 3000
+
+
+class Suscripcion:
+    """
+    Cola de eventos de un suscriptor, ligada al event loop que la creó. Si
+    se llena, se marca como desbordada y se descartan eventos: el consumidor
+    debe recuperarlos de la base de datos.
+    """
+    def __init__(self, broker, canal, capacidad=CAPACIDAD_SUSCRIPCION):
+        self.broker = broker
+        self.canal = canal
+        self.desbordada = False
+        self._loop = asyncio.get_running_loop()
+        self._cola = asyncio.Queue(maxsize=capacidad)
+
+    def entregar(self, evento):
+        """Llamado desde cualquier hilo"""
+        self._loop.call_soon_threadsafe(self._poner, evento)
+
+    def _poner(self, evento):
+        try:
+            self._cola.put_nowait(evento)
+        except asyncio.QueueFull:
+            self.desbordada = True
+
+    async def siguiente(self, espera):
+        """Siguiente evento, o None si no llega ninguno en `espera` segundos"""
+        try:
+            return await asyncio.wait_for(self._cola.get(), espera)
+        except asyncio.TimeoutError:
+            return None
+
+    def cerrar(self):
+        self.broker.desuscribir(self)
+
+
+class Broker(abc.ABC):
+    """Interfaz de un broker pub/sub de eventos"""
+
+    @abc.abstractmethod
+    def publicar(self, canal, evento):
+        pass
+
+    @abc.abstractmethod
+    def suscribir(self, canal):
+        """Devuelve una Suscripcion; debe llamarse desde un event loop"""
+
+    @abc.abstractmethod
+    def desuscribir(self, suscripcion):
+        pass
+
+
+class BrokerMemoria(Broker):
+    """Broker en memoria del proceso, seguro entre hilos"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._suscripciones = {}
+
+    def publicar(self, canal, evento):
+        with self._lock:
+            suscripciones = list(self._suscripciones.get(canal, ()))
+        for suscripcion in suscripciones:
+            suscripcion.entregar(evento)
+
+    def suscribir(self, canal):
+        suscripcion = Suscripcion(self, canal)
+        with self._lock:
+            self._suscripciones.setdefault(canal, set()).add(suscripcion)
+        return suscripcion
+
+    def desuscribir(self, suscripcion):
+        with self._lock:
+            suscripciones = self._suscripciones.get(suscripcion.canal)
+            if suscripciones is not None:
+                suscripciones.discard(suscripcion)
+                if not suscripciones:
+                    del self._suscripciones[suscripcion.canal]
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def obtener_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                ruta = getattr(settings, 'NOTIFICACIONES_BROKER', 'api.tiempo_real.BrokerMemoria')
+                _broker = import_string(ruta)()
+    return _broker
+
+
+def canal_usuario(id_usuario):
+    return f'usuario:{id_usuario}'
+
+
+def evento_notificacion(notificacion):
+    from .serializers import NotificacionesUsuarioSerializer
+    return {
+        'id': notificacion.id_notificacion,
+        'tipo': 'notificacion',
+        'datos': NotificacionesUsuarioSerializer(notificacion).data,
+    }
+
+
+def publicar_notificacion(notificacion):
+    obtener_broker().publicar(canal_usuario(notificacion.id_usuario_id), evento_notificacion(notificacion))
+
+
+# =============================================
+# FLUJO SSE
+# =============================================
+
+def _formato_sse(evento):
+    return f"id: {evento['id']}\nevent: {evento['tipo']}\ndata: {json.dumps(evento['datos'])}\n\n"
+
+
+def _ultimo_id(id_usuario):
+    from .models import Notificacion
+    return Notificacion.objects.filter(id_usuario=id_usuario).order_by('-id_notificacion').values_list(
+        'id_notificacion', flat=True
+    ).first() or 0
+
+
+def _pendientes(id_usuario, ultimo_id):
+    from .models import Notificacion
+    notificaciones = Notificacion.objects.filter(
+        id_usuario=id_usuario, id_notificacion__gt=ultimo_id
+    ).order_by('id_notificacion')[:LIMITE_REENVIO + 1]
+    return [evento_notificacion(notificacion) for notificacion in notificaciones]
+
+
+async def flujo_notificaciones(id_usuario, ultimo_id=None, latido=None):
+    """
+    Generador asíncrono de eventos SSE para `id_usuario`.
+
+    Se suscribe al canal antes de leer la base de datos, así que lo que se
+    cree durante el reenvío llega también por el broker; los duplicados se
+    descartan por id. Con `ultimo_id` None solo se envían eventos nuevos.
+    Si hay más de LIMITE_REENVIO pendientes se emite 'reiniciar' para que el
+    cliente recargue el listado completo.
+    """
+    if latido is None:
+        latido = getattr(settings, 'NOTIFICACIONES_SSE_LATIDO', 15)
+    suscripcion = obtener_broker().suscribir(canal_usuario(id_usuario))
+    try:
+        yield f'retry: {ESPERA_RECONEXION}\n\n'
+        if ultimo_id is None:
+            ultimo_id = await sync_to_async(_ultimo_id)(id_usuario)
+        while True:
+            pendientes = await sync_to_async(_pendientes)(id_usuario, ultimo_id)
+            if len(pendientes) > LIMITE_REENVIO:
+                ultimo_id = await sync_to_async(_ultimo_id)(id_usuario)
+                yield f'id: {ultimo_id}\nevent: reiniciar\ndata: {{}}\n\n'
+                pendientes = []
+            reenviados = set()
+            for evento in pendientes:
+                reenviados.add(evento['id'])
+                ultimo_id = evento['id']
+                yield _formato_sse(evento)
+
+            while not suscripcion.desbordada:
+                evento = await suscripcion.siguiente(latido)
+                if evento is None:
+                    yield ': latido\n\n'
+                    continue
+                if evento['id'] in reenviados:
+                    continue
+                ultimo_id = max(ultimo_id, evento['id'])
+                yield _formato_sse(evento)
+
+            # La cola en memoria descartó eventos: se recuperan desde la base de datos
+            suscripcion.desbordada = False
+    finally:
+        suscripcion.cerrar()
@@ -10,6 +10,7 @@ urlpatterns = [
     # Rutas para Departamentos
     path('departamentos/', views.departamentos_list, name='departamentos-list'),
     path('departamentos/<int:id_departamento>/', views.departamento_detail, name='departamento-detail'),
+    path('departamentos/<int:id_departamento>/empleados/', views.departamento_empleados, name='departamento-empleados'),
     
     # Rutas para Roles
     path('roles/', views.roles_list, name='roles-list'),
@@ -19,15 +20,32 @@ urlpatterns = [
     path('empleados/', views.empleados_list, name='empleados-list'),
     path('empleados/<int:id_empleado>/', views.empleado_detail, name='empleado-detail'),
     path('empleados/buscar/', views.buscar_empleados, name='buscar-empleados'),
+    path('empleados/autocomplete/', views.autocompletar_empleados, name='autocompletar-empleados'),
     
     # Rutas para Usuarios
     path('usuarios/', views.usuarios_list, name='usuarios-list'),
+    path('auth/login/', views.iniciar_sesion, name='iniciar-sesion'),
     
     # Rutas para Notificaciones
+    path('notificaciones/', views.crear_notificacion, name='crear-notificacion'),
     path('notificaciones/usuario/<int:id_usuario>/', views.notificaciones_usuario, name='notificaciones-usuario'),
+    path('notificaciones/usuario/<int:id_usuario>/no-leidas/count/', views.notificaciones_no_leidas_count, name='notificaciones-no-leidas-count'),
+    path('notificaciones/usuario/<int:id_usuario>/stream/', views.notificaciones_stream, name='notificaciones-stream'),
+    path('notificaciones/usuario/<int:id_usuario>/marcar-leidas/', views.marcar_notificaciones_leidas, name='marcar-notificaciones-leidas'),
+    path('notificaciones/difusion/', views.difusion_notificaciones, name='difusion-notificaciones'),
+    path('notificaciones/difusion/<int:id_difusion>/', views.difusion_notificacion_detail, name='difusion-notificacion-detail'),
     path('notificaciones/<int:id_notificacion>/marcar-leida/', views.marcar_notificacion_leida, name='marcar-notificacion-leida'),
     
     # Rutas para Estadísticas y Reportes
     path('estadisticas/generales/', views.estadisticas_generales, name='estadisticas-generales'),
     path('estadisticas/departamentos/', views.estadisticas_departamentos, name='estadisticas-departamentos'),
+    
+    # Rutas para Logs y Actividades
+    path('logs/', views.logs_list, name='logs-list'),
+    path('logs/archivo/', views.buscar_logs_archivados, name='buscar-logs-archivados'),
+    path('actividades/', views.actividades_list, name='actividades-list'),
+    path('actividades/series/', views.actividades_series, name='actividades-series'),
+    
+    # Rutas para Exportación
+    path('export/<str:recurso>/', views.exportar_recurso, name='exportar-recurso'),
 ]
\ No newline at end of file
@@ -0,0 +1,118 @@
+"""
+Barrido de vencimientos: desactiva las sesiones expiradas y elimina las
+notificaciones con fecha_expiracion cumplida.
+
+Ambos trabajos avanzan en lotes pequeños tomados por índice
+(sesiones_activa_exp_idx y notif_expiracion_idx), cada uno en su propia
+transacción y con una pausa entre lotes. La desactivación de sesiones es un
+UPDATE masivo sin señales, así que ajusta sesiones_activas e invalida la
+caché de sesiones por su cuenta. Las notificaciones se borran con el ORM:
+las señales de borrado descuentan los contadores de no leídas y el borrado
+en cascada alcanza a las filas que las referencian.
+
+Se ejecuta con `manage.py barrer_vencimientos`, una vez (p. ej. desde cron)
+o en primer plano cada --intervalo segundos. Varios procesos pueden barrer
+a la vez: cada lote solo afecta filas que siguen vencidas.
+"""
+import logging
+import time
+
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from . import autenticacion, contadores
+from .models import Sesion, Notificacion
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE_VENCIMIENTOS = 1000
+# Segundos de pausa entre lotes
+PAUSA_ENTRE_LOTES = 0.05
+
+
+def _resultado(filas, inicio):
+    segundos = time.monotonic() - inicio
+    return {
+        'filas': filas,
+        'segundos': round(segundos, 3),
+        'filas_por_segundo': round(filas / segundos, 1) if segundos else None,
+    }
+
+
+def desactivar_sesiones(ahora=None, tamano_lote=TAMANO_LOTE_VENCIMIENTOS, pausa=PAUSA_ENTRE_LOTES):
+    """Marca activa=False en las sesiones expiradas; devuelve {'filas', 'segundos', 'filas_por_segundo'}"""
+    ahora = ahora or timezone.now()
+    inicio = time.monotonic()
+    vencidas = Sesion.objects.filter(activa=True, fecha_expiracion__lte=ahora).order_by('fecha_expiracion')
+    total = 0
+    while True:
+        lote = list(vencidas.values_list('id_sesion', 'token_sesion')[:tamano_lote])
+        if not lote:
+            break
+        with transaction.atomic():
+            desactivadas = Sesion.objects.filter(pk__in=[id_sesion for id_sesion, _ in lote], activa=True).update(
+                activa=False
+            )
+            contadores.aplicar_deltas({'sesiones_activas': -desactivadas})
+        for _, token_sesion in lote:
+            autenticacion.invalidar_sesion(token_sesion)
+        total += desactivadas
+        if len(lote) < tamano_lote:
+            break
+        if pausa:
+            time.sleep(pausa)
+    return _resultado(total, inicio)
+
+
+def purgar_notificaciones(ahora=None, tamano_lote=TAMANO_LOTE_VENCIMIENTOS, pausa=PAUSA_ENTRE_LOTES):
+    """Elimina las notificaciones expiradas; devuelve {'filas', 'segundos', 'filas_por_segundo'}"""
+    ahora = ahora or timezone.now()
+    inicio = time.monotonic()
+    vencidas = Notificacion.objects.filter(fecha_expiracion__lte=ahora).order_by('fecha_expiracion')
+    total = 0
+    while True:
+        with transaction.atomic():
+            # Bloqueadas para que `leida` no cambie antes de que las señales de
+            # borrado descuenten los contadores
+            ids = list(vencidas.select_for_update().values_list('id_notificacion', flat=True)[:tamano_lote])
+            if not ids:
+                break
+            _, borradas = Notificacion.objects.filter(pk__in=ids).delete()
+        total += borradas.get(Notificacion._meta.label, 0)
+        if len(ids) < tamano_lote:
+            break
+        if pausa:
+            time.sleep(pausa)
+    return _resultado(total, inicio)
+
+
+def barrer(tamano_lote=TAMANO_LOTE_VENCIMIENTOS, pausa=PAUSA_ENTRE_LOTES):
+    """Ejecuta ambos trabajos; devuelve {'sesiones': {...}, 'notificaciones': {...}}"""
+    ahora = timezone.now()
+    return {
+        'sesiones': desactivar_sesiones(ahora, tamano_lote, pausa),
+        'notificaciones': purgar_notificaciones(ahora, tamano_lote, pausa),
+    }
+
+
+# =============================================
+# BARRIDO PERIÓDICO
+# =============================================
+
+def barrer_periodicamente(intervalo, tamano_lote=TAMANO_LOTE_VENCIMIENTOS, pausa=PAUSA_ENTRE_LOTES):
+    """Barre cada `intervalo` segundos en el hilo actual, sin terminar"""
+    while True:
+        try:
+            resultado = barrer(tamano_lote, pausa)
+        except Exception:
+            logger.exception('Falló el barrido de vencimientos')
+        else:
+            for trabajo, datos in resultado.items():
+                if datos['filas']:
+                    logger.info(
+                        'Barrido de %s: %s filas (%s filas/s)', trabajo, datos['filas'], datos['filas_por_segundo'],
+                        extra={'modulo': 'vencimientos', 'datos_contexto': datos},
+                    )
+        finally:
+            close_old_connections()
+        time.sleep(intervalo)
@@ -1,15 +1,21 @@
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
-from django.db.models import Count, Q
+from django.db.models import Q
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from django.urls import reverse
+from rest_framework.utils.urls import replace_query_param
+from django.conf import settings
 from django.utils import timezone
 from datetime import datetime, timedelta
 import json
 
 from .models import (
     Departamento, Rol, Empleado, Usuario, Sesion, 
-    PerfilEmpleado, Notificacion, ActividadUsuario, LogSistema
+    PerfilEmpleado, Notificacion, ActividadUsuario, LogSistema, DifusionNotificacion
 )
 from .serializers import (
     DepartamentoSerializer, RolSerializer, EmpleadoSerializer, EmpleadoCreateSerializer,
@@ -17,8 +23,24 @@ from .serializers import (
     NotificacionSerializer, ActividadUsuarioSerializer, LogSistemaSerializer,
     EmpleadoResumenSerializer, DepartamentoConEmpleadosSerializer, 
     UsuarioConPerfilSerializer, NotificacionesUsuarioSerializer,
-    EstadisticasDepartamentoSerializer, EstadisticasGeneralesSerializer
+    EstadisticasDepartamentoSerializer, EstadisticasGeneralesSerializer, DifusionNotificacionSerializer,
+    InicioSesionSerializer, CamposInvalidos, leer_campos_solicitados
 )
+from .paginacion import PaginadorKeyset, CursorInvalido
+from .filtros import (
+    FiltroInvalido, filtrar_empleados, filtrar_usuarios, filtrar_actividades, filtrar_logs,
+    parsear_entero, parsear_fecha
+)
+from .exportacion import Exportacion, RECURSOS as RECURSOS_EXPORTACION
+from .archivo import CursorArchivoInvalido, buscar as buscar_en_archivo
+from . import contadores, busqueda, autocompletado, tiempo_real, difusion, notificaciones, resumenes
+from .inicio_sesion import InicioSesionRechazado, autenticar, crear_sesion
+from .registro import ip_cliente
+from .condicional import (
+    get_condicional, validadores_empleados, validadores_empleado, validadores_usuarios,
+    validadores_departamentos, validadores_departamento, validadores_roles
+)
+from .permisos import permiso_requerido, requiere_permiso
 
 # =============================================
 # VISTAS BÁSICAS DE PRUEBA
@@ -64,6 +86,7 @@ def api_status(request):
 # =============================================
 
 @api_view(['GET', 'POST'])
+@get_condicional(validadores_departamentos)
 def departamentos_list(request):
     """
     GET: Lista todos los departamentos
@@ -93,14 +116,20 @@ def departamentos_list(request):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET', 'PUT', 'DELETE'])
+@get_condicional(validadores_departamento)
 def departamento_detail(request, id_departamento):
     """
-    GET: Obtiene un departamento específico
+    GET: Obtiene un departamento específico con los primeros empleados
+         (el listado completo está en /departamentos/<id>/empleados/)
     PUT: Actualiza un departamento
     DELETE: Elimina un departamento
     """
+    departamentos = Departamento.objects.all()
+    if request.method == 'GET':
+        departamentos = DepartamentoConEmpleadosSerializer.con_empleados(departamentos)
+    
     try:
-        departamento = Departamento.objects.get(id_departamento=id_departamento)
+        departamento = departamentos.get(id_departamento=id_departamento)
     except Departamento.DoesNotExist:
         return Response({
             'success': False,
@@ -109,9 +138,17 @@ def departamento_detail(request, id_departamento):
     
     if request.method == 'GET':
         serializer = DepartamentoConEmpleadosSerializer(departamento)
+        empleados_siguiente = None
+        if serializer.hay_mas_empleados(departamento):
+            ultimo = departamento.empleados_muestra[DepartamentoConEmpleadosSerializer.LIMITE_EMPLEADOS - 1]
+            empleados_siguiente = replace_query_param(
+                request.build_absolute_uri(reverse('departamento-empleados', args=[id_departamento])),
+                'cursor', PaginadorKeyset(orden=('id_empleado',)).codificar_cursor([ultimo.id_empleado])
+            )
         return Response({
             'success': True,
-            'data': serializer.data
+            'data': serializer.data,
+            'empleados_siguiente': empleados_siguiente
         })
     
     elif request.method == 'PUT':
@@ -135,11 +172,40 @@ def departamento_detail(request, id_departamento):
             'message': 'Departamento eliminado exitosamente'
         }, status=status.HTTP_204_NO_CONTENT)
 
+@api_view(['GET'])
+@get_condicional(validadores_departamento)
+def departamento_empleados(request, id_departamento):
+    """
+    GET: Lista los empleados de un departamento, paginados por cursor
+         (?limit=, ?cursor=, ?total=) y con filtro opcional ?estado=
+    """
+    if not Departamento.objects.filter(id_departamento=id_departamento).exists():
+        return Response({
+            'success': False,
+            'message': 'Departamento no encontrado'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    empleados = Empleado.objects.filter(id_departamento=id_departamento).select_related('id_departamento', 'id_rol')
+    
+    paginador = PaginadorKeyset(orden=('id_empleado',))
+    try:
+        empleados = filtrar_empleados(empleados, {'estado': request.GET.get('estado')})
+        pagina = paginador.paginar_queryset(empleados, request)
+    except (CursorInvalido, FiltroInvalido) as e:
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = EmpleadoResumenSerializer(pagina, many=True)
+    return Response(paginador.respuesta(serializer.data))
+
 # =============================================
 # VISTAS PARA ROLES
 # =============================================
 
 @api_view(['GET', 'POST'])
+@get_condicional(validadores_roles)
 def roles_list(request):
     """
     GET: Lista todos los roles
@@ -169,6 +235,7 @@ def roles_list(request):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET'])
+@get_condicional(validadores_roles)
 def roles_por_departamento(request, id_departamento):
     """
     GET: Lista roles de un departamento específico
@@ -186,29 +253,30 @@ def roles_por_departamento(request, id_departamento):
 # =============================================
 
 @api_view(['GET', 'POST'])
+@get_condicional(validadores_empleados)
 def empleados_list(request):
     """
-    GET: Lista todos los empleados con filtros opcionales
+    GET: Lista los empleados con filtros opcionales, paginados por cursor
+         (?limit=, ?cursor=, ?total=exacto|estimado). Acepta ?fields= y
+         ?expand=departamento,rol
     POST: Crea un nuevo empleado
     """
     if request.method == 'GET':
-        empleados = Empleado.objects.select_related('id_departamento', 'id_rol').all()
-        
-        # Filtros opcionales
-        estado = request.GET.get('estado')
-        departamento = request.GET.get('departamento')
-        
-        if estado:
-            empleados = empleados.filter(estado=estado)
-        if departamento:
-            empleados = empleados.filter(id_departamento=departamento)
+        paginador = PaginadorKeyset(orden=('id_empleado',))
+        try:
+            campos, expandir = leer_campos_solicitados(request.GET, EmpleadoSerializer)
+            empleados = EmpleadoSerializer.optimizar_queryset(Empleado.objects.all(), campos, expandir)
+            # Filtros opcionales: ?estado= y ?departamento=
+            empleados = filtrar_empleados(empleados, request.GET)
+            pagina = paginador.paginar_queryset(empleados, request)
+        except (CamposInvalidos, CursorInvalido, FiltroInvalido) as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        serializer = EmpleadoSerializer(empleados, many=True)
-        return Response({
-            'success': True,
-            'data': serializer.data,
-            'count': len(serializer.data)
-        })
+        serializer = EmpleadoSerializer(pagina, many=True, campos=campos, expandir=expandir)
+        return Response(paginador.respuesta(serializer.data))
     
     elif request.method == 'POST':
         serializer = EmpleadoCreateSerializer(data=request.data)
@@ -225,14 +293,26 @@ def empleados_list(request):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET', 'PUT', 'DELETE'])
+@get_condicional(validadores_empleado)
 def empleado_detail(request, id_empleado):
     """
-    GET: Obtiene un empleado específico
+    GET: Obtiene un empleado específico (acepta ?fields= y ?expand=)
     PUT: Actualiza un empleado
     DELETE: Elimina un empleado (cambiar estado a inactivo)
     """
+    campos, expandir = (None, None)
+    if request.method == 'GET':
+        try:
+            campos, expandir = leer_campos_solicitados(request.GET, EmpleadoSerializer)
+        except CamposInvalidos as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+    
     try:
-        empleado = Empleado.objects.select_related('id_departamento', 'id_rol').get(id_empleado=id_empleado)
+        empleados = EmpleadoSerializer.optimizar_queryset(Empleado.objects.all(), campos, expandir)
+        empleado = empleados.get(id_empleado=id_empleado)
     except Empleado.DoesNotExist:
         return Response({
             'success': False,
@@ -240,7 +320,7 @@ def empleado_detail(request, id_empleado):
         }, status=status.HTTP_404_NOT_FOUND)
     
     if request.method == 'GET':
-        serializer = EmpleadoSerializer(empleado)
+        serializer = EmpleadoSerializer(empleado, campos=campos, expandir=expandir)
         return Response({
             'success': True,
             'data': serializer.data
@@ -274,19 +354,30 @@ def empleado_detail(request, id_empleado):
 # =============================================
 
 @api_view(['GET', 'POST'])
+@get_condicional(validadores_usuarios)
 def usuarios_list(request):
     """
-    GET: Lista todos los usuarios
+    GET: Lista los usuarios, paginados por cursor
+         (?limit=, ?cursor=, ?total=exacto|estimado). Acepta ?fields=
+         (p. ej. username,empleado.email) y ?expand=
     POST: Crea un nuevo usuario
     """
     if request.method == 'GET':
-        usuarios = Usuario.objects.select_related('id_empleado').all()
-        serializer = UsuarioConPerfilSerializer(usuarios, many=True)
-        return Response({
-            'success': True,
-            'data': serializer.data,
-            'count': len(serializer.data)
-        })
+        paginador = PaginadorKeyset(orden=('id_usuario',))
+        try:
+            campos, expandir = leer_campos_solicitados(request.GET, UsuarioConPerfilSerializer)
+            usuarios = UsuarioConPerfilSerializer.optimizar_queryset(Usuario.objects.all(), campos, expandir)
+            # Filtro opcional: ?estado=
+            usuarios = filtrar_usuarios(usuarios, request.GET)
+            pagina = paginador.paginar_queryset(usuarios, request)
+        except (CamposInvalidos, CursorInvalido, FiltroInvalido) as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        serializer = UsuarioConPerfilSerializer(pagina, many=True, campos=campos, expandir=expandir)
+        return Response(paginador.respuesta(serializer.data))
     
     elif request.method == 'POST':
         serializer = UsuarioSerializer(data=request.data)
@@ -302,6 +393,53 @@ def usuarios_list(request):
             'errors': serializer.errors
         }, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['POST'])
+@authentication_classes([])
+def iniciar_sesion(request):
+    """
+    POST: Inicia sesión con {"username", "password"} y devuelve el token
+          para 'Authorization: Bearer <token>'. Responde 429 (con
+          Retry-After) si la IP o el usuario superan el límite de intentos
+          y 403 si el usuario está bloqueado o inactivo.
+    """
+    serializer = InicioSesionSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({
+            'success': False,
+            'errors': serializer.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    datos = serializer.validated_data
+    ip = ip_cliente(request)
+    try:
+        usuario = autenticar(datos['username'], datos['password'], ip)
+    except InicioSesionRechazado as e:
+        respuesta = Response({
+            'success': False,
+            'message': e.mensaje
+        }, status=e.estado)
+        if e.reintentar:
+            respuesta['Retry-After'] = str(int(e.reintentar) + 1)
+        return respuesta
+    
+    token, sesion = crear_sesion(
+        usuario, ip=ip,
+        user_agent=request.META.get('HTTP_USER_AGENT'),
+        dispositivo=datos.get('dispositivo') or None,
+    )
+    return Response({
+        'success': True,
+        'message': 'Sesión iniciada',
+        'data': {
+            'token': token,
+            'tipo': 'Bearer',
+            'fecha_expiracion': sesion.fecha_expiracion,
+            'id_sesion': sesion.id_sesion,
+            'id_usuario': usuario.id_usuario,
+            'username': usuario.username,
+        }
+    }, status=status.HTTP_200_OK)
+
 # =============================================
 # VISTAS PARA NOTIFICACIONES
 # =============================================
@@ -309,9 +447,10 @@ def usuarios_list(request):
 @api_view(['GET'])
 def notificaciones_usuario(request, id_usuario):
     """
-    GET: Lista notificaciones de un usuario específico
+    GET: Lista notificaciones de un usuario específico, de la más reciente a
+         la más antigua, paginadas por cursor (?limit=, ?cursor=, ?total=)
     """
-    notificaciones = Notificacion.objects.filter(id_usuario=id_usuario).order_by('-fecha_creacion')
+    notificaciones = Notificacion.objects.filter(id_usuario=id_usuario)
     
     # Filtros opcionales
     leida = request.GET.get('leida')
@@ -322,12 +461,58 @@ def notificaciones_usuario(request, id_usuario):
     if tipo:
         notificaciones = notificaciones.filter(tipo=tipo)
     
-    serializer = NotificacionesUsuarioSerializer(notificaciones, many=True)
+    paginador = PaginadorKeyset(orden=('-fecha_creacion', '-id_notificacion'))
+    try:
+        pagina = paginador.paginar_queryset(notificaciones, request)
+    except CursorInvalido as e:
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = NotificacionesUsuarioSerializer(pagina, many=True)
+    return Response(paginador.respuesta(serializer.data))
+
+@api_view(['POST'])
+def crear_notificacion(request):
+    """
+    POST: Crea una notificación para un usuario. Si tiene una igual sin leer
+          dentro de la ventana de deduplicación, se incrementan sus
+          ocurrencias; si el usuario usa el modo resumen y es de tipo
+          'info', queda pendiente para el próximo resumen. Acepta
+          "clave_dedup" para agrupar notificaciones con títulos distintos.
+    """
+    serializer = NotificacionSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({
+            'success': False,
+            'errors': serializer.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    datos = serializer.validated_data
+    resultado, objeto = notificaciones.crear_notificacion(
+        datos['id_usuario'].pk, datos['titulo'], datos['mensaje'],
+        tipo=datos.get('tipo', 'info'),
+        categoria=datos.get('categoria', 'sistema'),
+        url_accion=datos.get('url_accion'),
+        fecha_expiracion=datos.get('fecha_expiracion'),
+        clave_dedup=datos.get('clave_dedup'),
+    )
+    
+    if resultado == 'diferida':
+        return Response({
+            'success': True,
+            'message': 'Notificación pendiente para el próximo resumen',
+            'resultado': resultado,
+            'data': {'id_pendiente': objeto.id_pendiente}
+        }, status=status.HTTP_202_ACCEPTED)
+    
     return Response({
         'success': True,
-        'data': serializer.data,
-        'count': len(serializer.data)
-    })
+        'message': 'Notificación creada' if resultado == 'creada' else 'Notificación agrupada con una existente',
+        'resultado': resultado,
+        'data': NotificacionesUsuarioSerializer(objeto).data
+    }, status=status.HTTP_201_CREATED if resultado == 'creada' else status.HTTP_200_OK)
 
 @api_view(['PUT'])
 def marcar_notificacion_leida(request, id_notificacion):
@@ -338,7 +523,7 @@ def marcar_notificacion_leida(request, id_notificacion):
         notificacion = Notificacion.objects.get(id_notificacion=id_notificacion)
         notificacion.leida = True
         notificacion.fecha_lectura = timezone.now()
-        notificacion.save()
+        notificacion.save(update_fields=['leida', 'fecha_lectura'])
         
         return Response({
             'success': True,
@@ -350,38 +535,161 @@ def marcar_notificacion_leida(request, id_notificacion):
             'message': 'Notificación no encontrada'
         }, status=status.HTTP_404_NOT_FOUND)
 
+@api_view(['GET'])
+def notificaciones_no_leidas_count(request, id_usuario):
+    """
+    GET: Número de notificaciones sin leer del usuario, leído del contador
+         mantenido (una consulta por clave primaria)
+    """
+    return Response({
+        'success': True,
+        'data': {
+            'id_usuario': id_usuario,
+            'no_leidas': contadores.obtener_no_leidas(id_usuario)
+        }
+    })
+
+@require_GET
+async def notificaciones_stream(request, id_usuario):
+    """
+    GET: Flujo Server-Sent Events con las notificaciones nuevas del usuario.
+         Al reconectar, el navegador envía Last-Event-ID y se reenvían las
+         creadas después de ese id (también se acepta ?ultimo_id=). Solo
+         con la aplicación ASGI (mybackend.asgi): bajo WSGI el flujo
+         infinito ocuparía un worker para siempre, así que responde 501.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({
+            'success': False,
+            'message': 'El flujo de notificaciones requiere el servidor ASGI (mybackend.asgi)'
+        }, status=status.HTTP_501_NOT_IMPLEMENTED)
+    
+    ultimo_id = request.headers.get('Last-Event-ID') or request.GET.get('ultimo_id')
+    if ultimo_id is not None:
+        try:
+            ultimo_id = parsear_entero(ultimo_id, 'Last-Event-ID')
+        except FiltroInvalido as e:
+            return JsonResponse({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+    
+    response = StreamingHttpResponse(
+        tiempo_real.flujo_notificaciones(id_usuario, ultimo_id),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@api_view(['POST'])
+def marcar_notificaciones_leidas(request, id_usuario):
+    """
+    POST: Marca como leídas varias notificaciones del usuario con un solo
+          UPDATE. Recibe {"ids": [...]} (máximo 1000) o {"antes_de": fecha}
+          para todas las creadas hasta esa fecha.
+    """
+    ids = request.data.get('ids')
+    antes_de = request.data.get('antes_de')
+    
+    if ids is None and not antes_de:
+        return Response({
+            'success': False,
+            'message': 'Se requiere "ids" o "antes_de"'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        if ids is not None:
+            if not isinstance(ids, list) or len(ids) > 1000:
+                raise FiltroInvalido('"ids" debe ser una lista de hasta 1000 identificadores')
+            ids = [parsear_entero(valor, 'ids') for valor in ids]
+        if antes_de:
+            antes_de = parsear_fecha(str(antes_de), 'antes_de')
+    except FiltroInvalido as e:
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    marcadas = contadores.marcar_leidas(id_usuario, ids=ids, antes_de=antes_de or None)
+    return Response({
+        'success': True,
+        'message': f'{marcadas} notificaciones marcadas como leídas',
+        'data': {
+            'marcadas': marcadas,
+            'no_leidas': contadores.obtener_no_leidas(id_usuario)
+        }
+    })
+
+@api_view(['POST'])
+def difusion_notificaciones(request):
+    """
+    POST: Envía una notificación a todos los usuarios activos de un
+          departamento y/o rol. Las notificaciones se crean en segundo plano;
+          el avance se consulta en la URL devuelta.
+    """
+    serializer = DifusionNotificacionSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({
+            'success': False,
+            'errors': serializer.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    nueva = serializer.save()
+    difusion.encolar(nueva)
+    return Response({
+        'success': True,
+        'message': 'Difusión programada',
+        'data': serializer.data,
+        'url': request.build_absolute_uri(reverse('difusion-notificacion-detail', args=[nueva.pk]))
+    }, status=status.HTTP_202_ACCEPTED)
+
+@api_view(['GET'])
+def difusion_notificacion_detail(request, id_difusion):
+    """
+    GET: Estado y avance de una difusión de notificaciones
+    """
+    try:
+        encontrada = DifusionNotificacion.objects.get(id_difusion=id_difusion)
+    except DifusionNotificacion.DoesNotExist:
+        return Response({
+            'success': False,
+            'message': 'Difusión no encontrada'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({
+        'success': True,
+        'data': DifusionNotificacionSerializer(encontrada).data
+    })
+
 # =============================================
 # VISTAS PARA ESTADÍSTICAS Y REPORTES
 # =============================================
 
 @api_view(['GET'])
+@requiere_permiso('reportes')
 def estadisticas_generales(request):
     """
-    GET: Obtiene estadísticas generales del sistema
+    GET: Obtiene estadísticas generales del sistema desde los contadores
+         mantenidos (una lectura por clave primaria). Con ?fuente=vivo se
+         calculan directamente sobre las tablas. Requiere el permiso 'reportes'.
     """
     try:
-        total_empleados = Empleado.objects.count()
-        empleados_activos = Empleado.objects.filter(estado='activo').count()
-        total_departamentos = Departamento.objects.filter(estado='activo').count()
-        total_roles = Rol.objects.filter(estado='activo').count()
-        usuarios_activos = Usuario.objects.filter(estado='activo').count()
-        sesiones_activas = Sesion.objects.filter(activa=True).count()
-        notificaciones_no_leidas = Notificacion.objects.filter(leida=False).count()
-        
-        data = {
-            'total_empleados': total_empleados,
-            'empleados_activos': empleados_activos,
-            'total_departamentos': total_departamentos,
-            'total_roles': total_roles,
-            'usuarios_activos': usuarios_activos,
-            'sesiones_activas': sesiones_activas,
-            'notificaciones_no_leidas': notificaciones_no_leidas
-        }
+        if request.GET.get('fuente') == 'vivo':
+            data = contadores.calcular_en_vivo()
+            fuente = 'vivo'
+            actualizado = timezone.now()
+        else:
+            data = contadores.obtener_contadores()
+            fuente = 'contadores'
+            actualizado = data['fecha_actualizacion']
         
         serializer = EstadisticasGeneralesSerializer(data)
         return Response({
             'success': True,
             'data': serializer.data,
+            'fuente': fuente,
+            'actualizado': actualizado,
             'timestamp': timezone.now()
         })
     except Exception as e:
@@ -391,26 +699,34 @@ def estadisticas_generales(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['GET'])
+@requiere_permiso('reportes')
 def estadisticas_departamentos(request):
     """
-    GET: Obtiene estadísticas por departamento
+    GET: Obtiene estadísticas por departamento desde la tabla materializada
+         departamento_estadisticas. Con ?fuente=vivo se calculan sobre la
+         tabla de empleados. Requiere el permiso 'reportes'.
     """
     try:
-        departamentos = Departamento.objects.annotate(
-            total_empleados=Count('empleado'),
-            empleados_activos=Count('empleado', filter=Q(empleado__estado='activo')),
-            empleados_inactivos=Count('empleado', filter=Q(empleado__estado='inactivo')),
-            empleados_suspendidos=Count('empleado', filter=Q(empleado__estado='suspendido'))
-        ).values(
-            'id_departamento', 'nombre', 'total_empleados', 
-            'empleados_activos', 'empleados_inactivos', 'empleados_suspendidos'
-        )
+        if request.GET.get('fuente') == 'vivo':
+            departamentos = list(contadores.estadisticas_departamentos_en_vivo())
+            fuente = 'vivo'
+            actualizado = reconstruido = timezone.now()
+        else:
+            departamentos = list(contadores.estadisticas_departamentos_materializadas())
+            fuente = 'materializada'
+            actualizaciones = [d['fecha_actualizacion'] for d in departamentos if d['fecha_actualizacion']]
+            reconstrucciones = [d['fecha_reconstruccion'] for d in departamentos if d['fecha_reconstruccion']]
+            actualizado = max(actualizaciones) if actualizaciones else None
+            reconstruido = min(reconstrucciones) if reconstrucciones else None
         
         serializer = EstadisticasDepartamentoSerializer(departamentos, many=True)
         return Response({
             'success': True,
             'data': serializer.data,
-            'count': len(serializer.data)
+            'count': len(serializer.data),
+            'fuente': fuente,
+            'actualizado': actualizado,
+            'reconstruido': reconstruido
         })
     except Exception as e:
         return Response({
@@ -425,7 +741,11 @@ def estadisticas_departamentos(request):
 @api_view(['GET'])
 def buscar_empleados(request):
     """
-    GET: Busca empleados por nombre, email o documento
+    GET: Busca empleados por nombre, email o documento, ordenados por
+         relevancia usando el índice de búsqueda. Un documento o email exacto
+         devuelve directamente ese empleado.
+         ?limit= (máx. 100) y ?offset= para paginar; ?modo=contiene usa la
+         búsqueda anterior por subcadena (sin índice).
     """
     query = request.GET.get('q', '')
     if not query:
@@ -434,21 +754,241 @@ def buscar_empleados(request):
             'message': 'Parámetro de búsqueda requerido (q)'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    empleados = Empleado.objects.filter(
-        Q(nombres__icontains=query) |
-        Q(apellidos__icontains=query) |
-        Q(email__icontains=query) |
-        Q(numero_documento__icontains=query)
-    ).select_related('id_departamento', 'id_rol')[:20]  # Limitar a 20 resultados
+    try:
+        limite = min(max(int(request.GET.get('limit', 20)), 1), 100)
+        desplazamiento = max(int(request.GET.get('offset', 0)), 0)
+    except ValueError:
+        return Response({
+            'success': False,
+            'message': 'Los parámetros limit y offset deben ser números enteros'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    modo = 'indice'
+    exacto = busqueda.coincidencia_exacta(query) if desplazamiento == 0 else None
+    if exacto is not None:
+        empleados = [exacto]
+        modo = 'exacto'
+    else:
+        empleados = None
+        if request.GET.get('modo') != 'contiene':
+            empleados = busqueda.buscar(query, limite + 1, desplazamiento)
+        if empleados is None:
+            modo = 'contiene'
+            empleados = list(Empleado.objects.filter(
+                Q(nombres__icontains=query) |
+                Q(apellidos__icontains=query) |
+                Q(email__icontains=query) |
+                Q(numero_documento__icontains=query)
+            ).select_related('id_departamento', 'id_rol').order_by('id_empleado')[desplazamiento:desplazamiento + limite + 1])
+    
+    siguiente = None
+    if len(empleados) > limite:
+        empleados = empleados[:limite]
+        siguiente = replace_query_param(request.build_absolute_uri(), 'offset', desplazamiento + limite)
     
     serializer = EmpleadoResumenSerializer(empleados, many=True)
     return Response({
         'success': True,
         'data': serializer.data,
         'count': len(serializer.data),
+        'query': query,
+        'modo': modo,
+        'next': siguiente
+    })
+
+@api_view(['GET'])
+def autocompletar_empleados(request):
+    """
+    GET: Sugerencias de empleados para el selector de personas, servidas
+         desde un índice en memoria (sin consultas a la base de datos).
+         Solo sugiere empleados activos.
+         ?q= texto parcial, ?limit= máximo de resultados (por defecto 10)
+    """
+    query = request.GET.get('q', '')
+    try:
+        limite = min(max(int(request.GET.get('limit', 10)), 1), 50)
+    except ValueError:
+        limite = 10
+    
+    resultados = autocompletado.indice.buscar(query, limite)
+    return Response({
+        'success': True,
+        'data': resultados,
+        'count': len(resultados),
         'query': query
     })
 
+# =============================================
+# VISTAS PARA EXPORTACIÓN
+# =============================================
+
+@api_view(['GET'])
+@requiere_permiso('reportes.exportar')
+def exportar_recurso(request, recurso):
+    """
+    GET: Exporta en streaming empleados, usuarios, actividades o logs.
+         ?formato=ndjson (por defecto) o ?formato=csv; acepta los mismos
+         filtros que el listado correspondiente. Requiere el permiso
+         'reportes.exportar'.
+    """
+    if recurso not in RECURSOS_EXPORTACION:
+        return Response({
+            'success': False,
+            'message': f'Recurso no exportable: {recurso}'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    formato = request.GET.get('formato', 'ndjson')
+    if formato not in ('ndjson', 'csv'):
+        return Response({
+            'success': False,
+            'message': 'Formato no soportado (ndjson o csv)'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        exportacion = Exportacion(recurso, request.GET)
+    except FiltroInvalido as e:
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if formato == 'csv':
+        response = StreamingHttpResponse(exportacion.csv(), content_type='text/csv; charset=utf-8')
+    else:
+        response = StreamingHttpResponse(exportacion.ndjson(), content_type='application/x-ndjson')
+    response['Content-Disposition'] = f'attachment; filename="{recurso}.{formato}"'
+    return response
+
+def _listado_registros(request, queryset, filtrar, orden, serializer_class):
+    """Listado paginado por cursor, sin total exacto, para tablas de registro"""
+    paginador = PaginadorKeyset(orden=orden, permitir_total_exacto=False)
+    try:
+        queryset = filtrar(queryset, request.GET)
+        pagina = paginador.paginar_queryset(queryset, request)
+    except (CursorInvalido, FiltroInvalido) as e:
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = serializer_class(pagina, many=True)
+    return Response(paginador.respuesta(serializer.data))
+
+@api_view(['GET'])
+@permission_classes([permiso_requerido('logs')])
+def logs_list(request):
+    """
+    GET: Lista los logs del sistema, del más reciente al más antiguo,
+         paginados por cursor (?limit=, ?cursor=). Filtros: ?nivel=,
+         ?modulo=, ?usuario=, ?desde=, ?hasta=. Sin total exacto: ?total=
+         devuelve una estimación. Requiere el permiso 'logs'.
+    """
+    return _listado_registros(
+        request, LogSistema.objects.select_related('id_usuario'), filtrar_logs,
+        ('-fecha_log', '-id_log'), LogSistemaSerializer
+    )
+
+@api_view(['GET'])
+def actividades_list(request):
+    """
+    GET: Lista las actividades de usuarios, de la más reciente a la más
+         antigua, paginadas por cursor (?limit=, ?cursor=). Filtros:
+         ?usuario=, ?modulo=, ?accion=, ?desde=, ?hasta=. Sin total exacto:
+         ?total= devuelve una estimación.
+    """
+    return _listado_registros(
+        request, ActividadUsuario.objects.select_related('id_usuario'), filtrar_actividades,
+        ('-fecha_actividad', '-id_actividad'), ActividadUsuarioSerializer
+    )
+
+@api_view(['GET'])
+@requiere_permiso('reportes')
+def actividades_series(request):
+    """
+    GET: Serie temporal de actividades desde el resumen horario.
+         ?granularidad=hora|dia|semana (por defecto hora), ?desde= y ?hasta=
+         (por defecto los últimos 7 días, máximo RESUMEN_ACTIVIDAD_DIAS),
+         filtros ?usuario=, ?modulo=, ?accion= y ?agrupar=modulo|accion|usuario
+         para una serie por valor. Requiere el permiso 'reportes'.
+    """
+    params = request.GET
+    granularidad = params.get('granularidad', 'hora')
+    agrupar = params.get('agrupar') or None
+    if granularidad not in resumenes.GRANULARIDADES or (agrupar and agrupar not in resumenes.AGRUPACIONES):
+        return Response({
+            'success': False,
+            'message': 'Parámetros inválidos: granularidad=hora|dia|semana, agrupar=modulo|accion|usuario'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        ahora = timezone.now()
+        hasta = parsear_fecha(params['hasta'], 'hasta', fin_del_dia=True) if params.get('hasta') else ahora
+        desde = parsear_fecha(params['desde'], 'desde') if params.get('desde') else hasta - timedelta(days=7)
+        id_usuario = parsear_entero(params['usuario'], 'usuario') if params.get('usuario') else None
+    except FiltroInvalido as e:
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    dias = getattr(settings, 'RESUMEN_ACTIVIDAD_DIAS', 90)
+    desde = max(desde, ahora - timedelta(days=dias))
+    
+    datos = resumenes.serie(
+        granularidad, desde=desde, hasta=hasta, id_usuario=id_usuario,
+        modulo=params.get('modulo'), accion=params.get('accion'), agrupar=agrupar
+    )
+    _, actualizado = resumenes.estado_marca()
+    return Response({
+        'success': True,
+        'data': datos,
+        'count': len(datos),
+        'granularidad': granularidad,
+        'desde': desde,
+        'hasta': hasta,
+        'actualizado': actualizado
+    })
+
+@api_view(['GET'])
+@permission_classes([permiso_requerido('logs')])
+def buscar_logs_archivados(request):
+    """
+    GET: Busca en los logs archivados fuera de log_sistema.
+         Filtros: ?nivel=, ?modulo=, ?usuario=, ?desde=, ?hasta=; pagina con
+         ?limit= (máximo 1000) y ?cursor=. Informa cuántos segmentos se
+         leyeron y cuántos se descartaron por su índice. Requiere el
+         permiso 'logs'.
+    """
+    params = request.GET
+    try:
+        id_usuario = parsear_entero(params['usuario'], 'usuario') if params.get('usuario') else None
+        desde = parsear_fecha(params['desde'], 'desde') if params.get('desde') else None
+        hasta = parsear_fecha(params['hasta'], 'hasta', fin_del_dia=True) if params.get('hasta') else None
+        limite = min(max(parsear_entero(params.get('limit', 100), 'limit'), 1), 1000)
+        resultado = buscar_en_archivo(
+            'logs', nivel=params.get('nivel'), modulo=params.get('modulo'), id_usuario=id_usuario,
+            desde=desde, hasta=hasta, limite=limite, cursor=params.get('cursor')
+        )
+    except (FiltroInvalido, CursorArchivoInvalido) as e:
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    siguiente = None
+    if resultado['siguiente']:
+        siguiente = replace_query_param(request.build_absolute_uri(), 'cursor', resultado['siguiente'])
+    return Response({
+        'success': True,
+        'data': resultado['resultados'],
+        'count': len(resultado['resultados']),
+        'next': siguiente,
+        'segmentos': {
+            'leidos': resultado['segmentos_leidos'],
+            'omitidos': resultado['segmentos_omitidos']
+        }
+    })
+
 # =============================================
 # VISTA PARA CONFIGURACIÓN DE VM
 # =============================================
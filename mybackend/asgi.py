@@ -3,6 +3,10 @@ ASGI config for mybackend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The notification stream (api/notificaciones/usuario/<id>/stream/) keeps a
+connection open per client, so it must be served through this application
+(e.g. ``uvicorn mybackend.asgi:application``) rather than WSGI.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -45,6 +45,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.SesionUsuarioMiddleware',
+    'api.middleware.ActividadUsuarioMiddleware',
 ]
 
 ROOT_URLCONF = 'mybackend.urls'
@@ -84,6 +86,11 @@ DATABASES = {
 
 # REST Framework Configuration
 REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'api.autenticacion.AutenticacionTokenSesion',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',  # For development
     ],
@@ -101,6 +108,107 @@ CORS_ALLOWED_ORIGINS = [
     # "http://your-frontend-vm-ip:8080",
 ]
 
+# Autocompletado de empleados: segundos entre recargas completas del índice
+# en memoria de cada proceso
+AUTOCOMPLETADO_TTL = 300
+
+# Notificaciones en tiempo real (SSE): broker pub/sub y segundos entre latidos.
+# BrokerMemoria solo sirve con un único worker ASGI
+NOTIFICACIONES_BROKER = 'api.tiempo_real.BrokerMemoria'
+NOTIFICACIONES_SSE_LATIDO = 15
+
+# Segundos durante los que una notificación repetida (misma clave, sin leer)
+# incrementa las ocurrencias de la existente en lugar de crear otra; 0 la desactiva
+NOTIFICACIONES_VENTANA_DEDUP = 600
+
+# Hilos por proceso para las difusiones de notificaciones en segundo plano
+DIFUSION_HILOS = 2
+# Segundos sin avanzar tras los que otro proceso puede retomar una difusión
+DIFUSION_CONCESION_SEGUNDOS = 300
+
+# Logging: los loggers 'api' y los errores de django.request se guardan en
+# log_sistema por lotes desde un hilo de fondo (api.registro.LogSistemaHandler)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'log_sistema': {
+            'level': 'INFO',
+            'class': 'api.registro.LogSistemaHandler',
+            'tamano_lote': 200,
+            'intervalo': 2.0,
+            'capacidad': 10000,
+        },
+    },
+    'loggers': {
+        'api': {
+            'handlers': ['log_sistema'],
+            'level': 'INFO',
+        },
+        'django.request': {
+            'handlers': ['log_sistema'],
+            'level': 'ERROR',
+        },
+    },
+}
+
+# Registro de actividad de usuarios (api.middleware.ActividadUsuarioMiddleware):
+# fracción de lecturas registradas por nombre de ruta ('*' para el resto) y
+# parámetros de la escritura por lotes
+ACTIVIDAD_MUESTREO = {
+    '*': 1.0,
+    'autocompletar-empleados': 0.05,
+    'notificaciones-no-leidas-count': 0.05,
+    'notificaciones-usuario': 0.25,
+}
+ACTIVIDAD_ESCRITURA = {
+    'tamano_lote': 200,
+    'intervalo': 2.0,
+    'capacidad': 10000,
+}
+
+# Retención de registros (manage.py archivar_registros): días que se conservan
+# en la base de datos y directorio de los segmentos archivados
+RETENCION_DIAS = {
+    'logs': 90,
+    'actividades': 180,
+}
+RETENCION_DIRECTORIO = BASE_DIR / 'archivo'
+
+# Días que se conservan los resúmenes horarios de actividad (manage.py agregar_actividades)
+RESUMEN_ACTIVIDAD_DIAS = 90
+
+# Caché de sesiones validadas por token (api.autenticacion): segundos máximos
+# que vive una entrada (acota la revocación entre workers) y entradas por proceso
+SESIONES_CACHE_TTL = 60
+SESIONES_CACHE_MAXIMO = 10000
+
+# Máximo retraso en segundos de usuarios.ultimo_acceso y
+# sesiones.ultima_actividad, que se escriben en diferido (api.accesos)
+ACCESOS_MAX_RETRASO = 30
+# Segundos mínimos entre cambios del ETag del listado de usuarios causados
+# solo por esa escritura diferida de ultimo_acceso
+ACCESOS_INTERVALO_VERSION = 300
+
+# Inicio de sesión (api.inicio_sesion): intentos por ventana de segundos por IP
+# y por nombre de usuario, fallos antes del bloqueo, minutos de bloqueo y
+# duración de las sesiones en horas
+LOGIN_LIMITES = {'ip': (20, 60), 'usuario': (5, 60)}
+# Proxies inversos cuyo X-Forwarded-For se acepta para obtener la IP del
+# cliente (api.registro.ip_cliente); sin ellos se usa REMOTE_ADDR
+PROXIES_CONFIABLES = []
+LOGIN_MAX_INTENTOS = 5
+LOGIN_BLOQUEO_MINUTOS = 15
+SESIONES_DURACION_HORAS = 8
+
+# Filas entre las que se reparten los contadores de estadisticas_generales
+# (api.contadores) para que los guardados concurrentes no compitan por una sola
+CONTADORES_FRAGMENTOS = 16
+
+# Segundos entre comprobaciones de la versión de 'roles' para recompilar los
+# permisos en memoria de cada proceso (api.permisos)
+PERMISOS_VERIFICAR_CADA = 5
+
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'